@@ -0,0 +1 @@
+# Офлайн-бенчмарки извлечения текста и разбора лент на сохранённом корпусе (benchmarks/corpus)
@@ -0,0 +1,248 @@
+"""
+Офлайн-бенчмарк этапов парсера на сохранённом корпусе: разбор RSS/Atom (feedparser),
+очистка описаний (clean_text) и извлечение текста статьи (extract_article_text).
+
+Для каждого этапа: пропускная способность, задержки p50/p99, пиковая память,
+плюс сверка результата с эталонами из corpus/golden. Результат — JSON для сравнения прогонов.
+
+Запуск (из папки news_parsing):
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --baseline bench.json        # сравнить с прошлым прогоном
+    python -m benchmarks.run --update-golden              # после намеренного изменения извлечения
+
+Новые страницы и ленты кладутся в corpus/articles (*.html) и corpus/feeds (*.xml),
+эталоны для них создаёт --update-golden.
+"""
+import argparse
+import difflib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import feedparser
+
+from extraction import extract_article_text, clean_text
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+ARTICLES_DIR = os.path.join(CORPUS_DIR, "articles")
+FEEDS_DIR = os.path.join(CORPUS_DIR, "feeds")
+GOLDEN_DIR = os.path.join(CORPUS_DIR, "golden")
+MIN_SIMILARITY = 0.98  # ниже — извлечение заметно отличается от эталона
+
+
+def _read(path: str) -> str:
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def load_corpus() -> dict:
+    articles = {
+        os.path.splitext(name)[0]: _read(os.path.join(ARTICLES_DIR, name))
+        for name in sorted(os.listdir(ARTICLES_DIR)) if name.endswith(".html")
+    }
+    feeds = {
+        os.path.splitext(name)[0]: _read(os.path.join(FEEDS_DIR, name))
+        for name in sorted(os.listdir(FEEDS_DIR)) if name.endswith(".xml")
+    }
+    return {"articles": articles, "feeds": feeds}
+
+
+def _entry_description(entry) -> str:
+    # Так же, как parser.parse_feed_and_process берёт описание записи
+    return getattr(entry, "summary", getattr(entry, "description", ""))
+
+
+def build_stages(corpus: dict) -> dict:
+    """Этап -> (функция, {имя входа: данные})"""
+    descriptions = {}
+    for name, xml in corpus["feeds"].items():
+        for index, entry in enumerate(feedparser.parse(xml).entries):
+            descriptions[f"{name}#{index}"] = _entry_description(entry)
+    return {
+        "feed_parse": (feedparser.parse, corpus["feeds"]),
+        "clean_text": (clean_text, descriptions),
+        "extract_article": (extract_article_text, corpus["articles"]),
+    }
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    """Перцентиль методом ближайшего ранга"""
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def measure(func, inputs: dict, repeat: int) -> dict:
+    items = list(inputs.values())
+    for data in items:  # прогрев: импорты, кэши регулярок
+        func(data)
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for data in items:
+            call_started = time.perf_counter_ns()
+            func(data)
+            latencies.append(time.perf_counter_ns() - call_started)
+    total = time.perf_counter() - started
+
+    # Память меряем отдельным проходом: tracemalloc заметно замедляет код
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    for data in items:
+        func(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    input_bytes = sum(len(data.encode("utf-8")) for data in items) * repeat
+    return {
+        "inputs": len(items),
+        "calls": len(latencies),
+        "throughput_per_sec": round(len(latencies) / total, 1),
+        "throughput_mb_per_sec": round(input_bytes / total / 1e6, 3),
+        "p50_ms": round(_percentile(latencies, 0.50) / 1e6, 4),
+        "p99_ms": round(_percentile(latencies, 0.99) / 1e6, 4),
+        "max_ms": round(latencies[-1] / 1e6, 4),
+        "peak_memory_kb": round((peak - baseline) / 1024, 1),
+    }
+
+
+def _feed_summary(xml: str) -> dict:
+    entries = feedparser.parse(xml).entries
+    return {
+        "entries": len(entries),
+        "titles": [getattr(entry, "title", "") for entry in entries],
+        "links": [getattr(entry, "link", "") for entry in entries],
+        "descriptions": [clean_text(_entry_description(entry)) for entry in entries],
+    }
+
+
+def current_outputs(corpus: dict) -> dict:
+    return {
+        "articles": {name: extract_article_text(page) for name, page in corpus["articles"].items()},
+        "feeds": {name: _feed_summary(xml) for name, xml in corpus["feeds"].items()},
+    }
+
+
+def update_golden(outputs: dict):
+    os.makedirs(GOLDEN_DIR, exist_ok=True)
+    for name, text in outputs["articles"].items():
+        with open(os.path.join(GOLDEN_DIR, f"{name}.txt"), "w", encoding="utf-8") as f:
+            f.write(text)
+    for name, summary in outputs["feeds"].items():
+        with open(os.path.join(GOLDEN_DIR, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    print(f"💾 Эталоны обновлены: {GOLDEN_DIR}", file=sys.stderr)
+
+
+def check_quality(outputs: dict) -> dict:
+    """Сверка с эталонами: похожесть текста статьи и совпадение записей лент"""
+    results = {}
+    for name, text in outputs["articles"].items():
+        path = os.path.join(GOLDEN_DIR, f"{name}.txt")
+        if not os.path.exists(path):
+            results[f"article:{name}"] = {"ok": False, "error": "нет эталона (запустите --update-golden)"}
+            continue
+        golden = _read(path)
+        similarity = difflib.SequenceMatcher(None, golden, text, autojunk=False).ratio() if golden or text else 1.0
+        results[f"article:{name}"] = {
+            "ok": similarity >= MIN_SIMILARITY,
+            "exact": text == golden,
+            "similarity": round(similarity, 4),
+            "chars": len(text),
+            "golden_chars": len(golden),
+        }
+
+    for name, summary in outputs["feeds"].items():
+        path = os.path.join(GOLDEN_DIR, f"{name}.json")
+        if not os.path.exists(path):
+            results[f"feed:{name}"] = {"ok": False, "error": "нет эталона (запустите --update-golden)"}
+            continue
+        with open(path, encoding="utf-8") as f:
+            golden = json.load(f)
+        checks = {key: summary[key] == golden.get(key) for key in ("entries", "titles", "links", "descriptions")}
+        results[f"feed:{name}"] = {"ok": all(checks.values()), **checks}
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def compare(report: dict, baseline: dict) -> list:
+    """Строки с изменением p50/p99/пропускной способности относительно прошлого прогона"""
+    lines = []
+    for stage, current in report["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous:
+            continue
+        parts = []
+        for key in ("p50_ms", "p99_ms", "throughput_per_sec", "peak_memory_kb"):
+            if previous.get(key):
+                change = (current[key] - previous[key]) / previous[key] * 100
+                parts.append(f"{key} {previous[key]} → {current[key]} ({change:+.1f}%)")
+        lines.append(f"{stage}: " + ", ".join(parts))
+    return lines
+
+
+def run(repeat: int) -> dict:
+    corpus = load_corpus()
+    stages = {name: measure(func, inputs, repeat) for name, (func, inputs) in build_stages(corpus).items()}
+    quality = check_quality(current_outputs(corpus))
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "stages": stages,
+        "quality": quality,
+        "quality_ok": all(item["ok"] for item in quality.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк извлечения текста и разбора лент")
+    parser.add_argument("--repeat", type=int, default=20, help="сколько раз прогонять каждый вход")
+    parser.add_argument("--output", help="записать JSON в файл (по умолчанию — в stdout)")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--update-golden", action="store_true", help="перезаписать эталоны текущими результатами")
+    args = parser.parse_args()
+
+    if args.update_golden:
+        update_golden(current_outputs(load_corpus()))
+
+    report = run(args.repeat)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"💾 Результаты записаны в {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            for line in compare(report, json.load(f)):
+                print(f"📊 {line}", file=sys.stderr)
+
+    failed = [name for name, item in report["quality"].items() if not item["ok"]]
+    if failed:
+        print(f"❌ Расхождение с эталонами: {', '.join(failed)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
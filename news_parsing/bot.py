@@ -1,17 +1,29 @@
 import asyncio
-import os
-from aiogram import Bot, Dispatcher, F, types
+from aiogram import Dispatcher, F, types
 from aiogram.filters import Command
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.types import FSInputFile
-from config import BOT_TOKEN, CHANNEL_ID, ADMINS
-from database import init_db, add_site, remove_site, get_sites, is_news_sent, mark_news_sent, mark_news_published, \
-    get_queue_size, clear_stuck_processing, set_moderation_lock, is_moderation_locked
-from site_poster import post_news_to_site
+from config import ADMINS
+from database import init_db, add_site, remove_site, get_sites, is_news_sent, mark_news_sent, \
+    get_queue_size, clear_stuck_processing, set_moderation_lock, is_moderation_locked, cleanup_old_claims
+from site_client import get_site_client_stats
+from translation import get_translation_stats
+from image_catalog import refresh_image_catalog, get_image_catalog_stats
 from news_sender import send_processed_news_to_admin, get_pending_raw_news, get_pending_processed_news, \
-    remove_from_pending_raw_news, remove_from_pending_processed_news, delete_news_messages
-
-bot = Bot(token=BOT_TOKEN)
+    remove_from_pending_raw_news, remove_from_pending_processed_news, delete_news_messages, \
+    make_placeholder_updater, get_photo_cache_stats, make_bot, \
+    transition_news_card, get_card_messages, finish_news_card
+from speculative import take_speculative_rewrite, discard_speculative_rewrite, get_speculative_stats
+from llm_cache import get_llm_cache_stats
+from condense import get_condense_stats
+from llm_providers import router as llm_router
+from telegram_queue import get_telegram_queue_stats
+from claims import claim_moderation, release_moderation, describe_claim
+from jobs import job_handler, job_failure_handler, enqueue_job, start_job_workers, get_job_stats
+from outbox import enqueue_publication, start_publisher, get_outbox_stats
+from metrics import metrics_collector, QUEUE_DEPTH
+from tracing import span, mark, get_trace, format_timeline, start_tracing
+
+bot = make_bot()
 dp = Dispatcher()
 
 
@@ -26,256 +38,183 @@ def is_admin(user_id: int) -> bool:
 async def approve_raw_news(callback: types.CallbackQuery):
     from database import set_moderation_lock
 
-    # Блокируем модерацию
+    _, news_id = callback.data.split("|", 1)
+
+    # Второй админ, нажавший кнопку позже, сразу получает ответ без повторной работы
+    claimed, holder = await claim_moderation("raw", news_id, "approve", callback.from_user)
+    if not claimed:
+        await callback.answer(describe_claim(holder))
+        return
+
+    data = get_pending_raw_news().get(news_id)
+    if not data:
+        await release_moderation("raw", news_id)
+        await callback.answer()
+        delete_news_messages(news_id)
+        await callback.message.answer("❌ Новость не найдена.")
+        return
+
+    mark(data["url"], "moderation.approved", admin=callback.from_user.full_name)
+
+    # Блокируем модерацию до завершения фоновой задачи
     await set_moderation_lock(True)
 
-    try:
-        await callback.answer("✅ Новость одобрена для редактирования")
+    # Рерайт идёт в фоне — кнопка отвечает сразу
+    job_id = await enqueue_job("rewrite", {"news_id": news_id, **data}, callback.from_user.id,
+                               dedup_key=f"rewrite:{news_id}")
+    if job_id is None:
+        await callback.answer("⏳ Новость уже обрабатывается")
+        return
+    await callback.answer("✅ Новость одобрена для редактирования")
 
-        _, news_id = callback.data.split("|", 1)
-        data = get_pending_raw_news().get(news_id)
-        if not data:
-            await delete_news_messages(callback.from_user.id, news_id)
-            await callback.message.answer("❌ Новость не найдена.")
-            return
 
-        # Удаляем все сообщения этой новости у админа
-        await delete_news_messages(callback.from_user.id, news_id)
+@job_handler("rewrite")
+async def rewrite_news_job(job: dict):
+    from database import set_moderation_lock
 
-        # Обрабатываем через DeepSeek
-        from parser import process_with_deepseek
-        processed_text = await process_with_deepseek(data["title"], data["text"])
+    data = job["payload"]
+    news_id = data["news_id"]
+    try:
+        # Карточка у всех админов превращается в «DeepSeek переписывает...» — без удаления и новой отправки
+        await transition_news_card(news_id, "processing")
+        placeholders = get_card_messages(news_id)
+
+        # Берём предгенерированный рерайт, если он есть, иначе обрабатываем через DeepSeek
+        from parser import process_with_deepseek, process_with_deepseek_streaming, is_rewrite_needed, \
+            DEEPSEEK_STREAMING
+        with span(data["url"], "rewrite") as attrs:
+            processed_text = await take_speculative_rewrite(news_id)
+            if processed_text:
+                print("⚡ Использован заранее подготовленный рерайт")
+                attrs["mode"] = "speculative"
+            elif DEEPSEEK_STREAMING and is_rewrite_needed(data["text"]):
+                # Админы видят текст по мере генерации прямо в карточке, а не ждут полный ответ
+                attrs["mode"] = "streaming"
+                processed_text = await process_with_deepseek_streaming(
+                    data["title"], data["text"], make_placeholder_updater(placeholders, data["title"])
+                )
+            else:
+                attrs["mode"] = "plain"
+                processed_text = await process_with_deepseek(data["title"], data["text"])
 
-        # Отправляем обработанную новость на финальное одобрение БЕЗ ФОТО
-        await send_processed_news_to_admin(processed_text, data["url"], data["title"])
+        # Та же карточка становится обработанной новостью на финальное одобрение БЕЗ ФОТО
+        with span(data["url"], "moderation.processed_sent"):
+            await send_processed_news_to_admin(processed_text, data["url"], data["title"], placeholders=placeholders)
 
         # Удаляем из временного хранилища
         remove_from_pending_raw_news(news_id)
 
-        # Уведомляем админа
-        await callback.message.answer("✅ Новость отправлена на обработку DeepSeek")
-
     finally:
         # Разблокируем модерацию после завершения
         await set_moderation_lock(False)
 
 
+@job_failure_handler("rewrite")
+async def rewrite_news_failed(job: dict, error: Exception):
+    """Рерайт не удался после всех попыток — карточка снова ждёт решения по сырой новости"""
+    news_id = job["payload"]["news_id"]
+    await release_moderation("raw", news_id)
+    await transition_news_card(news_id, "raw")
+
+
 # Обработка отклонения сырой новости
 @dp.callback_query(F.data.startswith("reject_raw|"))
 async def reject_raw_news(callback: types.CallbackQuery):
     from database import set_moderation_lock
 
+    _, news_id = callback.data.split("|", 1)
+    claimed, holder = await claim_moderation("raw", news_id, "reject", callback.from_user)
+    if not claimed:
+        await callback.answer(describe_claim(holder))
+        return
+
     try:
         await callback.answer("❌ Новость отклонена")
     except Exception:
         pass
 
     try:
-        _, news_id = callback.data.split("|", 1)
-
-        # Удаляем все сообщения этой новости у админа
-        await delete_news_messages(callback.from_user.id, news_id)
-
+        data = get_pending_raw_news().get(news_id)
+        if data:
+            mark(data["url"], "moderation.rejected", stage="raw", admin=callback.from_user.full_name)
         remove_from_pending_raw_news(news_id)
+        discard_speculative_rewrite(news_id)
 
-        # Уведомляем ВСЕХ админов об отклонении
-        for admin_id in ADMINS:
-            try:
-                await bot.send_message(admin_id, "❌ Сырая новость отклонена.")
-            except Exception:
-                pass
+        # Карточка у ВСЕХ админов показывает, что новость отклонена
+        await finish_news_card(news_id, "rejected", "❌ Сырая новость отклонена.")
     finally:
         # Разблокируем модерацию
         await set_moderation_lock(False)
 
 
-# Подтверждение обработанной новости для Telegram
-@dp.callback_query(F.data.startswith("approve|"))
-async def approve_processed_news(callback: types.CallbackQuery):
-    from database import set_moderation_lock
-
-    await callback.answer()
-
-    try:
-        _, news_id = callback.data.split("|", 1)
-        data = get_pending_processed_news().get(news_id)
-        if not data:
-            await delete_news_messages(callback.from_user.id, news_id)
-            await callback.message.answer("❌ Новость не найдена.")
-            return
-
-        news_text = data["text"]
-        image_path = data["image"]
-
-        if not os.path.exists(image_path):
-            print(f"❌ Файл не найден: {image_path}")
-            await delete_news_messages(callback.from_user.id, news_id)
-            await callback.message.answer("❌ Изображение не найдено, новость не отправлена.")
-            return
-
-        photo = FSInputFile(image_path)
-
-        try:
-            # Сначала отправляем фото с началом текста (если текст короткий)
-            if len(news_text) <= 1024:
-                # Если текст помещается в подпись к фото
-                await bot.send_photo(CHANNEL_ID, photo, caption=news_text, parse_mode="HTML")
-            else:
-                # Если текст длинный - отправляем фото без текста, а текст отдельно
-                await bot.send_photo(CHANNEL_ID, photo)
-                # Отправляем текст частями
-                from news_sender import send_long_message
-                await send_long_message(CHANNEL_ID, news_text, "")
-
-        except Exception as e:
-            print("❌ Ошибка отправки в канал:", e)
-            await delete_news_messages(callback.from_user.id, news_id)
-            await callback.message.answer("❌ Не удалось отправить новость в канал.")
-            return
+async def enqueue_publish(callback: types.CallbackQuery, targets: list):
+    """Публикация идёт в фоне через outbox; обработчик кнопки только ставит её в очередь"""
+    _, news_id = callback.data.split("|", 1)
+    action = targets[0] if len(targets) == 1 else "both"
+    claimed, holder = await claim_moderation("processed", news_id, action, callback.from_user)
+    if not claimed:
+        await callback.answer(describe_claim(holder))
+        return
 
-        # Отмечаем как опубликованную
-        await mark_news_published(data["url"])
-        remove_from_pending_processed_news(news_id)
+    data = get_pending_processed_news().get(news_id)
+    if not data:
+        await release_moderation("processed", news_id)
+        await callback.answer()
+        delete_news_messages(news_id)
+        await callback.message.answer("❌ Новость не найдена.")
+        return
 
-        # Удаляем все сообщения этой новости у админа
-        await delete_news_messages(callback.from_user.id, news_id)
+    mark(data["url"], "publish.requested", targets="+".join(targets), admin=callback.from_user.full_name)
+    # Каждая цель публикации — отдельная запись outbox; модерация не ждёт сайт и канал
+    added = await enqueue_publication(news_id, data["url"], data["text"], data["image"], targets,
+                                      callback.from_user.id)
+    await set_moderation_lock(False)
+    if not added:
+        # Публикацию ведёт уже существующая запись outbox — наша блокировка карточки не нужна
+        await release_moderation("processed", news_id)
+        await callback.answer("⏳ Новость уже публикуется")
+        return
+    await callback.answer("⏳ Публикуем...")
 
-        # Уведомляем ВСЕХ админов о публикации
-        for admin_id in ADMINS:
-            try:
-                await bot.send_message(admin_id, "✅ Новость опубликована в Telegram.")
-            except Exception:
-                pass
 
-    finally:
-        # Разблокируем модерацию
-        await set_moderation_lock(False)
+# Подтверждение обработанной новости для Telegram
+@dp.callback_query(F.data.startswith("approve|"))
+async def approve_processed_news(callback: types.CallbackQuery):
+    await enqueue_publish(callback, ["telegram"])
 
 
 @dp.callback_query(F.data.startswith("site|"))
 async def post_to_site(callback: types.CallbackQuery):
-    from database import set_moderation_lock
-
-    try:
-        await callback.answer()
-        _, news_id = callback.data.split("|", 1)
-        data = get_pending_processed_news().get(news_id)
-        if not data:
-            await delete_news_messages(callback.from_user.id, news_id)
-            await callback.message.answer("❌ Новость не найдена.")
-            return
-
-        success = post_news_to_site(data["text"], data["image"])
-        if success:
-            await mark_news_published(data["url"])
-            remove_from_pending_processed_news(news_id)
-            await delete_news_messages(callback.from_user.id, news_id)
-            await callback.message.answer("🌐 Новость опубликована на сайте!")
-
-            for admin_id in ADMINS:
-                try:
-                    await bot.send_message(admin_id, "🌐 Новость опубликована на сайте!")
-                except Exception:
-                    pass
-        else:
-            await delete_news_messages(callback.from_user.id, news_id)
-            await callback.message.answer("❌ Ошибка при публикации на сайте.")
-    except Exception as e:
-        print(f"❌ Ошибка в post_to_site: {e}")
-        await delete_news_messages(callback.from_user.id, news_id)
-        await callback.message.answer("❌ Произошла ошибка при публикации на сайте.")
-    finally:
-        # Разблокируем модерацию
-        await set_moderation_lock(False)
+    await enqueue_publish(callback, ["site"])
 
 
 @dp.callback_query(F.data.startswith("both|"))
 async def post_to_both(callback: types.CallbackQuery):
-    from database import set_moderation_lock
-
-    try:
-        await callback.answer()
-        _, news_id = callback.data.split("|", 1)
-        data = get_pending_processed_news().get(news_id)
-        if not data:
-            await delete_news_messages(callback.from_user.id, news_id)
-            await callback.message.answer("❌ Новость не найдена.")
-            return
-
-        image_path = data["image"]
-        text = data["text"]
-
-        # 1️⃣ Публикуем на сайт
-        success_site = post_news_to_site(text, image_path)
-
-        # 2️⃣ Публикуем в Telegram
-        try:
-            photo = FSInputFile(image_path)
-            if len(text) <= 1024:
-                await bot.send_photo(CHANNEL_ID, photo, caption=text, parse_mode="HTML")
-            else:
-                await bot.send_photo(CHANNEL_ID, photo)
-                from news_sender import send_long_message
-                await send_long_message(CHANNEL_ID, text, "")
-            success_tg = True
-        except Exception as e:
-            print("Ошибка публикации в Telegram:", e)
-            success_tg = False
-
-        # Результат
-        if success_site or success_tg:
-            await mark_news_published(data["url"])
-            remove_from_pending_processed_news(news_id)
-            await delete_news_messages(callback.from_user.id, news_id)
-
-            result_message = ""
-            if success_site and success_tg:
-                result_message = "🚀 Новость опубликована в Telegram и на сайте!"
-            elif success_site:
-                result_message = "🌐 Новость опубликована на сайте (Telegram не удалось)!"
-            else:
-                result_message = "✅ Новость опубликована в Telegram (сайт не удалось)!"
-
-            await callback.message.answer(result_message)
-            for admin_id in ADMINS:
-                try:
-                    await bot.send_message(admin_id, result_message)
-                except Exception:
-                    pass
-        else:
-            await delete_news_messages(callback.from_user.id, news_id)
-            await callback.message.answer("⚠️ Ошибка при публикации (проверь лог).")
-    except Exception as e:
-        print(f"❌ Ошибка в post_to_both: {e}")
-        await delete_news_messages(callback.from_user.id, news_id)
-        await callback.message.answer("❌ Произошла ошибка при публикации.")
-    finally:
-        # Разблокируем модерацию
-        await set_moderation_lock(False)
+    await enqueue_publish(callback, ["site", "telegram"])
 
 
 @dp.callback_query(F.data.startswith("reject|"))
 async def reject_processed_news(callback: types.CallbackQuery):
     from database import set_moderation_lock
 
+    _, news_id = callback.data.split("|", 1)
+    claimed, holder = await claim_moderation("processed", news_id, "reject", callback.from_user)
+    if not claimed:
+        await callback.answer(describe_claim(holder))
+        return
+
     try:
         await callback.answer("❌ Новость отклонена")
     except Exception:
         pass
 
     try:
-        _, news_id = callback.data.split("|", 1)
-
-        # Удаляем все сообщения этой новости у админа
-        await delete_news_messages(callback.from_user.id, news_id)
-
+        data = get_pending_processed_news().get(news_id)
+        if data:
+            mark(data["url"], "moderation.rejected", stage="processed", admin=callback.from_user.full_name)
         remove_from_pending_processed_news(news_id)
 
-        for admin_id in ADMINS:
-            try:
-                await bot.send_message(admin_id, "❌ Обработанная новость отклонена.")
-            except Exception:
-                pass
+        await finish_news_card(news_id, "rejected", "❌ Обработанная новость отклонена.")
     finally:
         # Разблокируем модерацию
         await set_moderation_lock(False)
@@ -323,6 +262,7 @@ async def cmd_start(message: types.Message):
 */skipnext* - пропустить зависшую новость
 */postlatest* - принудительно проверить RSS-ленты
 */force_check* - массовая проверка всех RSS (до 15 новостей с каждого)
+*/trace <ссылка>* - где новость провела время: этапы, ожидания, свежесть
 
 *🚀 Автоматический процесс модерации:*
 
@@ -393,6 +333,7 @@ async def cmd_help(message: types.Message):
 `/skipnext` - пропустить зависшую новость (очищает блокировки)
 `/postlatest` - принудительно проверить ВСЕ RSS-ленты (по 1 новости с каждого)
 `/force_check` - массовая проверка (до 15 новостей с каждой ленты)
+`/trace <ссылка>` - хронология новости по этапам и время от публикации в ленте до канала
 
 *🔄 АВТОМАТИЧЕСКИЙ ПРОЦЕСС:*
 
@@ -616,6 +557,21 @@ async def cmd_queue_status(message: types.Message):
     pending_raw_count = len(get_pending_raw_news())
     pending_processed_count = len(get_pending_processed_news())
     is_locked = await is_moderation_locked()
+    speculative = get_speculative_stats()
+    llm_cache = get_llm_cache_stats()
+    condensed = get_condense_stats()
+    photos = get_photo_cache_stats()
+    outbound = get_telegram_queue_stats()
+    jobs = await get_job_stats()
+    site = get_site_client_stats()
+    outbox = await get_outbox_stats()
+    translation = get_translation_stats()
+    images = get_image_catalog_stats()
+    providers_text = "".join(
+        f"   • {name}: ✅ {stats['ok']} / ❌ {stats['error']} / ⏱️ {stats['timeout']}, "
+        f"🔁 {stats['retries']}, 🚦 {stats['rate_limited']}, ~{stats['latency']} сек (p95 {stats['p95']})\n"
+        for name, stats in llm_router.get_stats().items()
+    ) or "   • запросов ещё не было\n"
 
     status_text = (
         f"📊 *Статус системы*\n\n"
@@ -624,6 +580,25 @@ async def cmd_queue_status(message: types.Message):
         f"• ✍️ Обработанных новостей на модерации: *{pending_processed_count}*\n"
         f"• 🔒 Модерация заблокирована: *{'Да' if is_locked else 'Нет'}*\n"
         f"• 👥 Всего админов: *{len(ADMINS)}*\n"
+        f"• 🔮 Предгенерация: *{speculative['hits']}* попаданий, "
+        f"*{speculative['daily_calls']}/{speculative['daily_cap']}* вызовов за день\n"
+        f"• 💾 Кэш LLM: *{llm_cache['hits']}* попаданий / *{llm_cache['misses']}* промахов\n"
+        f"• ✂️ Сжато текстов: *{condensed['condensed']}*, сэкономлено ~*{condensed['tokens_saved']}* токенов\n"
+        f"• 🖼️ Фото в канал: *{photos['reused']}* по file_id, *{photos['uploads']}* загрузок\n"
+        f"• 📤 Исходящая очередь Telegram: *{outbound['queued']}* ждут, "
+        f"*{sum(outbound['sent'].values())}* отправлено, *{outbound['coalesced']}* склеено\n"
+        f"• 🧾 Фоновые задачи: *{jobs['queued']}* в очереди, *{jobs['running']}* выполняются, "
+        f"*{jobs['failed']}* с ошибкой\n"
+        f"• 📮 Публикации: *{outbox['pending'] + outbox['sending']}* ждут, *{outbox['sent']}* отправлено, "
+        f"*{outbox['dead']}* не удалось\n"
+        f"• 🌐 API сайта: *{site['logins']}* логинов, картинки: *{site['images_reused']}* из кэша / "
+        f"*{site['images_uploads']}* загрузок\n"
+        f"• 🌍 Переводы ({translation['provider']}): *{translation['translated']}* переведено, "
+        f"*{translation['cache_hits']}* из кэша, *{translation['failed']}* ошибок\n"
+        f"• 🖼️ Картинок в каталоге: *{images['images']}*, "
+        f"{images['bytes_original'] // 1024} КБ → Telegram {images['bytes_telegram'] // 1024} КБ / "
+        f"сайт {images['bytes_site'] // 1024} КБ\n"
+        f"• 🤖 LLM-провайдеры:\n{providers_text}"
         f"\n*Процесс модерации:*\n"
         f"1. Сырая новость → Одобрение → DeepSeek\n"
         f"2. Обработанная новость → Публикация\n"
@@ -639,6 +614,22 @@ async def cmd_queue_status(message: types.Message):
     await message.answer(status_text, parse_mode="Markdown")
 
 
+@dp.message(Command("trace"))
+async def cmd_trace(message: types.Message):
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ Ты не админ!")
+        return
+
+    parts = message.text.split(maxsplit=1)
+    if len(parts) < 2:
+        await message.answer("❌ Укажи ссылку на новость: /trace <ссылка>")
+        return
+
+    link = parts[1].strip()
+    text = format_timeline(link, await get_trace(link))
+    await message.answer(text[:4096], disable_web_page_preview=True)
+
+
 @dp.message(Command("postnext"))
 async def cmd_post_next(message: types.Message):
     if not is_admin(message.from_user.id):
@@ -734,10 +725,32 @@ async def handle_other_messages(message: types.Message):
         await message.answer("❌ У тебя нет доступа к этому боту.")
 
 
+@metrics_collector
+async def collect_queue_depth():
+    """Глубина очередей для /metrics — по ней видно, где копится отставание"""
+    outbound = get_telegram_queue_stats()
+    jobs = await get_job_stats()
+    outbox = await get_outbox_stats()
+    QUEUE_DEPTH.set(await get_queue_size(), queue="processing")
+    QUEUE_DEPTH.set(len(get_pending_raw_news()), queue="moderation_raw")
+    QUEUE_DEPTH.set(len(get_pending_processed_news()), queue="moderation_processed")
+    QUEUE_DEPTH.set(jobs["queued"] + jobs["running"], queue="jobs")
+    QUEUE_DEPTH.set(outbox["pending"] + outbox["sending"], queue="outbox")
+    QUEUE_DEPTH.set(outbox["dead"], queue="outbox_dead")
+    QUEUE_DEPTH.set(outbound["queued"], queue="telegram_outbound")
+
+
 # Инициализация базы данных при запуске
 async def initialize():
     await init_db()
+    await cleanup_old_claims()
     print("✅ База данных инициализирована")
+    # Каталог картинок и их варианты готовим заранее, а не при первой новости
+    await asyncio.to_thread(refresh_image_catalog)
+    # Возобновляем фоновые задачи, прерванные перезапуском
+    await start_job_workers()
+    await start_publisher()
+    start_tracing()
 
 
 # Запуск инициализации
@@ -0,0 +1,47 @@
+from database import try_claim, release_claim
+
+# Защита от двойных нажатий: решение по новости на каждом этапе (сырая / обработанная)
+# принимает только один админ. Память отвечает мгновенно, строка в БД — атомарный арбитр
+ACTION_LABELS = {
+    "approve": "одобрил(а) для редактирования",
+    "reject": "отклонил(а)",
+    "telegram": "публикует в Telegram",
+    "site": "публикует на сайт",
+    "both": "публикует в Telegram и на сайт",
+}
+
+_claims = {}  # claim_key -> (action, admin_id, admin_name)
+
+
+def _claim_key(stage: str, news_id: str) -> str:
+    return f"{stage}:{news_id}"
+
+
+async def claim_moderation(stage: str, news_id: str, action: str, user) -> tuple:
+    """
+    Закрепляет решение по новости за пользователем.
+    Возвращает (True, None) или (False, (action, admin_id, admin_name)) того, кто успел раньше
+    """
+    key = _claim_key(stage, news_id)
+    if key in _claims:
+        return False, _claims[key]
+
+    holder = (action, user.id, user.full_name)
+    _claims[key] = holder
+    existing = await try_claim(key, *holder)
+    if existing:
+        _claims[key] = existing
+        return False, existing
+    return True, None
+
+
+async def release_moderation(stage: str, news_id: str):
+    """Снимает закрепление, если действие не удалось начать и его можно повторить"""
+    key = _claim_key(stage, news_id)
+    _claims.pop(key, None)
+    await release_claim(key)
+
+
+def describe_claim(holder: tuple) -> str:
+    action, _, admin_name = holder
+    return f"⏳ Уже обработано: {admin_name} {ACTION_LABELS.get(action, action)}"
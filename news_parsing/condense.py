@@ -0,0 +1,108 @@
+import re
+
+import config
+
+# Сжатие текста статьи перед промптом: в DeepSeek уходят только самые
+# информативные абзацы, укладывающиеся в бюджет токенов (0 — не сжимать)
+CONDENSE_TOKEN_BUDGET = getattr(config, "CONDENSE_TOKEN_BUDGET", 1200)
+
+# Грубая, но быстрая оценка: кусок слова до 4 символов или знак препинания ≈ 1 токен
+_TOKEN_RE = re.compile(r"\w{1,4}|[^\w\s]")
+_WORD_RE = re.compile(r"\w+")
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)?\s*%?")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?…])\s+")
+
+_stats = {"condensed": 0, "tokens_saved": 0}
+
+
+def count_tokens(text: str) -> int:
+    """Приблизительное число токенов без обращения к токенизатору модели"""
+    return len(_TOKEN_RE.findall(text or ""))
+
+
+def _split_units(body: str) -> list:
+    """Абзацы статьи; если абзац один — разбиваем на предложения"""
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", body) if p.strip()]
+    if len(paragraphs) > 1:
+        return paragraphs
+    return [s.strip() for s in _SENTENCE_SPLIT_RE.split(body) if s.strip()]
+
+
+def _score_unit(unit: str, position: int, title_words: set) -> float:
+    """Информативность фрагмента: лид, цифры, имена собственные, пересечение с заголовком"""
+    words = _WORD_RE.findall(unit)
+    if not words:
+        return 0.0
+
+    score = 0.0
+    if position == 0:
+        score += 3.0  # лид обычно содержит суть новости
+    elif position == 1:
+        score += 1.0
+
+    score += 0.5 * len(_NUMBER_RE.findall(unit))
+    # Слова с заглавной буквы не в начале предложения — вероятные имена, компании, регионы
+    score += 0.3 * sum(1 for i, w in enumerate(words[1:], 1) if w[0].isupper() and words[i - 1][-1:] not in ".!?")
+    score += 0.4 * len({w.lower() for w in words} & title_words)
+
+    # Нормируем на длину, чтобы длинные абзацы не выигрывали только за счёт объёма
+    return score / (len(words) ** 0.5)
+
+
+def _truncate_to_budget(text: str, budget: int) -> str:
+    words = text.split()
+    if count_tokens(text) <= budget:
+        return " ".join(words)
+    # Многоточие — тоже токен, резервируем его в бюджете
+    budget -= count_tokens("…")
+    result = []
+    used = 0
+    for word in words:
+        used += count_tokens(word)
+        if used > budget:
+            break
+        result.append(word)
+    return " ".join(result) + "…"
+
+
+def condense_body(title: str, body: str, budget: int = CONDENSE_TOKEN_BUDGET):
+    """
+    Возвращает (сжатый_текст, сэкономлено_токенов).
+    Фрагменты выбираются по информативности, но выводятся в исходном порядке
+    """
+    if not body or budget <= 0:
+        return body, 0
+
+    total_tokens = count_tokens(body)
+    if total_tokens <= budget:
+        return body, 0
+
+    units = _split_units(body)
+    title_words = {w.lower() for w in _WORD_RE.findall(title or "") if len(w) > 3}
+    costs = [count_tokens(u) for u in units]
+    ranked = sorted(range(len(units)), key=lambda i: _score_unit(units[i], i, title_words), reverse=True)
+
+    selected = set()
+    used = 0
+    for index in ranked:
+        if used + costs[index] <= budget:
+            selected.add(index)
+            used += costs[index]
+
+    if selected:
+        separator = "\n\n" if "\n\n" in body else " "
+        condensed = separator.join(units[i] for i in sorted(selected))
+    else:
+        # Даже лучший фрагмент не помещается — обрезаем лид по бюджету
+        condensed = _truncate_to_budget(units[0], budget)
+
+    return condensed, total_tokens - count_tokens(condensed)
+
+
+def record_condensation(tokens_saved: int):
+    _stats["condensed"] += 1
+    _stats["tokens_saved"] += tokens_saved
+
+
+def get_condense_stats() -> dict:
+    return dict(_stats)
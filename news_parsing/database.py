@@ -1,3 +1,5 @@
+import time
+
 import aiosqlite
 
 DB_NAME = "news.db"
@@ -43,6 +45,86 @@ async def init_db():
                 )
                 """)
         await db.execute("INSERT OR IGNORE INTO moderation_lock (id, is_locked) VALUES (1, FALSE)")
+        await db.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT,
+                    created_at REAL,
+                    last_used_at REAL
+                )
+                """)
+        await db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT,
+                    payload TEXT,
+                    admin_id INTEGER,
+                    dedup_key TEXT,
+                    status TEXT DEFAULT 'queued',
+                    attempts INTEGER DEFAULT 0,
+                    error TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+                """)
+        # Не больше одной активной задачи на dedup_key — проверку делает сама SQLite, без гонок
+        await db.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_active_dedup ON jobs (dedup_key)
+                WHERE dedup_key IS NOT NULL AND status IN ('queued', 'running')
+                """)
+        await db.execute("""
+                CREATE TABLE IF NOT EXISTS moderation_claims (
+                    claim_key TEXT PRIMARY KEY,
+                    action TEXT,
+                    admin_id INTEGER,
+                    admin_name TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+                """)
+        await db.execute("""
+                CREATE TABLE IF NOT EXISTS site_images (
+                    content_hash TEXT PRIMARY KEY,
+                    image_uri TEXT,
+                    uploaded_at REAL
+                )
+                """)
+        await db.execute("""
+                CREATE TABLE IF NOT EXISTS translation_cache (
+                    key TEXT PRIMARY KEY,
+                    translation TEXT,
+                    created_at REAL
+                )
+                """)
+        await db.execute("""
+                CREATE TABLE IF NOT EXISTS publish_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idempotency_key TEXT UNIQUE,
+                    news_id TEXT,
+                    target TEXT,
+                    url TEXT,
+                    news_text TEXT,
+                    image_path TEXT,
+                    admin_id INTEGER,
+                    status TEXT DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    next_attempt_at REAL DEFAULT 0,
+                    last_error TEXT,
+                    progress INTEGER DEFAULT 0,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+                """)
+        # progress (выполненные шаги публикации) появился позже — добавляем в старые базы
+        cursor = await db.execute("PRAGMA table_info(publish_outbox)")
+        if "progress" not in [column[1] for column in await cursor.fetchall()]:
+            await db.execute("ALTER TABLE publish_outbox ADD COLUMN progress INTEGER DEFAULT 0")
+        await db.execute("""
+                CREATE TABLE IF NOT EXISTS telegram_files (
+                    content_hash TEXT PRIMARY KEY,
+                    file_id TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+                """)
         await db.commit()
 async def add_site(url):
     async with aiosqlite.connect(DB_NAME) as db:
@@ -135,6 +217,19 @@ async def get_next_from_queue():
         return news
 
 
+async def peek_queue(limit: int = 5):
+    """Возвращает ближайшие новости очереди, не помечая их как обрабатываемые"""
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute("""
+            SELECT link, title, news_text
+            FROM processing_queue 
+            WHERE is_processing = FALSE 
+            ORDER BY created_at ASC 
+            LIMIT ?
+        """, (limit,))
+        return await cursor.fetchall()
+
+
 async def mark_queue_processed(link: str):
     """Помечает новость в очереди как обработанную (удаляет из очереди)"""
     async with aiosqlite.connect(DB_NAME) as db:
@@ -207,4 +302,270 @@ async def is_moderation_locked() -> bool:
     async with aiosqlite.connect(DB_NAME) as db:
         cursor = await db.execute("SELECT is_locked FROM moderation_lock WHERE id = 1")
         result = await cursor.fetchone()
-        return result[0] if result else False
\ No newline at end of file
+        return result[0] if result else False
+
+
+async def get_telegram_file_id(content_hash: str):
+    """Возвращает file_id ранее загруженного в Telegram файла или None"""
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute("SELECT file_id FROM telegram_files WHERE content_hash = ?", (content_hash,))
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+
+async def store_telegram_file_id(content_hash: str, file_id: str):
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute(
+            "INSERT OR REPLACE INTO telegram_files (content_hash, file_id) VALUES (?, ?)",
+            (content_hash, file_id)
+        )
+        await db.commit()
+
+
+async def forget_telegram_file_id(content_hash: str):
+    """Telegram отверг file_id — при следующей отправке файл загрузится заново"""
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute("DELETE FROM telegram_files WHERE content_hash = ?", (content_hash,))
+        await db.commit()
+
+
+async def add_job(kind: str, payload: str, admin_id: int = None, dedup_key: str = None):
+    """Сохраняет фоновую задачу; возвращает её ID или None, если такая задача уже в работе"""
+    async with aiosqlite.connect(DB_NAME) as db:
+        # Дубликат активной задачи отсекает уникальный индекс idx_jobs_active_dedup
+        cursor = await db.execute(
+            "INSERT OR IGNORE INTO jobs (kind, payload, admin_id, dedup_key) VALUES (?, ?, ?, ?)",
+            (kind, payload, admin_id, dedup_key)
+        )
+        await db.commit()
+        return cursor.lastrowid if cursor.rowcount else None
+
+
+async def get_job(job_id: int):
+    """Возвращает (id, kind, payload, admin_id, status, attempts)"""
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute(
+            "SELECT id, kind, payload, admin_id, status, attempts FROM jobs WHERE id = ?", (job_id,)
+        )
+        return await cursor.fetchone()
+
+
+async def update_job(job_id: int, status: str = None, payload: str = None, error: str = None,
+                     increment_attempts: bool = False):
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute("""
+            UPDATE jobs
+            SET status = COALESCE(?, status),
+                payload = COALESCE(?, payload),
+                error = COALESCE(?, error),
+                attempts = attempts + ?,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (status, payload, error, 1 if increment_attempts else 0, job_id))
+        await db.commit()
+
+
+async def get_unfinished_jobs():
+    """ID задач, не завершённых до перезапуска; прерванные на середине снова ставятся в очередь"""
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+        await db.commit()
+        cursor = await db.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY id")
+        return [row[0] for row in await cursor.fetchall()]
+
+
+async def get_job_counts() -> dict:
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status")
+        return dict(await cursor.fetchall())
+
+
+async def cleanup_old_jobs(days: int = 7):
+    """Удаляет завершённые задачи старше указанного количества дней"""
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < datetime('now', ?)",
+            (f"-{days} days",)
+        )
+        await db.commit()
+
+
+async def try_claim(claim_key: str, action: str, admin_id: int, admin_name: str):
+    """
+    Атомарно закрепляет действие над новостью за админом.
+    Возвращает None при успехе или (action, admin_id, admin_name) того, кто успел раньше
+    """
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute(
+            "INSERT OR IGNORE INTO moderation_claims (claim_key, action, admin_id, admin_name) VALUES (?, ?, ?, ?)",
+            (claim_key, action, admin_id, admin_name)
+        )
+        await db.commit()
+        if cursor.rowcount == 1:
+            return None
+
+        cursor = await db.execute(
+            "SELECT action, admin_id, admin_name FROM moderation_claims WHERE claim_key = ?", (claim_key,)
+        )
+        return await cursor.fetchone()
+
+
+async def release_claim(claim_key: str):
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute("DELETE FROM moderation_claims WHERE claim_key = ?", (claim_key,))
+        await db.commit()
+
+
+async def cleanup_old_claims(days: int = 7):
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute(
+            "DELETE FROM moderation_claims WHERE created_at < datetime('now', ?)", (f"-{days} days",)
+        )
+        await db.commit()
+
+
+async def get_site_image_uri(content_hash: str, max_age: float):
+    """image_uri ранее загруженной на сайт картинки, если запись не старше max_age секунд"""
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute(
+            "SELECT image_uri FROM site_images WHERE content_hash = ? AND uploaded_at > ?",
+            (content_hash, time.time() - max_age)
+        )
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+
+async def store_site_image_uri(content_hash: str, image_uri: str):
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute(
+            "INSERT OR REPLACE INTO site_images (content_hash, image_uri, uploaded_at) VALUES (?, ?, ?)",
+            (content_hash, image_uri, time.time())
+        )
+        await db.commit()
+
+
+async def forget_site_image_uri(content_hash: str):
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute("DELETE FROM site_images WHERE content_hash = ?", (content_hash,))
+        await db.commit()
+
+
+async def get_cached_translations(keys: list, max_age: float) -> dict:
+    """Сохранённые переводы по ключам (хэш провайдера, языка и текста), не старше max_age секунд"""
+    if not keys:
+        return {}
+    async with aiosqlite.connect(DB_NAME) as db:
+        placeholders = ",".join("?" * len(keys))
+        cursor = await db.execute(
+            f"SELECT key, translation FROM translation_cache WHERE key IN ({placeholders}) AND created_at > ?",
+            (*keys, time.time() - max_age)
+        )
+        return dict(await cursor.fetchall())
+
+
+async def store_translations(translations: dict):
+    async with aiosqlite.connect(DB_NAME) as db:
+        now = time.time()
+        await db.executemany(
+            "INSERT OR REPLACE INTO translation_cache (key, translation, created_at) VALUES (?, ?, ?)",
+            [(key, text, now) for key, text in translations.items()]
+        )
+        await db.commit()
+
+
+async def add_to_outbox(news_id: str, target: str, url: str, news_text: str, image_path: str, admin_id: int) -> bool:
+    """
+    Добавляет публикацию в outbox; повторная публикация той же новости туда же игнорируется.
+    Запись в dead снова ставится в очередь — админ может повторить неудавшуюся публикацию
+    (выполненные шаги не повторяются, если текст не изменился)
+    """
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute("""
+            INSERT INTO publish_outbox
+                (idempotency_key, news_id, target, url, news_text, image_path, admin_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(idempotency_key) DO UPDATE SET
+                progress = CASE WHEN news_text = excluded.news_text THEN progress ELSE 0 END,
+                news_id = excluded.news_id,
+                news_text = excluded.news_text,
+                image_path = excluded.image_path,
+                admin_id = excluded.admin_id,
+                status = 'pending',
+                attempts = 0,
+                next_attempt_at = 0,
+                last_error = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE publish_outbox.status = 'dead'
+        """, (f"{target}:{url}", news_id, target, url, news_text, image_path, admin_id))
+        await db.commit()
+        return cursor.rowcount == 1
+
+
+async def claim_due_outbox(limit: int):
+    """
+    Забирает в работу публикации, время которых подошло:
+    (id, news_id, target, url, news_text, image_path, admin_id, attempts, progress)
+    """
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute("""
+            SELECT id, news_id, target, url, news_text, image_path, admin_id, attempts, progress
+            FROM publish_outbox
+            WHERE status = 'pending' AND next_attempt_at <= ?
+            ORDER BY next_attempt_at, id
+            LIMIT ?
+        """, (time.time(), limit))
+        rows = await cursor.fetchall()
+
+        claimed = []
+        for row in rows:
+            cursor = await db.execute(
+                "UPDATE publish_outbox SET status = 'sending', updated_at = CURRENT_TIMESTAMP "
+                "WHERE id = ? AND status = 'pending'",
+                (row[0],)
+            )
+            if cursor.rowcount == 1:
+                claimed.append(row)
+        await db.commit()
+        return claimed
+
+
+async def update_outbox(outbox_id: int, status: str, next_attempt_at: float = 0, error: str = None):
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute("""
+            UPDATE publish_outbox
+            SET status = ?,
+                attempts = attempts + CASE WHEN ? = 'sent' THEN 0 ELSE 1 END,
+                next_attempt_at = ?,
+                last_error = COALESCE(?, last_error),
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, (status, status, next_attempt_at, error, outbox_id))
+        await db.commit()
+
+
+async def save_outbox_progress(outbox_id: int, progress: int):
+    """Сколько шагов публикации уже выполнено — повтор продолжит с места обрыва"""
+    async with aiosqlite.connect(DB_NAME) as db:
+        await db.execute("UPDATE publish_outbox SET progress = ? WHERE id = ?", (progress, outbox_id))
+        await db.commit()
+
+
+async def get_outbox_targets(news_id: str):
+    """[(target, status)] всех публикаций новости"""
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute("SELECT target, status FROM publish_outbox WHERE news_id = ?", (news_id,))
+        return await cursor.fetchall()
+
+
+async def requeue_interrupted_outbox():
+    """После перезапуска публикации, прерванные на середине, снова ждут отправки"""
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute("UPDATE publish_outbox SET status = 'pending' WHERE status = 'sending'")
+        await db.commit()
+        return cursor.rowcount
+
+
+async def get_outbox_counts() -> dict:
+    async with aiosqlite.connect(DB_NAME) as db:
+        cursor = await db.execute("SELECT status, COUNT(*) FROM publish_outbox GROUP BY status")
+        return dict(await cursor.fetchall())
@@ -0,0 +1,82 @@
+import html
+import re
+
+from bs4 import BeautifulSoup
+
+from logs import get_logger, sampled
+
+# Извлечение текста статьи из HTML и очистка описаний из RSS. Без сети и без бота —
+# те же функции гоняют бенчмарки (benchmarks/) на сохранённых страницах
+log = get_logger("extraction")
+
+# Расширенный список селекторов для поиска контента
+ARTICLE_SELECTORS = [
+    "article",
+    "div.article",
+    "div.content",
+    "div.post-content",
+    "div.entry-content",
+    "div.story-text",
+    "div.text",
+    "main",
+    "[role='main']",
+    "div.news-text",
+    "div.news-content",
+    "div.news-detail",
+    "div.detail-text",
+    ".news__text",
+    ".article__text",
+    ".content__text",
+    "div.news-body",
+    "div.article-body"
+]
+NOISE_TAGS = ['script', 'style', 'nav', 'header', 'footer', 'aside', 'form', 'iframe']
+MIN_PARAGRAPH_LENGTH = 30
+MIN_BLOCK_TEXT = 200
+
+
+def find_article_node(soup: BeautifulSoup):
+    """Блок с текстом статьи: по известным селекторам, иначе самый большой текстовый блок"""
+    for selector in ARTICLE_SELECTORS:
+        found = soup.select(selector)
+        if found:
+            log.debug("✅ Найден контент по селектору", extra=sampled("article.selector", selector=selector))
+            return found[0]
+
+    # Если не нашли по селекторам, ищем по структуре
+    text_blocks = soup.find_all(['div', 'section'])
+    text_blocks = [block for block in text_blocks if len(block.get_text(strip=True)) > MIN_BLOCK_TEXT]
+    if text_blocks:
+        log.debug("✅ Найден контент по размеру текстового блока", extra=sampled("article.selector", selector="largest"))
+        return max(text_blocks, key=lambda x: len(x.get_text(strip=True)))
+    return None
+
+
+def extract_article_text(page_html: str) -> str:
+    """Текст статьи абзацами через пустую строку; пустая строка, если статья не найдена"""
+    soup = BeautifulSoup(page_html, "html.parser")
+    article = find_article_node(soup)
+    if not article:
+        log.debug("❌ Контент не найден на странице")
+        return ""
+
+    # Удаляем ненужные элементы
+    for element in article.find_all(NOISE_TAGS):
+        element.decompose()
+
+    paragraphs = [p.get_text().strip() for p in article.find_all("p")]
+    # Фильтруем пустые и слишком короткие параграфы
+    paragraphs = [p for p in paragraphs if len(p) > MIN_PARAGRAPH_LENGTH]
+    text = "\n\n".join(paragraphs).strip()
+    if not text:
+        log.debug("❌ Текст извлечен, но пустой после фильтрации")
+    return text
+
+
+# Очистка HTML и мусора
+def clean_text(text: str) -> str:
+    text = re.sub(r'<[^>]+>', '', text)  # удаляем все HTML-теги
+    text = html.unescape(text)  # заменяем HTML-сущности на символы
+    text = re.sub(r'\s+\n', '\n', text)  # убираем лишние пробелы перед переносами
+    text = re.sub(r'\n{3,}', '\n\n', text)  # максимум 2 переноса подряд
+    return text.strip()
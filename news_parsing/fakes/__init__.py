@@ -0,0 +1 @@
+# Локальные заглушки внешних сервисов для ручной проверки и нагрузочных прогонов
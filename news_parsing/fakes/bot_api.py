@@ -0,0 +1,214 @@
+"""
+Заглушка Telegram Bot API: принимает вызовы бота (/bot<token>/<метод>), отвечает
+правдоподобными объектами и отдаёт обновления через getUpdates (long polling).
+
+Админы-автоматы: на каждую карточку модерации с inline-кнопками заглушка через
+--click-delay секунд «нажимает» первую подходящую кнопку из --auto-click
+(по умолчанию: одобрить сырую → опубликовать на сайт и в канал).
+
+Запуск:
+    python -m fakes.bot_api --port 8081 --admins 1001 1002 --delay 0.05
+
+В config.py:
+    TELEGRAM_API_URL = "http://127.0.0.1:8081"
+    ADMINS = [1001, 1002]
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from aiohttp import web
+
+DEFAULT_AUTO_CLICK = ("approve_raw|", "both|")
+BOT_USER = {"id": 100000, "is_bot": True, "first_name": "FakeNewsBot", "username": "fake_news_bot"}
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024  # лимит Bot API на загрузку файлов
+
+
+@web.middleware
+async def telegram_errors(request: web.Request, handler):
+    """Ошибки в формате Bot API: aiogram разбирает JSON, а не HTML-страницу aiohttp"""
+    try:
+        return await handler(request)
+    except web.HTTPException as e:
+        if e.status < 400:
+            raise
+        description = "Request Entity Too Large" if e.status == 413 else e.reason
+        return web.json_response({"ok": False, "error_code": e.status, "description": description},
+                                 status=e.status)
+    except (KeyError, ValueError) as e:
+        # Не хватает параметра или он не того вида — Telegram отвечает 400
+        return web.json_response({"ok": False, "error_code": 400, "description": f"Bad Request: {e}"}, status=400)
+    except Exception as e:
+        return web.json_response({"ok": False, "error_code": 500, "description": f"Internal Server Error: {e}"},
+                                 status=500)
+
+
+def make_app(admins: tuple = (1001,), delay: float = 0.0, click_delay: float = 0.5,
+             auto_click: tuple = DEFAULT_AUTO_CLICK, clickers: int = 1) -> web.Application:
+    """clickers — сколько админов нажимают кнопку (больше одного — гонка за карточку)"""
+    app = web.Application(client_max_size=MAX_UPLOAD_SIZE, middlewares=[telegram_errors])
+    app["settings"] = {
+        "admins": [int(admin) for admin in admins],
+        "delay": delay,
+        "click_delay": click_delay,
+        "auto_click": tuple(auto_click),
+        "clickers": clickers,
+    }
+    app["stats"] = {"calls": {}, "messages": 0, "photos": 0, "channel_posts": 0, "clicks": 0, "updates_sent": 0}
+    app["state"] = {"message_id": 0, "photo_id": 0, "update_id": 0, "callback_id": 0}
+    app["updates"] = []  # неотданные обновления
+    app["new_update"] = asyncio.Event()
+    app["clicked"] = set()  # (chat_id, callback_data) — одну кнопку нажимаем один раз
+    app["tasks"] = set()
+
+    def next_id(key: str) -> int:
+        app["state"][key] += 1
+        return app["state"][key]
+
+    def chat_object(chat_id: int) -> dict:
+        if chat_id > 0:
+            return {"id": chat_id, "type": "private", "first_name": f"Admin {chat_id}"}
+        return {"id": chat_id, "type": "channel", "title": "Fake channel"}
+
+    def message_object(chat_id: int, message_id: int, params: dict) -> dict:
+        message = {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": chat_object(chat_id),
+            "from": BOT_USER,
+        }
+        if params.get("text"):
+            message["text"] = params["text"]
+        if params.get("caption"):
+            message["caption"] = params["caption"]
+        if params.get("reply_markup"):
+            message["reply_markup"] = json.loads(params["reply_markup"])
+        return message
+
+    def push_update(update: dict):
+        update["update_id"] = next_id("update_id")
+        app["updates"].append(update)
+        app["new_update"].set()
+
+    async def click(chat_id: int, message: dict, data: str):
+        await asyncio.sleep(app["settings"]["click_delay"])
+        app["stats"]["clicks"] += 1
+        push_update({"callback_query": {
+            "id": str(next_id("callback_id")),
+            "from": {"id": chat_id, "is_bot": False, "first_name": f"Admin {chat_id}"},
+            "chat_instance": str(chat_id),
+            "message": message,
+            "data": data,
+        }})
+
+    def maybe_click(chat_id: int, message: dict):
+        settings = app["settings"]
+        if chat_id not in settings["admins"][:settings["clickers"]]:
+            return
+        buttons = [button.get("callback_data", "")
+                   for row in message.get("reply_markup", {}).get("inline_keyboard", []) for button in row]
+        for prefix in settings["auto_click"]:
+            data = next((item for item in buttons if item.startswith(prefix)), None)
+            if data and (chat_id, data) not in app["clicked"]:
+                app["clicked"].add((chat_id, data))
+                task = asyncio.create_task(click(chat_id, message, data))
+                app["tasks"].add(task)
+                task.add_done_callback(app["tasks"].discard)
+                return
+
+    def send_message(params: dict) -> dict:
+        chat_id = int(params["chat_id"])
+        message = message_object(chat_id, next_id("message_id"), params)
+        app["stats"]["messages"] += 1
+        if chat_id not in app["settings"]["admins"]:
+            app["stats"]["channel_posts"] += 1
+        maybe_click(chat_id, message)
+        return message
+
+    def send_photo(params: dict) -> dict:
+        chat_id = int(params["chat_id"])
+        message = message_object(chat_id, next_id("message_id"), params)
+        # Строка — повторная отправка по file_id, иначе файл загружен заново
+        file_id = params["photo"] if isinstance(params.get("photo"), str) else f"fake-photo-{next_id('photo_id')}"
+        message["photo"] = [{"file_id": file_id, "file_unique_id": file_id, "width": 1280, "height": 853}]
+        app["stats"]["photos"] += 1
+        if chat_id not in app["settings"]["admins"]:
+            app["stats"]["channel_posts"] += 1
+        return message
+
+    def edit_message(params: dict) -> dict:
+        chat_id = int(params["chat_id"])
+        message = message_object(chat_id, int(params["message_id"]), params)
+        message["edit_date"] = int(time.time())
+        maybe_click(chat_id, message)
+        return message
+
+    async def get_updates(params: dict) -> list:
+        offset = int(params.get("offset") or 0)
+        timeout = float(params.get("timeout") or 0)
+        app["updates"] = [update for update in app["updates"] if update["update_id"] >= offset]
+        if not app["updates"] and timeout:
+            app["new_update"].clear()
+            try:
+                await asyncio.wait_for(app["new_update"].wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        limit = int(params.get("limit") or 100)
+        updates = app["updates"][:limit]
+        app["stats"]["updates_sent"] += len(updates)
+        return updates
+
+    methods = {
+        "getme": lambda params: BOT_USER,
+        "sendmessage": send_message,
+        "sendphoto": send_photo,
+        "editmessagetext": edit_message,
+        "editmessagecaption": edit_message,
+        "editmessagereplymarkup": edit_message,
+    }
+
+    async def handle_method(request: web.Request):
+        method = request.match_info["method"].lower()
+        stats = request.app["stats"]
+        stats["calls"][method] = stats["calls"].get(method, 0) + 1
+        params = dict(await request.post())
+        params.update(request.query)
+
+        if method == "getupdates":
+            return web.json_response({"ok": True, "result": await get_updates(params)})
+
+        if request.app["settings"]["delay"]:
+            await asyncio.sleep(request.app["settings"]["delay"])
+        handler = methods.get(method)
+        # Остальные методы (answerCallbackQuery, deleteMessages, deleteWebhook...) просто успешны
+        result = handler(params) if handler else True
+        return web.json_response({"ok": True, "result": result})
+
+    async def get_stats(request: web.Request):
+        return web.json_response(request.app["stats"])
+
+    app.router.add_post("/bot{token}/{method}", handle_method)
+    app.router.add_get("/bot{token}/{method}", handle_method)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заглушка Telegram Bot API с автоматическими админами")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--admins", type=int, nargs="+", default=[1001], help="ID админов из config.ADMINS")
+    parser.add_argument("--delay", type=float, default=0.0, help="задержка ответа на каждый вызов, сек")
+    parser.add_argument("--click-delay", type=float, default=0.5, help="через сколько админ нажимает кнопку, сек")
+    parser.add_argument("--auto-click", nargs="*", default=list(DEFAULT_AUTO_CLICK),
+                        help="префиксы callback_data в порядке предпочтения; пусто — не нажимать")
+    parser.add_argument("--clickers", type=int, default=1, help="сколько админов нажимают одновременно")
+    args = parser.parse_args()
+
+    app = make_app(args.admins, args.delay, args.click_delay, args.auto_click, args.clickers)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Синтетические RSS-ленты и страницы статей: N лент по M записей, у каждой записи —
+HTML-страница с текстом в <article>, которую находит extraction.py.
+
+Запуск:
+    python -m fakes.feed_server --port 8083 --feeds 5 --items 20
+
+Ленты: http://127.0.0.1:8083/feeds/0.xml ... /feeds/4.xml (добавляются через /addsite)
+"""
+import argparse
+import asyncio
+import random
+import time
+from email.utils import formatdate
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+
+TOPICS = ["урожай пшеницы", "экспорт зерна", "субсидии фермерам", "цены на удобрения",
+          "животноводство", "орошение полей", "сельхозтехника", "посевная кампания"]
+REGIONS = ["Акмолинской", "Костанайской", "Северо-Казахстанской", "Алматинской", "Туркестанской"]
+
+
+def article_paragraphs(feed: int, item: int, count: int) -> list:
+    """Текст статьи детерминирован номером ленты и записи"""
+    rnd = random.Random(feed * 100003 + item)
+    topic = rnd.choice(TOPICS)
+    paragraphs = []
+    for number in range(count):
+        region = rnd.choice(REGIONS)
+        value = rnd.randint(3, 95)
+        paragraphs.append(
+            f"В {region} области тема «{topic}» снова в центре внимания: по данным управления сельского "
+            f"хозяйства, показатель изменился на {value}% по сравнению с прошлым годом. Абзац {number + 1} "
+            f"материала {feed}-{item} описывает меры поддержки и планы аграриев на сезон."
+        )
+    return paragraphs
+
+
+def article_title(feed: int, item: int) -> str:
+    topic = random.Random(feed * 100003 + item).choice(TOPICS)
+    return f"Лента {feed}, новость {item}: {topic}"
+
+
+def make_app(feeds: int = 5, items: int = 20, paragraphs: int = 6, delay: float = 0.0) -> web.Application:
+    app = web.Application()
+    app["settings"] = {"feeds": feeds, "items": items, "paragraphs": paragraphs, "delay": delay}
+    app["stats"] = {"feed_requests": 0, "article_requests": 0}
+    # Записи «опубликованы» с интервалом в минуту до старта сервера — от этого считается свежесть
+    app["published_at"] = time.time()
+
+    async def get_feed(request: web.Request):
+        settings = request.app["settings"]
+        feed = int(request.match_info["feed"])
+        if feed >= settings["feeds"]:
+            raise web.HTTPNotFound()
+        request.app["stats"]["feed_requests"] += 1
+        await asyncio.sleep(settings["delay"])
+
+        base = f"http://{request.host}"
+        entries = []
+        for item in range(settings["items"]):
+            summary = article_paragraphs(feed, item, 1)[0]
+            entries.append(
+                "<item>"
+                f"<title>{escape(article_title(feed, item))}</title>"
+                f"<link>{base}/articles/{feed}/{item}.html</link>"
+                f"<guid>{base}/articles/{feed}/{item}.html</guid>"
+                f"<description>{escape('<p>' + summary + '</p>')}</description>"
+                f"<pubDate>{formatdate(request.app['published_at'] - item * 60, usegmt=True)}</pubDate>"
+                "</item>"
+            )
+        body = (
+            '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+            f"<title>Синтетическая лента {feed}</title><link>{base}/</link>"
+            "<description>Нагрузочный прогон</description>"
+            f"{''.join(entries)}</channel></rss>"
+        )
+        return web.Response(text=body, content_type="application/rss+xml")
+
+    async def get_article(request: web.Request):
+        settings = request.app["settings"]
+        feed = int(request.match_info["feed"])
+        item = int(request.match_info["item"])
+        if feed >= settings["feeds"] or item >= settings["items"]:
+            raise web.HTTPNotFound()
+        request.app["stats"]["article_requests"] += 1
+        await asyncio.sleep(settings["delay"])
+
+        text = "".join(f"<p>{escape(p)}</p>" for p in article_paragraphs(feed, item, settings["paragraphs"]))
+        body = (
+            f"<html><head><title>{escape(article_title(feed, item))}</title></head><body>"
+            "<header><nav><a href='/'>Главная</a></nav></header>"
+            f"<article><h1>{escape(article_title(feed, item))}</h1>{text}</article>"
+            "<footer><p>© Синтетическое агентство новостей, все права защищены</p></footer>"
+            "</body></html>"
+        )
+        return web.Response(text=body, content_type="text/html")
+
+    async def get_stats(request: web.Request):
+        return web.json_response(request.app["stats"])
+
+    app.router.add_get("/feeds/{feed:\\d+}.xml", get_feed)
+    app.router.add_get("/articles/{feed:\\d+}/{item:\\d+}.html", get_article)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Синтетические RSS-ленты и статьи")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8083)
+    parser.add_argument("--feeds", type=int, default=5)
+    parser.add_argument("--items", type=int, default=20, help="записей в каждой ленте")
+    parser.add_argument("--paragraphs", type=int, default=6, help="абзацев в статье")
+    parser.add_argument("--delay", type=float, default=0.0, help="задержка ответа, сек")
+    args = parser.parse_args()
+
+    web.run_app(make_app(args.feeds, args.items, args.paragraphs, args.delay), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
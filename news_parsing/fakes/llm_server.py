@@ -0,0 +1,107 @@
+"""
+Фейковый OpenAI-совместимый сервер (/v1/chat/completions) для проверки
+устойчивости LLM-вызовов: настраиваемые задержки, ошибки 5xx и 429 с Retry-After.
+
+Запуск:
+    python -m fakes.llm_server --port 8000 --delay 0.5 --jitter 1.5 --error-rate 0.2 --rate-limit-rate 0.1
+
+В config.py:
+    LLM_PROVIDERS = ["local", "extractive"]
+    LOCAL_LLM_URL = "http://127.0.0.1:8000/v1"
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+
+from aiohttp import web
+
+
+def make_app(delay: float = 0.2, jitter: float = 0.0, error_rate: float = 0.0,
+             rate_limit_rate: float = 0.0, retry_after: float = 1.0, stream_chunk_delay: float = 0.02) -> web.Application:
+    """Собирает приложение; параметры можно менять на лету через app["settings"]"""
+    app = web.Application()
+    app["settings"] = {
+        "delay": delay,
+        "jitter": jitter,
+        "error_rate": error_rate,
+        "rate_limit_rate": rate_limit_rate,
+        "retry_after": retry_after,
+        "stream_chunk_delay": stream_chunk_delay,
+    }
+    app["stats"] = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    def fake_rewrite(prompt: str) -> str:
+        # Берём заголовки статей из промпта, чтобы ответ был правдоподобным
+        titles = re.findall(r"Заголовок: (.+)", prompt)
+        if "### СТАТЬЯ" in prompt:
+            items = [{"id": i, "text": f"{title}\n\nПереписанный текст новости {i}."}
+                     for i, title in enumerate(titles, 1)]
+            return json.dumps({"items": items}, ensure_ascii=False)
+        title = titles[-1] if titles else "Новость"
+        return f"{title}\n\nПереписанный текст новости. Факты сохранены, формулировки изменены."
+
+    async def chat_completions(request: web.Request):
+        settings = request.app["settings"]
+        stats = request.app["stats"]
+        stats["requests"] += 1
+        body = await request.json()
+
+        await asyncio.sleep(settings["delay"] + random.uniform(0, settings["jitter"]))
+
+        roll = random.random()
+        if roll < settings["rate_limit_rate"]:
+            stats["rate_limited"] += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit"}}, status=429,
+                headers={"Retry-After": str(settings["retry_after"])}
+            )
+        if roll < settings["rate_limit_rate"] + settings["error_rate"]:
+            stats["errors"] += 1
+            return web.json_response({"error": {"message": "Internal error"}}, status=500)
+
+        content = fake_rewrite(body["messages"][-1]["content"])
+        usage = {"prompt_tokens": len(body["messages"][-1]["content"]) // 4, "completion_tokens": len(content) // 4}
+
+        if not body.get("stream"):
+            return web.json_response({
+                "choices": [{"message": {"role": "assistant", "content": content}}],
+                "usage": usage
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for word in re.split(r"(\s+)", content):
+            chunk = {"choices": [{"delta": {"content": word}}]}
+            await response.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            await asyncio.sleep(settings["stream_chunk_delay"])
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def get_stats(request: web.Request):
+        return web.json_response(request.app["stats"])
+
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_post("/chat/completions", chat_completions)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Фейковый OpenAI-совместимый LLM-сервер")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--delay", type=float, default=0.2, help="базовая задержка ответа, сек")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, сек")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="значение Retry-After для 429")
+    args = parser.parse_args()
+
+    app = make_app(args.delay, args.jitter, args.error_rate, args.rate_limit_rate, args.retry_after)
+    web.run_app(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
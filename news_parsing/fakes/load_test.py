@@ -0,0 +1,317 @@
+"""
+Сквозной нагрузочный прогон конвейера без внешних сервисов.
+
+Поднимает локальные заглушки (Bot API с автоматическими админами, OpenAI-совместимый
+DeepSeek с настраиваемой задержкой, API сайта, синтетические RSS-ленты), направляет
+на них бота, парсер и site_client и прогоняет N лент × M записей через весь путь:
+лента → очередь → сырая карточка → одобрение → рерайт → обработанная карточка →
+публикация в канал и на сайт. Очередь разбирается без 30-секундной паузы
+планировщика — меряется пропускная способность самого конвейера.
+
+Результат — JSON: новостей в секунду, задержки этапов (p50/p95/max по трассам
+tracing.py) и счётчики заглушек. База, трассы и лог прогона — во временной папке.
+
+Запуск (из папки news_parsing):
+    python -m fakes.load_test --feeds 5 --items 10 --llm-delay 0.5 --output load.json
+    python -m fakes.load_test --feeds 2 --items 5 --speculative --targets telegram
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from aiohttp import web
+
+from fakes import bot_api, feed_server, llm_server, site_api
+
+# Какую кнопку жмёт админ на обработанной карточке
+TARGET_BUTTONS = {"both": "both|", "telegram": "approve|", "site": "site|"}
+TARGET_SPANS = {"both": ["publish.telegram", "publish.site"], "telegram": ["publish.telegram"],
+                "site": ["publish.site"]}
+STAGES = ["feed.enqueue", "moderation.raw_sent", "rewrite", "moderation.processed_sent",
+          "publish.telegram", "publish.site"]
+CHANNEL_ID = -1001000000001
+
+
+class FakeServices:
+    """
+    Заглушки в отдельном потоке со своим event loop: requests и feedparser в парсере
+    синхронные и блокируют основной loop — заглушки должны отвечать и в это время
+    """
+
+    def __init__(self, factories: dict):
+        self.factories = factories  # имя -> функция, создающая aiohttp-приложение
+        self.apps = {}
+        self.urls = {}
+        self._runners = []
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fakes", daemon=True)
+
+    async def _start(self):
+        for name, factory in self.factories.items():
+            app = factory()
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.TCPSite(runner, "127.0.0.1", 0).start()
+            port = runner.addresses[0][1]
+            self.apps[name] = app
+            self.urls[name] = f"http://127.0.0.1:{port}"
+            self._runners.append(runner)
+
+    async def _stats(self) -> dict:
+        return {name: json.loads(json.dumps(app["stats"])) for name, app in self.apps.items()}
+
+    async def _stop(self):
+        for runner in self._runners:
+            await runner.cleanup()
+
+    def start(self) -> dict:
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self.urls
+
+    def stats(self) -> dict:
+        return asyncio.run_coroutine_threadsafe(self._stats(), self._loop).result()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def configure(args, urls: dict, workdir: str, images_dir: str):
+    """Настройки прогона; должны быть заданы до импорта модулей бота — они читают config при импорте"""
+    import config
+
+    settings = {
+        "BOT_TOKEN": "123456:LOAD-TEST-TOKEN",
+        "ADMINS": args.admins,
+        "CHANNEL_ID": CHANNEL_ID,
+        "TELEGRAM_API_URL": urls["bot_api"],
+        "SITE_URL": urls["site_api"],
+        "SITE_API_URL": f"{urls['site_api']}/api",
+        "SITE_LOGIN": "load-test@example.com",
+        "SITE_PASSWORD": "load-test",
+        "DEEPSEEK_BASE_URL": urls["llm"],
+        "DEEPSEEK_KEY": "load-test",
+        "LLM_PROVIDERS": ["deepseek", "extractive"],
+        "SPECULATIVE_REWRITE": args.speculative,
+        "DEEPSEEK_STREAMING": args.streaming,
+        "TRANSLATION_PROVIDER": "stub",
+        "TRANSLATION_STUB_DELAY": args.translation_delay,
+        "IMAGES_DIR": images_dir,
+        "METRICS_ENABLED": False,
+        "TRACE_FILE": os.path.join(workdir, "traces.jsonl"),
+        "OUTBOX_POLL_INTERVAL": 1,
+        "LOG_FILE": "",
+    }
+    for name, value in settings.items():
+        setattr(config, name, value)
+
+
+def _percentile(ordered: list, fraction: float) -> float:
+    """Перцентиль методом ближайшего ранга"""
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(values: list) -> dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "p50_sec": round(_percentile(ordered, 0.50), 3),
+        "p95_sec": round(_percentile(ordered, 0.95), 3),
+        "max_sec": round(ordered[-1], 3),
+    }
+
+
+def stage_latencies(traces: dict, target: str) -> dict:
+    """Длительности этапов и ожидания между ними по трассам всех новостей"""
+    durations = {name: [] for name in STAGES}
+    waits = {"queue_wait": [], "admin_raw": [], "rewrite_wait": [], "admin_processed": [], "publish_wait": [],
+             "end_to_end": []}
+
+    def first(spans, name, key="start"):
+        return next((item[key] for item in spans if item["name"] == name and item["status"] == "ok"), None)
+
+    def gap(bucket, start, end):
+        if start is not None and end is not None:
+            waits[bucket].append(end - start)
+
+    for spans in traces.values():
+        for item in spans:
+            if item["name"] in durations and item["status"] == "ok":
+                durations[item["name"]].append(item["end"] - item["start"])
+
+        published = [first(spans, name, "end") for name in TARGET_SPANS[target]]
+        publish_starts = [first(spans, name) for name in TARGET_SPANS[target]]
+        gap("queue_wait", first(spans, "feed.enqueue", "end"), first(spans, "moderation.raw_sent"))
+        gap("admin_raw", first(spans, "moderation.raw_sent", "end"), first(spans, "moderation.approved"))
+        gap("rewrite_wait", first(spans, "moderation.approved"), first(spans, "rewrite"))
+        gap("admin_processed", first(spans, "moderation.processed_sent", "end"), first(spans, "publish.requested"))
+        if None not in publish_starts:
+            gap("publish_wait", first(spans, "publish.requested"), min(publish_starts))
+        if None not in published:
+            gap("end_to_end", first(spans, "feed.enqueue"), max(published))
+
+    return {
+        "stages": {name: summarize(values) for name, values in durations.items()},
+        "waits": {name: summarize(values) for name, values in waits.items()},
+    }
+
+
+async def run_pipeline(args, urls: dict) -> dict:
+    # Импорт только после configure()
+    from bot import dp, bot, initialize
+    from database import add_site
+    from parser import parse_feed_and_process, process_multiple_from_queue
+    from outbox import get_outbox_stats, stop_publisher
+    from jobs import stop_job_workers, get_job_stats
+    from tracing import get_trace, stop_tracing
+    from llm_providers import router as llm_router
+    from site_client import site_client
+    import news_sender
+
+    await initialize()
+    feeds = [f"{urls['feeds']}/feeds/{feed}.xml" for feed in range(args.feeds)]
+    for url in feeds:
+        await add_site(url)
+    links = [f"{urls['feeds']}/articles/{feed}/{item}.html" for feed in range(args.feeds) for item in range(args.items)]
+    expected = len(links) * len(TARGET_SPANS[args.targets])
+
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=1))
+    started = time.time()
+
+    async def ingest():
+        # Ленты читаются по очереди, как в scheduler()
+        for url in feeds:
+            await parse_feed_and_process(url, limit=args.items)
+        return time.time()
+
+    ingest_task = asyncio.create_task(ingest())
+    outbox = {}
+    timed_out = False
+    try:
+        while True:
+            await process_multiple_from_queue()
+            outbox = await get_outbox_stats()
+            if ingest_task.done() and outbox["sent"] + outbox["dead"] >= expected:
+                break
+            if time.time() - started > args.timeout:
+                timed_out = True
+                break
+            await asyncio.sleep(0.05)
+        ingest_finished = await ingest_task if ingest_task.done() else None
+        finished = time.time()
+        jobs = await get_job_stats()
+    finally:
+        ingest_task.cancel()
+        await dp.stop_polling()
+        await asyncio.gather(polling, ingest_task, return_exceptions=True)
+        await stop_job_workers()
+        await stop_publisher()
+        await stop_tracing()
+        await llm_router.close()
+        await site_client.close()
+        await news_sender.bot.session.close()
+
+    traces = {link: await get_trace(link) for link in links}
+    completed = sum(
+        all(any(item["name"] == name and item["status"] == "ok" for item in spans) for name in TARGET_SPANS[args.targets])
+        for spans in traces.values()
+    )
+    elapsed = finished - started
+    return {
+        "items": len(links),
+        "published": completed,
+        "timed_out": timed_out,
+        "elapsed_sec": round(elapsed, 2),
+        "items_per_sec": round(completed / elapsed, 3) if elapsed else 0.0,
+        "ingest_sec": round(ingest_finished - started, 2) if ingest_finished else None,
+        "outbox": outbox,
+        "jobs": jobs,
+        **stage_latencies(traces, args.targets),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сквозной нагрузочный прогон конвейера на локальных заглушках")
+    parser.add_argument("--feeds", type=int, default=3, help="сколько RSS-лент")
+    parser.add_argument("--items", type=int, default=5, help="записей в каждой ленте")
+    parser.add_argument("--admins", type=int, nargs="+", default=[1001, 1002])
+    parser.add_argument("--clickers", type=int, default=1, help="сколько админов жмут кнопки (больше 1 — гонка)")
+    parser.add_argument("--click-delay", type=float, default=0.2, help="реакция админа, сек")
+    parser.add_argument("--targets", choices=sorted(TARGET_BUTTONS), default="both", help="куда публиковать")
+    parser.add_argument("--llm-delay", type=float, default=0.5, help="задержка ответа DeepSeek, сек")
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--telegram-delay", type=float, default=0.0, help="задержка каждого вызова Bot API, сек")
+    parser.add_argument("--site-delay", type=float, default=0.05, help="задержка API сайта, сек")
+    parser.add_argument("--feed-delay", type=float, default=0.0, help="задержка лент и статей, сек")
+    parser.add_argument("--translation-delay", type=float, default=0.0, help="задержка заглушки перевода, сек")
+    parser.add_argument("--speculative", action="store_true", help="включить SPECULATIVE_REWRITE")
+    parser.add_argument("--streaming", action="store_true", help="включить DEEPSEEK_STREAMING")
+    parser.add_argument("--images", default="images", help="папка с картинками для новостей")
+    parser.add_argument("--timeout", type=float, default=300, help="предел длительности прогона, сек")
+    parser.add_argument("--workdir", help="папка для news.db, трасс и лога (по умолчанию — временная)")
+    parser.add_argument("--output", help="записать JSON в файл (по умолчанию — в stdout)")
+    parser.add_argument("--verbose", action="store_true", help="выводить лог конвейера, а не писать в файл")
+    args = parser.parse_args()
+
+    images_dir = os.path.abspath(args.images)
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="news_load_")
+    os.makedirs(workdir, exist_ok=True)
+
+    services = FakeServices({
+        "bot_api": lambda: bot_api.make_app(args.admins, args.telegram_delay, args.click_delay,
+                                            ("approve_raw|", TARGET_BUTTONS[args.targets]), args.clickers),
+        "llm": lambda: llm_server.make_app(args.llm_delay, args.llm_jitter, args.llm_error_rate),
+        "site_api": lambda: site_api.make_app(args.site_delay),
+        "feeds": lambda: feed_server.make_app(args.feeds, args.items, delay=args.feed_delay),
+    })
+    urls = services.start()
+    print(f"🧪 Заглушки: {json.dumps(urls)}", file=sys.stderr)
+    print(f"📁 Рабочая папка: {workdir}", file=sys.stderr)
+
+    configure(args, urls, workdir, images_dir)
+    # news.db, варианты картинок и трассы создаются в рабочей папке, а не рядом с боевой базой
+    os.chdir(workdir)
+    log_path = os.path.join(workdir, "pipeline.log")
+    try:
+        with open(log_path, "w", encoding="utf-8") as log_file, \
+                (contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(log_file)):
+            from logs import setup_logging, stop_logging
+            setup_logging()
+            try:
+                report = asyncio.run(run_pipeline(args, urls))
+            finally:
+                stop_logging()
+        report["fakes"] = services.stats()
+    finally:
+        services.stop()
+
+    report["settings"] = {key: value for key, value in vars(args).items() if key not in ("output", "verbose")}
+    report["workdir"] = workdir
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"💾 Результаты записаны в {output}", file=sys.stderr)
+    else:
+        print(text)
+    print(f"📊 {report['published']}/{report['items']} новостей за {report['elapsed_sec']} сек — "
+          f"{report['items_per_sec']} новостей/сек (лог: {log_path})", file=sys.stderr)
+    if report["timed_out"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
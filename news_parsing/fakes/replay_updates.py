@@ -0,0 +1,56 @@
+"""
+Отправляет записанные обновления Telegram на локальный вебхук бота —
+проверка обработчиков без Telegram.
+
+Файл — JSON-массив обновлений или JSON Lines (одно обновление в строке),
+в том виде, в каком их присылает Telegram (getUpdates / вебхук).
+
+Запуск (бот в режиме BOT_MODE = "webhook"):
+    python -m fakes.replay_updates fakes/sample_updates.json --secret "$(cat webhook_secret.txt)"
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import aiohttp
+
+
+def load_updates(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        content = f.read().strip()
+    if content.startswith("["):
+        return json.loads(content)
+    return [json.loads(line) for line in content.splitlines() if line.strip()]
+
+
+async def replay(url: str, secret: str, updates: list, delay: float = 0.0) -> list:
+    """POST каждого обновления на url; возвращает список (update_id, статус, мс)"""
+    headers = {"X-Telegram-Bot-Api-Secret-Token": secret} if secret else {}
+    results = []
+    async with aiohttp.ClientSession() as session:
+        for update in updates:
+            started = time.perf_counter()
+            async with session.post(url, json=update, headers=headers) as response:
+                await response.read()
+                elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+                results.append((update.get("update_id"), response.status, elapsed_ms))
+                print(f"📨 update {update.get('update_id')}: HTTP {response.status}, {elapsed_ms} мс")
+            if delay:
+                await asyncio.sleep(delay)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Повтор записанных обновлений Telegram на вебхук")
+    parser.add_argument("file", help="JSON-массив или JSON Lines с обновлениями")
+    parser.add_argument("--url", default="http://127.0.0.1:8080/telegram/webhook")
+    parser.add_argument("--secret", default="", help="значение WEBHOOK_SECRET бота")
+    parser.add_argument("--delay", type=float, default=0.0, help="пауза между обновлениями, сек")
+    args = parser.parse_args()
+
+    asyncio.run(replay(args.url, args.secret, load_updates(args.file), args.delay))
+
+
+if __name__ == "__main__":
+    main()
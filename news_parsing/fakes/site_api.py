@@ -0,0 +1,106 @@
+"""
+Заглушка API сайта: /auth/login, /upload/image и /content/news в том виде,
+в каком их ждут site_client.py и site_poster.py. Токен проверяется, новости и
+картинки только считаются.
+
+Запуск:
+    python -m fakes.site_api --port 8082 --delay 0.1 --error-rate 0.05
+
+В config.py:
+    SITE_API_URL = "http://127.0.0.1:8082/api"
+"""
+import argparse
+import asyncio
+import random
+import secrets
+
+from aiohttp import web
+
+MAX_UPLOAD_SIZE = 50 * 1024 * 1024  # картинки-оригиналы больше стандартного лимита aiohttp в 1 МБ
+
+
+def make_app(delay: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+             token_ttl: int = 3600) -> web.Application:
+    app = web.Application(client_max_size=MAX_UPLOAD_SIZE)
+    app["settings"] = {"delay": delay, "jitter": jitter, "error_rate": error_rate, "token_ttl": token_ttl}
+    app["stats"] = {"logins": 0, "uploads": 0, "uploaded_bytes": 0, "news": 0, "errors": 0, "unauthorized": 0}
+    app["tokens"] = set()
+
+    async def pause(request: web.Request):
+        settings = request.app["settings"]
+        await asyncio.sleep(settings["delay"] + random.uniform(0, settings["jitter"]))
+
+    def failed(request: web.Request) -> bool:
+        if random.random() < request.app["settings"]["error_rate"]:
+            request.app["stats"]["errors"] += 1
+            return True
+        return False
+
+    def authorized(request: web.Request) -> bool:
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if token in request.app["tokens"]:
+            return True
+        request.app["stats"]["unauthorized"] += 1
+        return False
+
+    async def login(request: web.Request):
+        await pause(request)
+        body = await request.json()
+        if not body.get("email") or not body.get("password"):
+            return web.json_response({"message": "Неверные учётные данные"}, status=422)
+        token = secrets.token_urlsafe(24)
+        request.app["tokens"].add(token)
+        request.app["stats"]["logins"] += 1
+        return web.json_response({"access_token": token, "expires_in": request.app["settings"]["token_ttl"]})
+
+    async def upload_image(request: web.Request):
+        if not authorized(request):
+            return web.json_response({"message": "Unauthenticated."}, status=401)
+        form = await request.post()
+        await pause(request)
+        if failed(request):
+            return web.json_response({"message": "Server error"}, status=500)
+        image = form.get("image")
+        if image is None or isinstance(image, str):
+            return web.json_response({"message": "Поле image обязательно"}, status=422)
+        stats = request.app["stats"]
+        stats["uploads"] += 1
+        stats["uploaded_bytes"] += len(image.file.read())
+        return web.json_response({"data": {"path": f"/storage/tmp/images/fake-{stats['uploads']}.jpg"}})
+
+    async def create_news(request: web.Request):
+        if not authorized(request):
+            return web.json_response({"message": "Unauthenticated."}, status=401)
+        payload = await request.json()
+        await pause(request)
+        if failed(request):
+            return web.json_response({"message": "Server error"}, status=500)
+        if not payload.get("title") or not payload.get("description"):
+            return web.json_response({"message": "Заголовок обязателен"}, status=422)
+        request.app["stats"]["news"] += 1
+        return web.json_response({"data": {"id": request.app["stats"]["news"]}}, status=201)
+
+    async def get_stats(request: web.Request):
+        return web.json_response(request.app["stats"])
+
+    app.router.add_post("/api/auth/login", login)
+    app.router.add_post("/api/upload/image", upload_image)
+    app.router.add_post("/api/content/news", create_news)
+    app.router.add_get("/stats", get_stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заглушка API сайта")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8082)
+    parser.add_argument("--delay", type=float, default=0.0, help="базовая задержка ответа, сек")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, сек")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500 на загрузку и создание")
+    args = parser.parse_args()
+
+    web.run_app(make_app(args.delay, args.jitter, args.error_rate), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+import hashlib
+import os
+
+# Хеши файлов по (путь, mtime, размер), чтобы не перечитывать картинку при каждой публикации
+_file_hashes = {}
+
+
+def file_sha256(path: str) -> str:
+    stat = os.stat(path)
+    key = (path, stat.st_mtime, stat.st_size)
+    if key not in _file_hashes:
+        with open(path, "rb") as f:
+            _file_hashes[key] = hashlib.sha256(f.read()).hexdigest()
+    return _file_hashes[key]
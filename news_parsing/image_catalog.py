@@ -0,0 +1,180 @@
+import os
+import random
+import threading
+import time
+
+import config
+from hashing import file_sha256
+
+try:
+    from PIL import Image
+except ImportError:  # без Pillow отправляются оригиналы
+    Image = None
+
+# Каталог картинок: папка сканируется один раз и повторно — только когда она изменилась.
+# Для каждой картинки заранее готовятся уменьшенные JPEG-варианты: для Telegram (он всё равно
+# ужимает фото до 1280 px) и для сайта. Варианты лежат на диске под хэшем содержимого
+# и после перезапуска не пересчитываются. Пересканирование идёт в фоновом потоке,
+# поиск картинки читает только готовый снимок каталога
+IMAGES_DIR = getattr(config, "IMAGES_DIR", "images")
+IMAGE_VARIANTS_DIR = getattr(config, "IMAGE_VARIANTS_DIR", "image_variants")
+IMAGE_CATALOG_CHECK_INTERVAL = getattr(config, "IMAGE_CATALOG_CHECK_INTERVAL", 30)  # сек между проверками папки
+IMAGE_JPEG_QUALITY = getattr(config, "IMAGE_JPEG_QUALITY", 85)
+IMAGE_VARIANTS = {
+    "telegram": getattr(config, "IMAGE_TELEGRAM_MAX_SIDE", 1280),
+    "site": getattr(config, "IMAGE_SITE_MAX_SIDE", 1600),
+}
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+def _make_variant(path: str, content_hash: str, kind: str, max_side: int, info: dict):
+    """Путь к варианту картинки; None — вариант не нужен (оригинал и так меньше)"""
+    target = os.path.join(IMAGE_VARIANTS_DIR, f"{content_hash[:24]}_{kind}.jpg")
+    if not os.path.exists(target):
+        with Image.open(path) as image:
+            image = image.convert("RGB")
+            image.thumbnail((max_side, max_side))
+            os.makedirs(IMAGE_VARIANTS_DIR, exist_ok=True)
+            tmp = f"{target}.tmp"
+            image.save(tmp, "JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+            os.replace(tmp, target)
+
+    if os.path.getsize(target) >= info["size"]:
+        return None
+    return target
+
+
+def _describe(path: str) -> dict:
+    """Метаданные картинки и её варианты"""
+    stat = os.stat(path)
+    info = {
+        "path": path,
+        "hash": file_sha256(path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "width": None,
+        "height": None,
+        "variants": {},
+        "variant_sizes": {},
+    }
+    if Image is None:
+        return info
+
+    try:
+        with Image.open(path) as image:
+            info["width"], info["height"] = image.size
+        for kind, max_side in IMAGE_VARIANTS.items():
+            variant = _make_variant(path, info["hash"], kind, max_side, info)
+            if variant:
+                info["variants"][kind] = variant
+                info["variant_sizes"][kind] = os.path.getsize(variant)
+    except Exception as e:
+        print(f"⚠️ Не удалось подготовить варианты {path}: {e}")
+    return info
+
+
+class ImageCatalog:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._images = {}  # путь -> метаданные
+        self._paths = []
+        self._dir_mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"scans": 0}
+
+    def refresh(self, force: bool = False):
+        """Пересканирует папку, если она изменилась (не чаще IMAGE_CATALOG_CHECK_INTERVAL); блокирующий вызов"""
+        now = time.monotonic()
+        if not force and self._dir_mtime is not None and now - self._checked_at < IMAGE_CATALOG_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        self._rescan(force)
+
+    def _refresh_in_background(self):
+        # Хэши и варианты Pillow считаются в отдельном потоке — поиск картинки из event loop
+        # читает текущий снимок каталога и никогда не ждёт пересканирования
+        now = time.monotonic()
+        if now - self._checked_at < IMAGE_CATALOG_CHECK_INTERVAL or self._lock.locked():
+            return
+        self._checked_at = now
+        threading.Thread(target=self._rescan, name="image-catalog", daemon=True).start()
+
+    def _rescan(self, force: bool = False):
+        with self._lock:
+            try:
+                mtime = os.stat(self.directory).st_mtime_ns
+            except FileNotFoundError:
+                self._images, self._paths, self._dir_mtime = {}, [], None
+                return
+            if not force and mtime == self._dir_mtime:
+                return
+
+            paths = sorted(
+                os.path.join(self.directory, name) for name in os.listdir(self.directory)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+            images = {}
+            for path in paths:
+                known = self._images.get(path)
+                try:
+                    stat = os.stat(path)
+                    if known and (known["size"], known["mtime"]) == (stat.st_size, stat.st_mtime_ns):
+                        images[path] = known
+                    else:
+                        images[path] = _describe(path)
+                except OSError as e:
+                    print(f"⚠️ Картинка недоступна {path}: {e}")
+
+            self._images, self._paths, self._dir_mtime = images, list(images), mtime
+            self.stats["scans"] += 1
+            print(f"🖼️ Каталог картинок: {len(images)} шт.")
+
+    def pick_random(self):
+        """Путь к случайной картинке из текущего снимка или None, если папка пуста"""
+        self._refresh_in_background()
+        paths = self._paths
+        return random.choice(paths) if paths else None
+
+    def get(self, path: str):
+        self._refresh_in_background()
+        return self._images.get(path)
+
+    def variant(self, path: str, kind: str) -> str:
+        """Путь к варианту для kind ("telegram" / "site"), если он есть, иначе к оригиналу"""
+        info = self.get(path)
+        variant = info["variants"].get(kind) if info else None
+        if variant and os.path.exists(variant):
+            return variant
+        return path
+
+
+catalog = ImageCatalog(IMAGES_DIR)
+
+
+def refresh_image_catalog():
+    """Полное сканирование при запуске — вызывать через asyncio.to_thread"""
+    catalog.refresh(force=True)
+
+
+def pick_random_image():
+    return catalog.pick_random()
+
+
+def image_variant(path: str, kind: str) -> str:
+    return catalog.variant(path, kind)
+
+
+def get_image_catalog_stats() -> dict:
+    images = list(catalog._images.values())
+    return {
+        "images": len(images),
+        "scans": catalog.stats["scans"],
+        "bytes_original": sum(info["size"] for info in images),
+        **{
+            f"bytes_{kind}": sum(
+                info["variant_sizes"].get(kind, info["size"]) for info in images
+            )
+            for kind in IMAGE_VARIANTS
+        },
+    }
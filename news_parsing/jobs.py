@@ -0,0 +1,142 @@
+import asyncio
+import json
+
+import config
+from database import add_job, get_job, update_job, get_unfinished_jobs, get_job_counts, cleanup_old_jobs
+from news_sender import notify_admin
+
+# Медленная работа по кнопкам (DeepSeek, сайт, загрузка фото) выполняется в фоне:
+# обработчик только ставит задачу, задачи хранятся в news.db и продолжаются после перезапуска
+JOB_WORKERS = getattr(config, "JOB_WORKERS", 2)
+JOB_MAX_ATTEMPTS = getattr(config, "JOB_MAX_ATTEMPTS", 3)
+JOB_RETRY_DELAY = getattr(config, "JOB_RETRY_DELAY", 10)  # сек, растёт с каждой попыткой
+
+_handlers = {}
+_failure_handlers = {}
+_queue = None
+_workers = []
+_stats = {"done": 0, "failed": 0, "retried": 0}
+
+
+def job_handler(kind: str):
+    """Регистрирует обработчик задач вида kind: async def handler(job) -> None"""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def job_failure_handler(kind: str):
+    """Регистрирует обработчик окончательной неудачи: async def handler(job, error) -> None.
+    Он возвращает новость в состояние, из которого действие можно повторить"""
+    def decorator(func):
+        _failure_handlers[kind] = func
+        return func
+    return decorator
+
+
+async def _on_failure(job: dict, error: Exception):
+    handler = _failure_handlers.get(job["kind"])
+    if not handler:
+        return
+    try:
+        await handler(job, error)
+    except Exception as e:
+        print(f"❌ Ошибка обработки неудачи задачи #{job['id']}: {e}")
+
+
+async def enqueue_job(kind: str, payload: dict, admin_id: int = None, dedup_key: str = None):
+    """Ставит задачу в очередь; возвращает ID или None, если такая задача уже выполняется"""
+    job_id = await add_job(kind, json.dumps(payload, ensure_ascii=False), admin_id, dedup_key)
+    if job_id is not None and _queue is not None:
+        _queue.put_nowait(job_id)
+        print(f"🧾 Задача #{job_id} ({kind}) поставлена в очередь")
+    return job_id
+
+
+async def save_job_progress(job: dict):
+    """Сохраняет промежуточное состояние, чтобы после перезапуска не повторять сделанные шаги"""
+    await update_job(job["id"], payload=json.dumps(job["payload"], ensure_ascii=False))
+
+
+async def _run_job(job_id: int):
+    row = await get_job(job_id)
+    if not row or row[4] not in ("queued", "running"):
+        return
+
+    _, kind, payload, admin_id, _, attempts = row
+    handler = _handlers.get(kind)
+    if not handler:
+        print(f"❌ Нет обработчика для задачи #{job_id} ({kind})")
+        await update_job(job_id, status="failed", error="unknown job kind")
+        return
+
+    job = {"id": job_id, "kind": kind, "payload": json.loads(payload), "admin_id": admin_id}
+    await update_job(job_id, status="running", increment_attempts=True)
+    try:
+        await handler(job)
+        await update_job(job_id, status="done")
+        _stats["done"] += 1
+    except Exception as e:
+        attempts += 1
+        if attempts < JOB_MAX_ATTEMPTS:
+            delay = JOB_RETRY_DELAY * attempts
+            print(f"⚠️ Задача #{job_id} ({kind}) упала: {e}. Повтор через {delay} сек")
+            await update_job(job_id, status="queued", error=str(e))
+            _stats["retried"] += 1
+            asyncio.get_running_loop().call_later(delay, _queue.put_nowait, job_id)
+        else:
+            print(f"❌ Задача #{job_id} ({kind}) не выполнена после {attempts} попыток: {e}")
+            await update_job(job_id, status="failed", error=str(e))
+            _stats["failed"] += 1
+            if admin_id:
+                notify_admin(admin_id, f"❌ Фоновая задача не выполнена: {e}")
+            await _on_failure(job, e)
+
+
+async def _worker():
+    while True:
+        job_id = await _queue.get()
+        try:
+            await _run_job(job_id)
+        except Exception as e:
+            print(f"❌ Ошибка обработчика задач: {e}")
+        finally:
+            _queue.task_done()
+
+
+async def start_job_workers():
+    """Запускает пул исполнителей и возобновляет задачи, прерванные перезапуском"""
+    global _queue
+    if _workers:
+        return
+
+    _queue = asyncio.Queue()
+    await cleanup_old_jobs()
+    unfinished = await get_unfinished_jobs()
+    for job_id in unfinished:
+        _queue.put_nowait(job_id)
+    if unfinished:
+        print(f"🔁 Возобновлено {len(unfinished)} незавершённых задач")
+
+    for _ in range(JOB_WORKERS):
+        _workers.append(asyncio.create_task(_worker()))
+    print(f"✅ Запущено {JOB_WORKERS} исполнителей фоновых задач")
+
+
+async def stop_job_workers():
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
+
+
+async def get_job_stats() -> dict:
+    counts = await get_job_counts()
+    return {
+        "queued": counts.get("queued", 0),
+        "running": counts.get("running", 0),
+        "failed": counts.get("failed", 0),
+        "done": _stats["done"],
+        "retried": _stats["retried"],
+    }
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import re
+import sqlite3
+import time
+from contextlib import closing
+
+import config
+from database import DB_NAME
+
+# Кэш ответов LLM: одинаковые (заголовок, текст, промпт, модель) не отправляются
+# в API повторно — ни при ретраях, ни после рестарта, ни для дублей из разных лент.
+# Работает синхронно (sqlite3); из асинхронного кода вызывается через asyncio.to_thread
+LLM_CACHE_ENABLED = getattr(config, "LLM_CACHE_ENABLED", True)
+LLM_CACHE_TTL = getattr(config, "LLM_CACHE_TTL", 7 * 24 * 3600)  # секунд
+LLM_CACHE_MAX_ENTRIES = getattr(config, "LLM_CACHE_MAX_ENTRIES", 2000)
+
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def make_cache_key(title: str, body: str, prompt_version: str, model: str) -> str:
+    """Хэш нормализованных входных данных + версия промпта + модель"""
+    payload = json.dumps(
+        [prompt_version, model, _normalize(title), _normalize(body)],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _connect():
+    return sqlite3.connect(DB_NAME, timeout=10)
+
+
+def get_cached_response(key: str):
+    """Возвращает сохранённый ответ или None (просроченные записи не отдаются)"""
+    if not LLM_CACHE_ENABLED:
+        return None
+
+    now = time.time()
+    try:
+        with closing(_connect()) as db:
+            row = db.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND created_at > ?",
+                (key, now - LLM_CACHE_TTL)
+            ).fetchone()
+            if row:
+                # Обновляем время использования для LRU-вытеснения
+                db.execute("UPDATE llm_cache SET last_used_at = ? WHERE key = ?", (now, key))
+                db.commit()
+    except sqlite3.Error as e:
+        print(f"⚠️ Кэш LLM недоступен: {e}")
+        row = None
+
+    if row:
+        _stats["hits"] += 1
+        return row[0]
+
+    _stats["misses"] += 1
+    return None
+
+
+def has_cached_response(key: str) -> bool:
+    """Проверка наличия ответа без учёта в статистике попаданий"""
+    if not LLM_CACHE_ENABLED:
+        return False
+
+    try:
+        with closing(_connect()) as db:
+            row = db.execute(
+                "SELECT 1 FROM llm_cache WHERE key = ? AND created_at > ?",
+                (key, time.time() - LLM_CACHE_TTL)
+            ).fetchone()
+    except sqlite3.Error:
+        return False
+    return row is not None
+
+
+def store_response(key: str, response: str):
+    """Сохраняет ответ и вытесняет просроченные/самые старые записи"""
+    if not LLM_CACHE_ENABLED or not response:
+        return
+
+    now = time.time()
+    try:
+        with closing(_connect()) as db:
+            db.execute("""
+                INSERT OR REPLACE INTO llm_cache (key, response, created_at, last_used_at)
+                VALUES (?, ?, ?, ?)
+            """, (key, response, now, now))
+            expired = db.execute(
+                "DELETE FROM llm_cache WHERE created_at <= ?", (now - LLM_CACHE_TTL,)
+            ).rowcount
+            overflow = db.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache
+                    ORDER BY last_used_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+            """, (LLM_CACHE_MAX_ENTRIES,)).rowcount
+            db.commit()
+        _stats["stores"] += 1
+        _stats["evictions"] += expired + overflow
+    except sqlite3.Error as e:
+        print(f"⚠️ Не удалось сохранить ответ LLM в кэш: {e}")
+
+
+def get_llm_cache_stats() -> dict:
+    return dict(_stats)
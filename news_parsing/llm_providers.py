@@ -0,0 +1,438 @@
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+
+import aiohttp
+
+import config
+from metrics import LLM_REQUEST_SECONDS, LLM_TOKENS
+
+# Провайдеры рерайта: DeepSeek, любой OpenAI-совместимый сервер (например, локальный
+# мок) и офлайн-суммаризатор. Роутер перебирает их с учётом задержек и общего дедлайна,
+# поэтому рерайт завершается вовремя даже при недоступном API
+DEEPSEEK_BASE_URL = getattr(config, "DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+DEEPSEEK_MODEL = "deepseek-chat"
+SYSTEM_PROMPT = "Ты — редактор новостного портала."
+
+LLM_PROVIDERS = getattr(config, "LLM_PROVIDERS", ["deepseek", "extractive"])
+LOCAL_LLM_URL = getattr(config, "LOCAL_LLM_URL", "http://127.0.0.1:8000/v1")
+LOCAL_LLM_MODEL = getattr(config, "LOCAL_LLM_MODEL", "local-model")
+LOCAL_LLM_KEY = getattr(config, "LOCAL_LLM_KEY", "")
+LLM_DEADLINE = getattr(config, "LLM_DEADLINE", 30)  # секунд на весь рерайт
+# Провайдер медленнее порога (по скользящему среднему) уходит в конец очереди
+LLM_SLOW_THRESHOLD = getattr(config, "LLM_SLOW_THRESHOLD", 15)
+LLM_FAILURE_COOLDOWN = getattr(config, "LLM_FAILURE_COOLDOWN", 60)
+# Устойчивость вызовов: повторы с джиттером в пределах дедлайна и "хеджирование" —
+# второй параллельный запрос, если первый дольше p95 задержки провайдера
+LLM_MAX_RETRIES = getattr(config, "LLM_MAX_RETRIES", 2)
+LLM_BACKOFF_BASE = getattr(config, "LLM_BACKOFF_BASE", 0.5)  # секунд
+LLM_BACKOFF_MAX = getattr(config, "LLM_BACKOFF_MAX", 8)
+LLM_HEDGE = getattr(config, "LLM_HEDGE", True)
+LLM_HEDGE_MIN_SAMPLES = getattr(config, "LLM_HEDGE_MIN_SAMPLES", 20)
+EXTRACTIVE_MAX_WORDS = 100
+
+
+class LLMResponseError(Exception):
+    """Провайдер ответил, но без текста (ошибка API, лимиты и т.п.)"""
+
+
+class LLMTransientError(LLMResponseError):
+    """Временный сбой (5xx, обрыв соединения) — запрос имеет смысл повторить"""
+
+
+class LLMRateLimitError(LLMTransientError):
+    """429 Too Many Requests; retry_after — сколько секунд просит подождать сервер"""
+
+    def __init__(self, message: str, retry_after: float = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _check_status(name: str, status: int, headers, text: str):
+    """Переводит HTTP-статус ответа в исключение нужного типа"""
+    if status == 429:
+        try:
+            retry_after = float(headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            retry_after = None
+        raise LLMRateLimitError(f"{name}: 429 Too Many Requests", retry_after)
+    if status >= 500:
+        raise LLMTransientError(f"{name} ERROR: {status} {text[:200]}")
+    if status != 200:
+        raise LLMResponseError(f"{name} ERROR: {status} {text[:200]}")
+
+
+class LLMProvider(ABC):
+    """Базовый интерфейс провайдера рерайта"""
+    name = "base"
+
+    @abstractmethod
+    async def rewrite(self, title: str, body: str, prompt: str, timeout: float) -> str:
+        """Возвращает переписанный текст новости или бросает LLMResponseError"""
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Любой сервер с API /chat/completions в формате OpenAI"""
+
+    def __init__(self, name: str, base_url: str, api_key: str, model: str):
+        self.name = name
+        self.url = f"{base_url.rstrip('/')}/chat/completions"
+        self.api_key = api_key
+        self.model = model
+        self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Одна сессия на провайдера — соединения к API переиспользуются
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    def _payload(self, prompt: str, **extra) -> dict:
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            **extra
+        }
+
+    def _headers(self) -> dict:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def _observe(self, started: float, outcome: str, usage: dict = None):
+        LLM_REQUEST_SECONDS.observe(time.monotonic() - started, provider=self.name, outcome=outcome)
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage and usage.get(kind):
+                LLM_TOKENS.inc(usage[kind], provider=self.name, kind=kind.split("_")[0])
+
+    async def complete(self, prompt: str, timeout: float, **extra) -> str:
+        started = time.monotonic()
+        try:
+            async with self._get_session().post(
+                self.url,
+                headers=self._headers(),
+                json=self._payload(prompt, **extra),
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                text = await response.text()
+                _check_status(self.name, response.status, response.headers, text)
+                data = json.loads(text)
+        except BaseException as e:
+            self._observe(started, type(e).__name__)
+            raise
+        self._observe(started, "ok", data.get("usage"))
+
+        if "choices" in data and len(data["choices"]) > 0:
+            message = data["choices"][0].get("message", {})
+            return message.get("content", "")
+        raise LLMResponseError(f"{self.name} ERROR: {data}")
+
+    async def stream(self, prompt: str, timeout: float, on_text=None) -> str:
+        """Потоковый ответ (SSE). on_text получает накопленный текст после каждого фрагмента"""
+        chunks = []
+        started = time.monotonic()
+        try:
+            await self._stream_into(chunks, prompt, timeout, on_text)
+        except BaseException as e:
+            self._observe(started, type(e).__name__)
+            raise
+        self._observe(started, "ok")
+
+        if not chunks:
+            raise LLMResponseError(f"{self.name} ERROR: пустой поток")
+        return "".join(chunks)
+
+    async def _stream_into(self, chunks: list, prompt: str, timeout: float, on_text):
+        async with self._get_session().post(
+            self.url,
+            headers=self._headers(),
+            json=self._payload(prompt, stream=True),
+            timeout=aiohttp.ClientTimeout(total=timeout)
+        ) as response:
+            if response.status != 200:
+                _check_status(self.name, response.status, response.headers, await response.text())
+
+            # Формат SSE: строки "data: {...}", конец потока — "data: [DONE]"
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+
+                choices = json.loads(payload).get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    chunks.append(delta)
+                    if on_text:
+                        await on_text("".join(chunks))
+
+    async def rewrite(self, title: str, body: str, prompt: str, timeout: float) -> str:
+        return await self.complete(prompt, timeout)
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+
+class DeepSeekProvider(OpenAICompatibleProvider):
+    def __init__(self):
+        super().__init__("deepseek", DEEPSEEK_BASE_URL, getattr(config, "DEEPSEEK_KEY", ""), DEEPSEEK_MODEL)
+
+
+class ExtractiveProvider(LLMProvider):
+    """Офлайн-суммаризатор в духе TextRank: выбирает ключевые предложения статьи"""
+    name = "extractive"
+
+    _sentence_re = re.compile(r"(?<=[.!?…])\s+")
+    _word_re = re.compile(r"\w+")
+
+    def _similarity(self, a: set, b: set) -> float:
+        # Мера схожести предложений из оригинальной статьи TextRank
+        if len(a) < 2 or len(b) < 2:
+            return 0.0
+        return len(a & b) / (math.log(len(a)) + math.log(len(b)))
+
+    def summarize(self, title: str, body: str, max_words: int = EXTRACTIVE_MAX_WORDS) -> str:
+        sentences = [s.strip() for s in self._sentence_re.split(body or "") if len(s.strip()) > 20]
+        if not sentences:
+            return title
+
+        words = [{w.lower() for w in self._word_re.findall(s) if len(w) > 3} for s in sentences]
+        count = len(sentences)
+        weights = [[self._similarity(words[i], words[j]) if i != j else 0.0 for j in range(count)]
+                   for i in range(count)]
+        totals = [sum(row) or 1.0 for row in weights]
+
+        # Степенной метод для PageRank по графу схожести предложений
+        scores = [1.0] * count
+        for _ in range(30):
+            scores = [0.15 + 0.85 * sum(weights[j][i] / totals[j] * scores[j] for j in range(count))
+                      for i in range(count)]
+
+        selected = []
+        used = 0
+        for index in sorted(range(count), key=lambda i: scores[i], reverse=True):
+            length = len(sentences[index].split())
+            if selected and used + length > max_words:
+                continue
+            selected.append(index)
+            used += length
+
+        summary = " ".join(sentences[i] for i in sorted(selected))
+        return f"{title}\n\n{summary}"
+
+    async def rewrite(self, title: str, body: str, prompt: str, timeout: float) -> str:
+        return self.summarize(title, body)
+
+
+class LLMRouter:
+    """Выбирает провайдера по задержкам и ошибкам, укладываясь в общий дедлайн"""
+
+    def __init__(self, providers: list, fallback: LLMProvider = None):
+        self.providers = providers
+        self.fallback = fallback
+        self._latency = {}  # name -> скользящее среднее задержки, сек
+        self._samples = {}  # name -> последние задержки для оценки p95
+        self._down_until = {}  # name -> время, до которого провайдер считается упавшим
+        self.stats = {}
+
+    def _count(self, name: str, event: str):
+        counters = self.stats.setdefault(name, {
+            "ok": 0, "error": 0, "timeout": 0,
+            "retries": 0, "rate_limited": 0, "hedged": 0, "hedge_won": 0
+        })
+        counters[event] += 1
+
+    def _record(self, name: str, outcome: str, elapsed: float = None):
+        self._count(name, outcome)
+        if outcome == "ok":
+            previous = self._latency.get(name)
+            self._latency[name] = elapsed if previous is None else 0.7 * previous + 0.3 * elapsed
+            self._samples.setdefault(name, deque(maxlen=100)).append(elapsed)
+            self._down_until.pop(name, None)
+        else:
+            self._down_until[name] = time.monotonic() + LLM_FAILURE_COOLDOWN
+
+    def p95(self, name: str):
+        """95-й перцентиль задержки провайдера или None, если замеров мало"""
+        samples = self._samples.get(name)
+        if not samples or len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def ordered(self) -> list:
+        """Порядок из конфига, но упавшие и медленные провайдеры — в конце"""
+        now = time.monotonic()
+
+        def penalty(provider):
+            if self._down_until.get(provider.name, 0) > now:
+                return 2
+            if self._latency.get(provider.name, 0) > LLM_SLOW_THRESHOLD:
+                return 1
+            return 0
+
+        return sorted(self.providers, key=penalty)
+
+    @property
+    def primary(self):
+        ordered = self.ordered()
+        return ordered[0] if ordered else None
+
+    async def _hedged(self, provider, call, budget: float):
+        """
+        Выполняет call(timeout). Если ответа нет дольше p95 — запускает второй такой же
+        запрос и возвращает первый успешный; оставшийся отменяется
+        """
+        hedge_after = self.p95(provider.name) if LLM_HEDGE else None
+        first = asyncio.create_task(call(budget))
+        tasks = {first}
+        try:
+            if hedge_after is None or hedge_after >= budget:
+                return await first
+
+            done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+            if not done:
+                self._count(provider.name, "hedged")
+                tasks.add(asyncio.create_task(call(budget - hedge_after)))
+
+            last_error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self._count(provider.name, "hedge_won")
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": случайная пауза до экспоненциального предела
+        return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+    async def _attempt(self, provider, call, remaining: float):
+        """Вызов провайдера с повторами, учётом Retry-After и хеджированием в пределах remaining"""
+        finish_at = time.monotonic() + remaining
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            budget = finish_at - time.monotonic()
+            if budget <= 0:
+                break
+
+            started = time.monotonic()
+            try:
+                result = await asyncio.wait_for(self._hedged(provider, call, budget), timeout=budget)
+            except asyncio.TimeoutError:
+                self._record(provider.name, "timeout")
+                print(f"⏱️ {provider.name}: не уложился в {remaining:.1f} сек")
+                return None
+            except LLMRateLimitError as e:
+                self._count(provider.name, "rate_limited")
+                delay = e.retry_after if e.retry_after is not None else self._backoff(attempt)
+                print(f"🚦 {provider.name}: лимит запросов, пауза {delay:.1f} сек")
+            except (LLMTransientError, aiohttp.ClientError) as e:
+                delay = self._backoff(attempt)
+                print(f"⚠️ {provider.name}: временная ошибка ({e}), повтор через {delay:.1f} сек")
+            except Exception as e:
+                self._record(provider.name, "error")
+                print(f"❌ Ошибка провайдера {provider.name}: {e}")
+                return None
+            else:
+                if not result or not result.strip():
+                    self._record(provider.name, "error")
+                    return None
+                self._record(provider.name, "ok", time.monotonic() - started)
+                return result
+
+            # Повторяем, только если пауза и хоть какой-то запрос укладываются в дедлайн
+            if attempt == LLM_MAX_RETRIES or time.monotonic() + delay >= finish_at:
+                break
+            self._count(provider.name, "retries")
+            await asyncio.sleep(delay)
+
+        self._record(provider.name, "error")
+        return None
+
+    async def complete(self, prompt: str, deadline: float = LLM_DEADLINE, **extra):
+        """Запрос к чат-моделям (без офлайн-запаса). Возвращает (текст, провайдер)"""
+        finish_at = time.monotonic() + deadline
+        for provider in self.ordered():
+            remaining = finish_at - time.monotonic()
+            if remaining <= 0:
+                break
+            result = await self._attempt(
+                provider, lambda timeout: provider.complete(prompt, timeout, **extra), remaining
+            )
+            if result:
+                return result, provider.name
+        raise LLMResponseError("Ни один провайдер не ответил вовремя")
+
+    async def rewrite(self, title: str, body: str, prompt: str, deadline: float = LLM_DEADLINE,
+                      allow_fallback: bool = True):
+        """
+        Рерайт с перебором провайдеров. Если все чат-модели недоступны или не успевают,
+        результат даёт офлайн-суммаризатор. Возвращает (текст, провайдер)
+        """
+        finish_at = time.monotonic() + deadline
+        for provider in self.ordered():
+            remaining = finish_at - time.monotonic()
+            if remaining <= 0:
+                break
+            result = await self._attempt(
+                provider, lambda timeout: provider.rewrite(title, body, prompt, timeout), remaining
+            )
+            if result:
+                return result, provider.name
+
+        if allow_fallback and self.fallback:
+            print(f"🧩 Используем запасной провайдер {self.fallback.name}")
+            return await self.fallback.rewrite(title, body, prompt, deadline), self.fallback.name
+        raise LLMResponseError("Ни один провайдер не ответил вовремя")
+
+    async def close(self):
+        for provider in self.providers:
+            if hasattr(provider, "close"):
+                await provider.close()
+
+    def get_stats(self) -> dict:
+        return {
+            name: {
+                **counters,
+                "latency": round(self._latency.get(name, 0.0), 2),
+                "p95": round(self.p95(name) or 0.0, 2)
+            }
+            for name, counters in self.stats.items()
+        }
+
+
+def build_router() -> LLMRouter:
+    """Собирает роутер по списку LLM_PROVIDERS из config.py"""
+    providers = []
+    fallback = None
+    for name in LLM_PROVIDERS:
+        if name == "deepseek":
+            providers.append(DeepSeekProvider())
+        elif name == "local":
+            providers.append(OpenAICompatibleProvider("local", LOCAL_LLM_URL, LOCAL_LLM_KEY, LOCAL_LLM_MODEL))
+        elif name == "extractive":
+            fallback = ExtractiveProvider()
+        else:
+            print(f"⚠️ Неизвестный LLM-провайдер в конфиге: {name}")
+    return LLMRouter(providers, fallback)
+
+
+router = build_router()
@@ -0,0 +1,152 @@
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+import config
+
+# Структурированные логи с уровнями. Запись в stdout/файл идёт в отдельном потоке
+# (QueueHandler → QueueListener), поэтому event loop не ждёт вывода.
+# Частые события (по селектору, по статье) прореживаются: пишется одно из LOG_SAMPLE_EVERY
+LOG_LEVEL = getattr(config, "LOG_LEVEL", "INFO")
+LOG_FORMAT = getattr(config, "LOG_FORMAT", "text")  # text | json
+LOG_FILE = getattr(config, "LOG_FILE", "")
+LOG_SAMPLE_EVERY = getattr(config, "LOG_SAMPLE_EVERY", 20)
+# Полные тексты, заголовки и тела ответов API — только по явному включению (уровень DEBUG)
+LOG_VERBOSE_DUMPS = getattr(config, "LOG_VERBOSE_DUMPS", False)
+LOG_QUEUE_SIZE = 10000
+
+ROOT_LOGGER = "news"
+
+_listener = None
+_stats = {"dropped": 0, "sampled_out": 0}
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def fields(**values) -> dict:
+    """extra для записи со структурированными полями: log.info("...", extra=fields(url=url))"""
+    return {"fields": values}
+
+
+def sampled(key: str, **values) -> dict:
+    """extra для частого события: из каждых LOG_SAMPLE_EVERY записей с тем же key пишется одна"""
+    return {"fields": values, "sample_key": key}
+
+
+def dumps_enabled(logger: logging.Logger) -> bool:
+    """Нужно ли собирать подробный дамп (его подготовка сама по себе не бесплатна)"""
+    return LOG_VERBOSE_DUMPS and logger.isEnabledFor(logging.DEBUG)
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counters = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample_key", None)
+        # Предупреждения и ошибки не прореживаются
+        if key is None or record.levelno >= logging.WARNING:
+            return True
+        count = self._counters.get(key, 0)
+        self._counters[key] = count + 1
+        if count % self.every == 0:
+            if count:
+                record.msg = f"{record.msg} (×{self.every})"
+            return True
+        _stats["sampled_out"] += 1
+        return False
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        line = f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:<7} {record.name}: {record.getMessage()}"
+        extra = getattr(record, "fields", None)
+        if extra:
+            line += " " + " ".join(f"{key}={value}" for key, value in extra.items())
+        if record.exc_text:
+            line += "\n" + record.exc_text
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """При переполненной очереди запись отбрасывается, а не блокирует event loop"""
+
+    def prepare(self, record):
+        # Сообщение и трассировка сохраняются раздельно, чтобы форматтер в потоке вывел их по-своему
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _stats["dropped"] += 1
+
+
+def setup_logging():
+    """Подключает очередь логов к корневому логгеру; повторный вызов ничего не делает"""
+    global _listener
+    if _listener:
+        return
+
+    formatter = JsonFormatter() if LOG_FORMAT == "json" else TextFormatter()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if LOG_FILE:
+        handlers.append(logging.FileHandler(LOG_FILE, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(LOG_QUEUE_SIZE)
+    queue_handler = _DroppingQueueHandler(log_queue)
+    # Фильтр на обработчике очереди — отброшенные записи даже не форматируются
+    queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_EVERY))
+
+    root = logging.getLogger()
+    root.addHandler(queue_handler)
+    root.setLevel(logging.WARNING)
+    logging.getLogger(ROOT_LOGGER).setLevel(LOG_LEVEL)
+    logging.getLogger("aiogram").setLevel(LOG_LEVEL)
+    # Строка на каждое обновление Telegram — слишком шумно для INFO
+    logging.getLogger("aiogram.event").setLevel(logging.WARNING)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_logging():
+    """Дописывает накопленные записи при остановке"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+
+def get_log_stats() -> dict:
+    return dict(_stats)
+
@@ -1,12 +1,23 @@
 import asyncio
-from bot import dp, bot
+from bot import dp, bot, initialize
 from parser import scheduler
-import logging
-import sys
+from llm_providers import router as llm_router
+from webhook import BOT_MODE, run_webhook
+from jobs import stop_job_workers
+from outbox import stop_publisher
+from site_client import site_client
+from logs import setup_logging, stop_logging
+from metrics import start_metrics_server
+from tracing import stop_tracing
 
 
 async def main():
+    setup_logging()
     print("🤖 Бот запускается...")
+    # Создаём недостающие таблицы (кэши, очереди) до старта парсера
+    await initialize()
+    metrics_runner = await start_metrics_server()
+
     max_retries = 5
     retry_delay = 5
 
@@ -18,11 +29,16 @@ async def main():
             parser_task = asyncio.create_task(scheduler())
 
             # Запускаем бота
-            await dp.start_polling(
-                bot,
-                handle_signals=False,
-                allowed_updates=dp.resolve_used_update_types()
-            )
+            if BOT_MODE == "webhook":
+                await run_webhook(dp, bot)
+            else:
+                # Активный вебхук мешает getUpdates — снимаем его, если раньше работали через вебхук
+                await bot.delete_webhook()
+                await dp.start_polling(
+                    bot,
+                    handle_signals=False,
+                    allowed_updates=dp.resolve_used_update_types()
+                )
             break
 
         except Exception as e:
@@ -48,6 +64,15 @@ async def main():
         print("✅ Фоновая задача парсера остановлена")
     except Exception as e:
         print(f"⚠️ Ошибка в парсере: {e}")
+    finally:
+        await stop_job_workers()
+        await stop_publisher()
+        await stop_tracing()
+        await llm_router.close()
+        await site_client.close()
+        if metrics_runner:
+            await metrics_runner.cleanup()
+        stop_logging()
 
 
 if __name__ == "__main__":
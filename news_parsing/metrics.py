@@ -0,0 +1,196 @@
+import bisect
+import threading
+import time
+
+from aiohttp import web
+
+import config
+
+# Метрики этапов конвейера в формате Prometheus: счётчики, гистограммы задержек
+# и глубины очередей. Отдаются по HTTP на локальном порту (GET /metrics)
+METRICS_ENABLED = getattr(config, "METRICS_ENABLED", True)
+METRICS_HOST = getattr(config, "METRICS_HOST", "127.0.0.1")
+METRICS_PORT = getattr(config, "METRICS_PORT", 9108)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = {}  # имя -> метрика
+_collectors = []  # async-функции, обновляющие метрики перед выдачей
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: tuple = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labels)
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}" for key, value in items
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def time(self, **labels):
+        """Контекстный менеджер: замеряет длительность блока в секундах"""
+        return _Timer(self, labels)
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self._header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+def _register(metric):
+    # Повторная регистрация (перезагрузка модуля) возвращает уже существующую метрику
+    return _registry.setdefault(metric.name, metric)
+
+
+def counter(name: str, description: str, labels: tuple = ()) -> Counter:
+    return _register(Counter(name, description, labels))
+
+
+def gauge(name: str, description: str, labels: tuple = ()) -> Gauge:
+    return _register(Gauge(name, description, labels))
+
+
+def histogram(name: str, description: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram(name, description, labels, buckets))
+
+
+def metrics_collector(func):
+    """Регистрирует async-функцию, которая обновляет метрики (например, глубину очередей) перед выдачей"""
+    _collectors.append(func)
+    return func
+
+
+async def render_metrics() -> str:
+    for collect in _collectors:
+        try:
+            await collect()
+        except Exception as e:
+            print(f"⚠️ Ошибка сбора метрик {collect.__name__}: {e}")
+    lines = []
+    for metric in _registry.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Метрики этапов конвейера
+FEED_FETCH_SECONDS = histogram("news_feed_fetch_seconds", "Загрузка и разбор RSS-ленты")
+FEED_ENTRIES = counter("news_feed_entries_total", "Записей в загруженных лентах")
+ARTICLE_EXTRACT_SECONDS = histogram(
+    "news_article_extract_seconds", "Загрузка статьи и извлечение текста", ("result",)
+)
+DEDUP_HITS = counter("news_dedup_hits_total", "Новости, пропущенные как уже отправленные или опубликованные", ("stage",))
+QUEUE_DEPTH = gauge("news_queue_depth", "Глубина очередей конвейера", ("queue",))
+LLM_REQUEST_SECONDS = histogram("news_llm_request_seconds", "Запросы к LLM-провайдерам", ("provider", "outcome"))
+LLM_TOKENS = counter("news_llm_tokens_total", "Токены LLM по данным API", ("provider", "kind"))
+TELEGRAM_SEND_SECONDS = histogram(
+    "news_telegram_send_seconds", "Запросы к Bot API с учётом ожидания лимитов", ("priority", "outcome")
+)
+SITE_API_SECONDS = histogram("news_site_api_seconds", "Запросы к API сайта", ("endpoint", "status"))
+
+
+async def _handle_metrics(request: web.Request) -> web.Response:
+    body = await render_metrics()
+    return web.Response(body=body.encode("utf-8"), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+def make_metrics_app() -> web.Application:
+    app = web.Application()
+    app.router.add_get("/metrics", _handle_metrics)
+    return app
+
+
+async def start_metrics_server():
+    """Поднимает HTTP-сервер метрик; возвращает runner для остановки или None, если метрики выключены"""
+    if not METRICS_ENABLED:
+        return None
+    runner = web.AppRunner(make_metrics_app())
+    await runner.setup()
+    await web.TCPSite(runner, METRICS_HOST, METRICS_PORT).start()
+    print(f"📈 Метрики: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    return runner
@@ -0,0 +1,81 @@
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+# Карточка новости у админа живёт в одном сообщении и правится на месте:
+# raw → processing → processed → published / rejected; если рерайт не удался — processing → raw
+CARD_TRANSITIONS = {
+    "raw": {"processing", "rejected"},
+    "processing": {"processed", "raw"},
+    "processed": {"published", "rejected"},
+    "published": set(),
+    "rejected": set(),
+}
+FINAL_CARD_STATES = {"published", "rejected"}
+
+
+def can_transition(current: str, new: str) -> bool:
+    return new in CARD_TRANSITIONS.get(current, set())
+
+
+def _raw_keyboard(card: dict):
+    keyboard = InlineKeyboardBuilder()
+    keyboard.button(text="✅ Одобрить для редактирования", callback_data=f"approve_raw|{card['id']}")
+    keyboard.button(text="❌ Отклонить", callback_data=f"reject_raw|{card['id']}")
+    return keyboard.as_markup()
+
+
+def _processed_keyboard(card: dict):
+    processed_id = card["processed_id"]
+    keyboard = InlineKeyboardBuilder()
+    keyboard.button(text="🌐 На сайт", callback_data=f"site|{processed_id}")
+    keyboard.button(text="✅ В Telegram", callback_data=f"approve|{processed_id}")
+    keyboard.button(text="🚀 Оба", callback_data=f"both|{processed_id}")
+    keyboard.button(text="❌ Отклонить", callback_data=f"reject|{processed_id}")
+    return keyboard.as_markup()
+
+
+def render_card(card: dict):
+    """Возвращает (текст, клавиатура) карточки для её текущего состояния"""
+    state = card["state"]
+    title = card.get("title", "")
+    url = card.get("url", "")
+
+    if state == "raw":
+        text = (
+            f"<b>📰 Сырая новость</b>\n\n"
+            f"<b>📝 Заголовок:</b>\n{title}\n\n"
+            f"<b>📄 Текст новости:</b>\n{card.get('raw_text', '')}\n\n"
+            f"<b>🔗 Источник:</b>\n{url}"
+        )
+        return text, _raw_keyboard(card)
+
+    if state == "processing":
+        text = (
+            f"<b>⏳ DeepSeek переписывает новость</b>\n\n"
+            f"<b>📝 Заголовок:</b>\n{title}\n\n"
+            f"<b>🔗 Источник:</b>\n{url}"
+        )
+        return text, None
+
+    if state == "processed":
+        text = (
+            f"<b>✍️ Обработанная новость</b>\n\n"
+            f"<b>📝 Оригинальный заголовок:</b>\n{title}\n\n"
+            f"<b>📄 Обработанный текст:</b>\n{card.get('text', '')}\n\n"
+            f"<b>🔗 Источник:</b>\n{url}"
+        )
+        return text, _processed_keyboard(card)
+
+    if state == "published":
+        text = (
+            f"<b>{card.get('result') or '✅ Новость опубликована'}</b>\n\n"
+            f"<b>📝 Заголовок:</b>\n{title}\n\n"
+            f"<b>🔗 Источник:</b>\n{url}"
+        )
+        return text, None
+
+    text = (
+        f"<b>{card.get('result') or '❌ Новость отклонена'}</b>\n\n"
+        f"<b>📝 Заголовок:</b>\n{title}\n\n"
+        f"<b>🔗 Источник:</b>\n{url}"
+    )
+    return text, None
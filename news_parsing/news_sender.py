@@ -1,186 +1,424 @@
 import asyncio
-import os
-import random
 import hashlib
+import time
 from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.types import FSInputFile
-from aiogram.utils.keyboard import InlineKeyboardBuilder
-from aiogram.exceptions import TelegramForbiddenError, TelegramNetworkError
+from aiogram.exceptions import TelegramForbiddenError, TelegramNetworkError, TelegramRetryAfter, \
+    TelegramBadRequest
+import config
 from config import BOT_TOKEN, ADMINS
+from database import get_telegram_file_id, store_telegram_file_id, forget_telegram_file_id
+from speculative import start_speculative_rewrite
+from hashing import file_sha256
+from image_catalog import pick_random_image, image_variant
+from moderation_cards import render_card, can_transition, FINAL_CARD_STATES
+from telegram_queue import fan_out, submit, notify, PRIORITY_CHANNEL, PRIORITY_DELETE
 
-bot = Bot(token=BOT_TOKEN)
+# Свой сервер Bot API (или заглушка fakes/bot_api.py); пусто — api.telegram.org
+TELEGRAM_API_URL = getattr(config, "TELEGRAM_API_URL", "")
+
+
+def make_bot() -> Bot:
+    if TELEGRAM_API_URL:
+        return Bot(token=BOT_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)))
+    return Bot(token=BOT_TOKEN)
+
+
+bot = make_bot()
 
 # Глобальные словари для хранения состояний
 pending_raw_news = {}  # Для сырых новостей на одобрение
 pending_processed_news = {}  # Для обработанных новостей на финальную публикацию
 admin_message_ids = {}  # Для хранения ID всех сообщений новости по admin_id
+news_cards = {}  # Состояние карточек модерации по ID сырой новости
+_card_aliases = {}  # ID обработанной новости -> ID карточки
 
+# Как часто (сек.) обновлять сообщение админа при потоковом рерайте — Telegram ограничивает частоту правок
+STREAM_EDIT_INTERVAL = getattr(config, "STREAM_EDIT_INTERVAL", 1.5)
 
-async def send_raw_news_to_admin(title: str, news_text: str, source_url: str):
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            news_id = hashlib.md5(source_url.encode()).hexdigest()
-            pending_raw_news[news_id] = {
-                "url": source_url,
-                "title": title,
-                "text": news_text
-            }
-
-            keyboard = InlineKeyboardBuilder()
-            keyboard.button(text="✅ Одобрить для редактирования", callback_data=f"approve_raw|{news_id}")
-            keyboard.button(text="❌ Отклонить", callback_data=f"reject_raw|{news_id}")
-
-            # Создаем ОДНО сообщение со всей информацией
-            message_text = (
-                f"<b>📰 Сырая новость</b>\n\n"
-                f"<b>📝 Заголовок:</b>\n{title}\n\n"
-                f"<b>📄 Текст новости:</b>\n{news_text}\n\n"
-                f"<b>🔗 Источник:</b>\n{source_url}"
-            )
+DELETE_BATCH_SIZE = 100  # лимит Bot API deleteMessages
+_background_tasks = set()
 
-            # Отправляем ВСЕМ админам
-            sent_to_admins = 0
-            for admin_id in ADMINS:
-                try:
-                    # Инициализируем хранилище сообщений для этого admin_id и news_id
-                    if admin_id not in admin_message_ids:
-                        admin_message_ids[admin_id] = {}
+_photo_stats = {"uploads": 0, "reused": 0, "invalidated": 0}
 
-                    message_ids = []
 
-                    # Отправляем ОДНО текстовое сообщение с кнопками
-                    text_message = await bot.send_message(
-                        admin_id,
-                        message_text,
-                        reply_markup=keyboard.as_markup(),
-                        parse_mode="HTML"
-                    )
-                    message_ids.append(text_message.message_id)
+def _record_delivery(results: dict, news_id: str, label: str) -> int:
+    """Сохраняет ID доставленных сообщений (admin_id -> message_id или ошибка) и печатает итог рассылки"""
+    delivered = 0
+    for admin_id, result in results.items():
+        if isinstance(result, TelegramForbiddenError):
+            print(f"❌ Не удалось отправить админу {admin_id} — он не написал боту.")
+        elif isinstance(result, Exception):
+            print(f"❌ Ошибка отправки админу {admin_id}: {result}")
+        else:
+            # Сохраняем все ID сообщений для этой новости
+            admin_message_ids.setdefault(admin_id, {})[news_id] = [result]
+            print(f"✅ {label} отправлена админу {admin_id}")
+            delivered += 1
 
-                    # Сохраняем все ID сообщений для этой новости
-                    admin_message_ids[admin_id][news_id] = message_ids
+    print(f"📨 {label} доставлена {delivered}/{len(results)} админам")
+    return delivered
 
-                    print(f"✅ Сырая новость отправлена админу {admin_id}")
-                    sent_to_admins += 1
 
-                except TelegramForbiddenError:
-                    print(f"❌ Не удалось отправить админу {admin_id} — он не написал боту.")
-                except Exception as e:
-                    print(f"❌ Ошибка отправки админу {admin_id}: {e}")
-
-            if sent_to_admins > 0:
-                print(f"📨 Сырая новость отправлена {sent_to_admins} админам")
-                break
-
-        except TelegramNetworkError as e:
-            if attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                print(f"⚠️ Ошибка сети, повторная попытка {attempt + 1} через {wait_time} сек...")
-                await asyncio.sleep(wait_time)
-            else:
-                print(f"❌ Не удалось отправить сырую новость после {max_retries} попыток: {e}")
-        except Exception as e:
-            print(f"❌ Критическая ошибка в send_raw_news_to_admin: {e}")
-            break
-async def send_processed_news_to_admin(news_text: str, source_url: str, original_title: str):
+def _only_network_errors(results: dict) -> bool:
+    return bool(results) and all(isinstance(r, TelegramNetworkError) for r in results.values())
+
+
+async def _deliver_to_admins(send_to_admin, news_id: str, label: str) -> int:
+    """
+    Рассылает карточку всем админам параллельно; send_to_admin возвращает ID сообщения.
+    Повторяет, если не дошло никому из-за сети
+    """
     max_retries = 3
     for attempt in range(max_retries):
-        try:
-            # Добавляем случайное изображение для финальной публикации
-            import os
-            import random
-            image_files = os.listdir("images")
-            image_path = os.path.join("images", random.choice(image_files)) if image_files else None
-
-            news_id = hashlib.md5(f"{source_url}_processed".encode()).hexdigest()
-            pending_processed_news[news_id] = {
-                "url": source_url,
-                "text": news_text,
-                "image": image_path  # Добавляем image для публикации
-            }
-
-            keyboard = InlineKeyboardBuilder()
-            keyboard.button(text="🌐 На сайт", callback_data=f"site|{news_id}")
-            keyboard.button(text="✅ В Telegram", callback_data=f"approve|{news_id}")
-            keyboard.button(text="🚀 Оба", callback_data=f"both|{news_id}")
-            keyboard.button(text="❌ Отклонить", callback_data=f"reject|{news_id}")
-
-            # Создаем ОДНО сообщение со всей информацией
-            message_text = (
-                f"<b>✍️ Обработанная новость</b>\n\n"
-                f"<b>📝 Оригинальный заголовок:</b>\n{original_title}\n\n"
-                f"<b>📄 Обработанный текст:</b>\n{news_text}\n\n"
-                f"<b>🔗 Источник:</b>\n{source_url}"
+        results = await fan_out(ADMINS, send_to_admin)
+        delivered = _record_delivery(results, news_id, label)
+        if delivered > 0 or not _only_network_errors(results):
+            return delivered
+
+        if attempt < max_retries - 1:
+            wait_time = 2 ** attempt
+            print(f"⚠️ Ошибка сети, повторная попытка {attempt + 1} через {wait_time} сек...")
+            await asyncio.sleep(wait_time)
+        else:
+            print(f"❌ {label}: не удалось отправить после {max_retries} попыток")
+    return 0
+
+
+async def send_raw_news_to_admin(title: str, news_text: str, source_url: str):
+    try:
+        news_id = hashlib.md5(source_url.encode()).hexdigest()
+        pending_raw_news[news_id] = {
+            "url": source_url,
+            "title": title,
+            "text": news_text
+        }
+        news_cards[news_id] = {
+            "id": news_id,
+            "state": "raw",
+            "title": title,
+            "url": source_url,
+            "raw_text": news_text
+        }
+
+        # Пока админы читают сырую новость, заранее готовим рерайт
+        start_speculative_rewrite(news_id, title, news_text)
+
+        # Создаем ОДНО сообщение со всей информацией — дальше оно правится на месте
+        message_text, markup = render_card(news_cards[news_id])
+
+        async def send_to_admin(admin_id):
+            message = await bot.send_message(
+                admin_id,
+                message_text,
+                reply_markup=markup,
+                parse_mode="HTML"
             )
+            return message.message_id
 
-            # Отправляем ВСЕМ админам
-            sent_to_admins = 0
-            for admin_id in ADMINS:
-                try:
-                    # Инициализируем хранилище сообщений для этого admin_id и news_id
-                    if admin_id not in admin_message_ids:
-                        admin_message_ids[admin_id] = {}
+        # Отправляем ВСЕМ админам одновременно
+        await _deliver_to_admins(send_to_admin, news_id, "Сырая новость")
+
+    except Exception as e:
+        print(f"❌ Критическая ошибка в send_raw_news_to_admin: {e}")
+
+
+def notify_admin(admin_id: int, text: str):
+    """Уведомление одному админу без ожидания отправки"""
+    notify(admin_id, text, bot.send_message)
+
+
+async def broadcast_to_admins(text: str):
+    """Короткое уведомление всем админам; не ждёт отправки, повторы склеиваются в одно сообщение"""
+    for admin_id in ADMINS:
+        notify(admin_id, text, bot.send_message)
+
+
+def get_card_messages(news_id: str) -> dict:
+    """{admin_id: message_id} карточки новости у всех админов, которые её получили"""
+    card_id = _card_aliases.get(news_id, news_id)
+    return {
+        admin_id: news_messages[card_id][0]
+        for admin_id, news_messages in admin_message_ids.items()
+        if news_messages.get(card_id)
+    }
+
+
+async def transition_news_card(news_id: str, state: str, **fields) -> bool:
+    """Переводит карточку в новое состояние и правит её у всех админов вместо удаления и новой отправки"""
+    card_id = _card_aliases.get(news_id, news_id)
+    card = news_cards.get(card_id)
+    if not card:
+        return False
+    if not can_transition(card["state"], state):
+        print(f"⚠️ Недопустимый переход карточки {card_id}: {card['state']} → {state}")
+        return False
+
+    card.update(fields)
+    card["state"] = state
+    text, markup = render_card(card)
+    messages = get_card_messages(card_id)
+
+    results = await fan_out(
+        messages,
+        lambda admin_id: bot.edit_message_text(
+            text,
+            chat_id=admin_id,
+            message_id=messages[admin_id],
+            reply_markup=markup,
+            parse_mode="HTML"
+        )
+    )
+    for admin_id, result in results.items():
+        if isinstance(result, Exception):
+            print(f"⚠️ Не удалось обновить карточку у админа {admin_id}: {result}")
+
+    if state in FINAL_CARD_STATES:
+        _forget_card(card)
+    return True
+
+
+async def finish_news_card(news_id: str, state: str, result: str):
+    """Итог модерации показывается в самой карточке; если её нет — по-старому удаляем и рассылаем статус"""
+    if not await transition_news_card(news_id, state, result=result):
+        delete_news_messages(news_id)
+        await broadcast_to_admins(result)
+
+
+def _forget_card(card: dict):
+    """Карточка завершена: сообщения остаются в чате, но больше не отслеживаются"""
+    news_cards.pop(card["id"], None)
+    for news_id in (card["id"], card.get("processed_id")):
+        _card_aliases.pop(news_id, None)
+        for news_messages in admin_message_ids.values():
+            news_messages.pop(news_id, None)
+
+
+def make_placeholder_updater(placeholders: dict, original_title: str):
+    """Возвращает колбэк для потокового рерайта, который правит заглушки не чаще STREAM_EDIT_INTERVAL"""
+    state = {"last_edit": 0.0, "last_text": ""}
+
+    async def update(text: str):
+        now = time.monotonic()
+        if now - state["last_edit"] < STREAM_EDIT_INTERVAL or text == state["last_text"]:
+            return
+        state["last_edit"] = now
+        state["last_text"] = text
+
+        preview = f"✍️ DeepSeek пишет: {original_title}\n\n{text} ▌"
+        results = await fan_out(
+            placeholders,
+            lambda admin_id: bot.edit_message_text(
+                preview[:4096], chat_id=admin_id, message_id=placeholders[admin_id]
+            )
+        )
+        for admin_id, result in results.items():
+            if isinstance(result, Exception):
+                print(f"⚠️ Не удалось обновить заглушку у админа {admin_id}: {result}")
+
+    return update
 
-                    message_ids = []
 
-                    # Отправляем ОДНО текстовое сообщение с кнопками
-                    text_message = await bot.send_message(
-                        admin_id,
+async def send_processed_news_to_admin(news_text: str, source_url: str, original_title: str, placeholders: dict = None):
+    try:
+        # Добавляем случайное изображение для финальной публикации
+        image_path = pick_random_image()
+
+        news_id = hashlib.md5(f"{source_url}_processed".encode()).hexdigest()
+        card_id = hashlib.md5(source_url.encode()).hexdigest()
+        pending_processed_news[news_id] = {
+            "url": source_url,
+            "text": news_text,
+            "image": image_path  # Добавляем image для публикации
+        }
+
+        card = news_cards.setdefault(card_id, {"id": card_id, "title": original_title, "url": source_url})
+        card.update(state="processed", text=news_text, processed_id=news_id)
+        _card_aliases[news_id] = card_id
+        if placeholders is None:
+            placeholders = get_card_messages(card_id)
+
+        # Создаем ОДНО сообщение со всей информацией
+        message_text, markup = render_card(card)
+
+        async def send_to_admin(admin_id):
+            # Карточка уже есть у админа (сырая новость или потоковый рерайт) — правим её на месте
+            placeholder_id = placeholders.get(admin_id)
+            if placeholder_id:
+                try:
+                    await bot.edit_message_text(
                         message_text,
-                        reply_markup=keyboard.as_markup(),
+                        chat_id=admin_id,
+                        message_id=placeholder_id,
+                        reply_markup=markup,
                         parse_mode="HTML"
                     )
-                    message_ids.append(text_message.message_id)
+                    return placeholder_id
+                except TelegramRetryAfter:
+                    raise
+                except Exception as e:
+                    print(f"⚠️ Не удалось обновить карточку у админа {admin_id}: {e}")
+
+            # Отправляем ОДНО текстовое сообщение с кнопками
+            message = await bot.send_message(
+                admin_id,
+                message_text,
+                reply_markup=markup,
+                parse_mode="HTML"
+            )
+            return message.message_id
 
-                    # Сохраняем все ID сообщений для этой новости
-                    admin_message_ids[admin_id][news_id] = message_ids
+        # Отправляем ВСЕМ админам одновременно
+        delivered = await _deliver_to_admins(send_to_admin, news_id, "Обработанная новость")
+        if delivered:
+            # Новая карточка могла прийти отдельным сообщением — держим ID под обоими ключами
+            for admin_id, news_messages in admin_message_ids.items():
+                if news_id in news_messages:
+                    news_messages[card_id] = news_messages[news_id]
 
-                    print(f"✅ Обработанная новость отправлена админу {admin_id}")
-                    sent_to_admins += 1
+    except Exception as e:
+        print(f"❌ Критическая ошибка в send_processed_news_to_admin: {e}")
 
-                except TelegramForbiddenError:
-                    print(f"❌ Не удалось отправить админу {admin_id} — он не написал боту.")
-                except Exception as e:
-                    print(f"❌ Ошибка отправки админу {admin_id}: {e}")
-
-            if sent_to_admins > 0:
-                print(f"📨 Обработанная новость отправлена {sent_to_admins} админам")
-                break
-
-        except TelegramNetworkError as e:
-            if attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                print(f"⚠️ Ошибка сети, повторная попытка {attempt + 1} через {wait_time} сек...")
-                await asyncio.sleep(wait_time)
-            else:
-                print(f"❌ Не удалось отправить обработанную новость после {max_retries} попыток: {e}")
-        except Exception as e:
-            print(f"❌ Критическая ошибка в send_processed_news_to_admin: {e}")
-            break
-async def delete_news_messages(admin_id: int, news_id: str):
-    """Удаляет все сообщения связанные с конкретной новостью у админа"""
-    try:
-        if admin_id in admin_message_ids and news_id in admin_message_ids[admin_id]:
-            message_ids = admin_message_ids[admin_id][news_id]
-            deleted_count = 0
 
-            for message_id in message_ids:
-                try:
-                    await bot.delete_message(admin_id, message_id)
-                    deleted_count += 1
-                    await asyncio.sleep(0.1)  # Небольшая задержка между удалениями
-                except Exception as e:
-                    print(f"⚠️ Не удалось удалить сообщение {message_id}: {e}")
+def _is_file_id_error(error: TelegramBadRequest) -> bool:
+    message = str(error).lower()
+    return "wrong file identifier" in message or "file_id" in message
 
-            # Удаляем запись о сообщениях
-            del admin_message_ids[admin_id][news_id]
-            print(f"✅ Удалено {deleted_count} сообщений новости у админа {admin_id}")
 
+async def send_photo_cached(chat_id, image_path: str, **kwargs):
+    """
+    Отправляет фото, повторно используя file_id от прошлой загрузки того же файла.
+    Если Telegram не принимает сохранённый file_id — загружает файл заново
+    """
+    content_hash = file_sha256(image_path)
+    file_id = await get_telegram_file_id(content_hash)
+    if file_id:
+        try:
+            message = await submit(chat_id, lambda: bot.send_photo(chat_id, file_id, **kwargs), PRIORITY_CHANNEL)
+            _photo_stats["reused"] += 1
+            return message
+        except TelegramBadRequest as e:
+            # Длинная подпись или кривой HTML при повторной загрузке не исправятся — пробрасываем
+            if not _is_file_id_error(e):
+                raise
+            print(f"⚠️ Telegram отклонил сохранённый file_id для {image_path}: {e}")
+            await forget_telegram_file_id(content_hash)
+            _photo_stats["invalidated"] += 1
+
+    message = await submit(
+        chat_id, lambda: bot.send_photo(chat_id, FSInputFile(image_variant(image_path, "telegram")), **kwargs),
+        PRIORITY_CHANNEL
+    )
+    _photo_stats["uploads"] += 1
+    if message.photo:
+        # Самый большой размер — последний в списке
+        await store_telegram_file_id(content_hash, message.photo[-1].file_id)
+    return message
+
+
+def split_long_message(text: str, prefix: str = "", limit: int = 4096) -> list:
+    """Делит длинный текст на части по абзацам, не превышая лимит Telegram"""
+    chunks = []
+    current = prefix
+    for paragraph in text.split("\n"):
+        while len(paragraph) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(paragraph[:limit])
+            paragraph = paragraph[limit:]
+
+        candidate = f"{current}\n{paragraph}" if current else paragraph
+        if len(candidate) > limit:
+            chunks.append(current)
+            current = paragraph
+        else:
+            current = candidate
+
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
+async def send_news_to_channel(chat_id, news_text: str, image_path: str, done_steps: int = 0, on_step=None):
+    """
+    Публикует новость с картинкой: короткий текст — в подписи, длинный — отдельными сообщениями.
+    Шаги (фото, затем части текста) нумеруются: done_steps уже выполнены прошлой попыткой
+    и пропускаются, on_step(n) вызывается после каждого шага, чтобы сохранить прогресс
+    """
+    if len(news_text) <= 1024:
+        # Если текст помещается в подпись к фото
+        steps = [lambda: send_photo_cached(chat_id, image_path, caption=news_text, parse_mode="HTML")]
+    else:
+        # Если текст длинный - отправляем фото без текста, а текст отдельно
+        steps = [lambda: send_photo_cached(chat_id, image_path)]
+        steps += [
+            lambda chunk=chunk: submit(chat_id, lambda: bot.send_message(chat_id, chunk, parse_mode="HTML"),
+                                       PRIORITY_CHANNEL)
+            for chunk in split_long_message(news_text)
+        ]
+
+    for index in range(done_steps, len(steps)):
+        await steps[index]()
+        if on_step:
+            await on_step(index + 1)
+
+
+def get_photo_cache_stats() -> dict:
+    return dict(_photo_stats)
+
+
+async def _delete_messages_in_chat(admin_id: int, message_ids: list) -> int:
+    deleted_count = 0
+    # deleteMessages принимает до 100 ID за раз; не найденные сообщения Telegram пропускает
+    for start in range(0, len(message_ids), DELETE_BATCH_SIZE):
+        batch = message_ids[start:start + DELETE_BATCH_SIZE]
+        try:
+            await submit(admin_id, lambda batch=batch: bot.delete_messages(admin_id, batch), PRIORITY_DELETE)
+            deleted_count += len(batch)
+        except Exception as e:
+            print(f"⚠️ Не удалось удалить сообщения {batch} у админа {admin_id}: {e}")
+    return deleted_count
+
+
+async def _delete_news_everywhere(news_id: str, message_ids_by_admin: dict):
+    try:
+        results = await asyncio.gather(*(
+            _delete_messages_in_chat(admin_id, message_ids)
+            for admin_id, message_ids in message_ids_by_admin.items()
+        ))
+        print(f"✅ Удалено {sum(results)} сообщений новости {news_id} у {len(results)} админов")
     except Exception as e:
         print(f"❌ Ошибка при удалении сообщений новости: {e}")
 
 
+def delete_news_messages(news_id: str):
+    """Удаляет в фоне сообщения новости у всех админов, которые её получили"""
+    # Сырая и обработанная новость — одна карточка, её ID хранятся под обоими ключами
+    card_id = _card_aliases.get(news_id, news_id)
+    card = news_cards.pop(card_id, None) or {}
+    news_ids = {news_id, card_id, card.get("processed_id")}
+    for alias in news_ids:
+        _card_aliases.pop(alias, None)
+
+    message_ids_by_admin = {}
+    for admin_id, news_messages in admin_message_ids.items():
+        message_ids = set()
+        for alias in news_ids:
+            message_ids.update(news_messages.pop(alias, []))
+        if message_ids:
+            message_ids_by_admin[admin_id] = sorted(message_ids)
+    if not message_ids_by_admin:
+        return None
+
+    task = asyncio.create_task(_delete_news_everywhere(news_id, message_ids_by_admin))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
 # Геттеры для доступа к данным из других модулей
 def get_pending_raw_news():
     return pending_raw_news
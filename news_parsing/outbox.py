@@ -0,0 +1,178 @@
+import asyncio
+import random
+import time
+
+import config
+from config import CHANNEL_ID
+from database import add_to_outbox, claim_due_outbox, update_outbox, get_outbox_targets, \
+    requeue_interrupted_outbox, get_outbox_counts, mark_news_published, save_outbox_progress
+from news_sender import send_news_to_channel, finish_news_card, notify_admin, \
+    remove_from_pending_processed_news
+from site_client import post_news_to_site_async
+from claims import release_moderation
+from tracing import span
+
+# Outbox публикаций: каждая цель (сайт, канал) — отдельная запись в news.db с ключом идемпотентности.
+# Фоновый публикатор отправляет их параллельно, повторяет с экспоненциальной паузой,
+# а после OUTBOX_MAX_ATTEMPTS неудач переводит в dead (ждёт разбора админом)
+OUTBOX_CONCURRENCY = getattr(config, "OUTBOX_CONCURRENCY", 4)
+OUTBOX_MAX_ATTEMPTS = getattr(config, "OUTBOX_MAX_ATTEMPTS", 5)
+OUTBOX_BACKOFF_BASE = getattr(config, "OUTBOX_BACKOFF_BASE", 10)  # сек
+OUTBOX_BACKOFF_MAX = getattr(config, "OUTBOX_BACKOFF_MAX", 900)
+OUTBOX_POLL_INTERVAL = getattr(config, "OUTBOX_POLL_INTERVAL", 5)
+
+TARGET_NAMES = {"site": "сайт", "telegram": "Telegram"}
+
+_wakeup = None
+_publisher_task = None
+_in_flight = {}  # id записи -> задача отправки
+
+
+class PublishError(Exception):
+    """Цель публикации ответила отказом — попытку нужно повторить"""
+
+
+async def _publish_site(row):
+    _, _, _, _, news_text, image_path, _, _, _ = row
+    if not await post_news_to_site_async(news_text, image_path):
+        raise PublishError("сайт не принял новость")
+
+
+async def _publish_telegram(row):
+    outbox_id, _, _, _, news_text, image_path, _, _, progress = row
+    if not image_path:
+        raise PublishError("не выбрано изображение")
+
+    async def save_progress(steps: int):
+        await save_outbox_progress(outbox_id, steps)
+
+    # Фото уходит по сохранённому file_id, если эту картинку уже загружали.
+    # При повторе уже отправленные фото и части текста в канал не дублируются
+    await send_news_to_channel(CHANNEL_ID, news_text, image_path, done_steps=progress or 0, on_step=save_progress)
+
+
+PUBLISHERS = {
+    "site": _publish_site,
+    "telegram": _publish_telegram,
+}
+
+
+async def enqueue_publication(news_id: str, url: str, news_text: str, image_path: str, targets: list,
+                              admin_id: int) -> int:
+    """Ставит публикацию в outbox; возвращает, сколько целей добавлено (уже опубликованные пропускаются)"""
+    added = 0
+    for target in targets:
+        if await add_to_outbox(news_id, target, url, news_text, image_path, admin_id):
+            added += 1
+    if added and _wakeup:
+        _wakeup.set()
+    return added
+
+
+def _backoff(attempts: int) -> float:
+    delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * (2 ** (attempts - 1)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def publish_result_message(sent: list, dead: list) -> str:
+    if "telegram" in sent and "site" in sent:
+        return "🚀 Новость опубликована в Telegram и на сайте!"
+    if not dead:
+        return "✅ Новость опубликована в Telegram." if "telegram" in sent else "🌐 Новость опубликована на сайте!"
+    if "site" in sent:
+        return "🌐 Новость опубликована на сайте (Telegram не удалось)!"
+    return "✅ Новость опубликована в Telegram (сайт не удалось)!"
+
+
+async def _finalize_if_done(news_id: str, url: str, admin_id: int):
+    """Когда по всем целям новости есть итог — отмечаем публикацию и обновляем карточку"""
+    targets = await get_outbox_targets(news_id)
+    if any(status in ("pending", "sending") for _, status in targets):
+        return
+
+    sent = [target for target, status in targets if status == "sent"]
+    dead = [target for target, status in targets if status == "dead"]
+    # Закрепление за админом держится, только пока публикация в работе
+    await release_moderation("processed", news_id)
+    if sent:
+        remove_from_pending_processed_news(news_id)
+        await mark_news_published(url)
+        await finish_news_card(news_id, "published", publish_result_message(sent, dead))
+    else:
+        # Ничего не опубликовано: карточка с кнопками остаётся, публикацию можно запустить снова
+        notify_admin(admin_id, "⚠️ Ошибка при публикации (проверь лог). Можно повторить кнопкой в карточке.")
+
+
+async def _process(row):
+    outbox_id, news_id, target, url, _, _, admin_id, attempts, _ = row
+    attempts += 1
+    try:
+        with span(url, f"publish.{target}", attempt=attempts):
+            await PUBLISHERS[target](row)
+        await update_outbox(outbox_id, "sent")
+        print(f"📤 Публикация #{outbox_id} ({TARGET_NAMES.get(target, target)}) выполнена")
+    except Exception as e:
+        if attempts >= OUTBOX_MAX_ATTEMPTS:
+            await update_outbox(outbox_id, "dead", error=str(e))
+            print(f"☠️ Публикация #{outbox_id} ({target}) не удалась после {attempts} попыток: {e}")
+            notify_admin(admin_id, f"☠️ Не удалось опубликовать на {TARGET_NAMES.get(target, target)} "
+                                   f"после {attempts} попыток: {e}")
+        else:
+            delay = _backoff(attempts)
+            await update_outbox(outbox_id, "pending", next_attempt_at=time.time() + delay, error=str(e))
+            print(f"⚠️ Публикация #{outbox_id} ({target}) упала: {e}. Повтор через {delay:.0f} сек")
+            return
+
+    await _finalize_if_done(news_id, url, admin_id)
+
+
+async def _run(row):
+    try:
+        await _process(row)
+    except Exception as e:
+        print(f"❌ Ошибка публикатора: {e}")
+    finally:
+        _in_flight.pop(row[0], None)
+        _wakeup.set()
+
+
+async def _publisher_loop():
+    print("📮 Публикатор outbox запущен")
+    while True:
+        _wakeup.clear()
+        try:
+            free = OUTBOX_CONCURRENCY - len(_in_flight)
+            if free > 0:
+                for row in await claim_due_outbox(free):
+                    _in_flight[row[0]] = asyncio.create_task(_run(row))
+        except Exception as e:
+            print(f"❌ Ошибка чтения outbox: {e}")
+
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=OUTBOX_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def start_publisher():
+    global _wakeup, _publisher_task
+    if _publisher_task:
+        return
+    _wakeup = asyncio.Event()
+    resumed = await requeue_interrupted_outbox()
+    if resumed:
+        print(f"🔁 Возобновлено {resumed} прерванных публикаций")
+    _publisher_task = asyncio.create_task(_publisher_loop())
+
+
+async def stop_publisher():
+    global _publisher_task
+    if _publisher_task:
+        _publisher_task.cancel()
+        await asyncio.gather(_publisher_task, return_exceptions=True)
+        _publisher_task = None
+
+
+async def get_outbox_stats() -> dict:
+    counts = await get_outbox_counts()
+    return {status: counts.get(status, 0) for status in ("pending", "sending", "sent", "dead")}
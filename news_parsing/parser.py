@@ -1,20 +1,31 @@
 import asyncio
 import feedparser
 import requests
-import re
-import html
-from bs4 import BeautifulSoup
-from config import DEEPSEEK_KEY
+import json
+import time
+import config
 from database import get_sites, is_news_sent, is_news_published, mark_news_sent, add_to_queue, clear_stuck_processing, \
-    get_next_from_queue, mark_queue_processed, get_queue_size
+    get_next_from_queue, mark_queue_processed, get_queue_size, peek_queue
 from news_sender import send_raw_news_to_admin
+from llm_cache import make_cache_key, get_cached_response, store_response
+from condense import condense_body, record_condensation, CONDENSE_TOKEN_BUDGET
+from llm_providers import router as llm_router, LLMResponseError, DEEPSEEK_MODEL, LLM_DEADLINE
+from speculative import schedule_backlog_prefetch, SPECULATIVE_REWRITE, SPECULATIVE_BACKLOG_BATCH
+from image_catalog import pick_random_image
+from extraction import extract_article_text, clean_text
+from logs import get_logger, fields, sampled, dumps_enabled
+from metrics import FEED_FETCH_SECONDS, FEED_ENTRIES, ARTICLE_EXTRACT_SECONDS, DEDUP_HITS
+from tracing import span, mark_feed_published
+
+log = get_logger("parser")
 
 
 # Парсинг полного текста статьи
 def get_full_article(url: str) -> str:
+    started = time.perf_counter()
     try:
 
-        print(f"🔍 Парсим статью: {url}")
+        log.debug("🔍 Парсим статью", extra=fields(url=url))
 
         # Добавляем заголовки чтобы избежать блокировки
         headers = {
@@ -28,82 +39,24 @@ def get_full_article(url: str) -> str:
 
         response = requests.get(url, timeout=4, headers=headers)
         response.encoding = response.apparent_encoding
-        print(response.status_code)
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        # Расширенный список селекторов для поиска контента
-        selectors = [
-            "article",
-            "div.article",
-            "div.content",
-            "div.post-content",
-            "div.entry-content",
-            "div.story-text",
-            "div.text",
-            "main",
-            "[role='main']",
-            "div.news-text",
-            "div.news-content",
-            "div.news-detail",
-            "div.detail-text",
-            ".news__text",
-            ".article__text",
-            ".content__text",
-            "div.news-body",
-            "div.article-body"
-        ]
-
-        article = None
-        for selector in selectors:
-            found = soup.select(selector)
-            if found:
-                article = found[0]
-                print(f"✅ Найден контент по селектору: {selector}")
-                break
-
-        # Если не нашли по селекторам, ищем по структуре
-        if not article:
-            # Ищем самый большой текстовый блок
-            text_blocks = soup.find_all(['div', 'section'])
-            text_blocks = [block for block in text_blocks if len(block.get_text(strip=True)) > 200]
-            if text_blocks:
-                article = max(text_blocks, key=lambda x: len(x.get_text(strip=True)))
-                print("✅ Найден контент по размеру текстового блока")
-
-        if article:
-            # Удаляем ненужные элементы
-            for element in article.find_all(['script', 'style', 'nav', 'header', 'footer', 'aside', 'form', 'iframe']):
-                element.decompose()
-
-            paragraphs = [p.get_text().strip() for p in article.find_all("p")]
-            # Фильтруем пустые и слишком короткие параграфы
-            paragraphs = [p for p in paragraphs if len(p) > 30]
-            text = "\n\n".join(paragraphs).strip()
-
-            if text:
-                print(f"✅ Успешно извлечен текст: {len(text)} символов, {len(text.split())} слов")
-                return text
-            else:
-                print("❌ Текст извлечен, но пустой после фильтрации")
-                return ""
-        else:
-            print("❌ Контент не найден на странице")
-            return ""
+        log.debug("📡 Ответ сайта", extra=fields(url=url, status=response.status_code))
+        text = extract_article_text(response.text)
+        if text:
+            log.info("✅ Извлечен текст статьи",
+                     extra=sampled("article.extracted", url=url, chars=len(text), words=len(text.split())))
+            ARTICLE_EXTRACT_SECONDS.observe(time.perf_counter() - started, result="ok")
+            return text
+
+        log.info("❌ Текст статьи не найден на странице", extra=fields(url=url))
+        ARTICLE_EXTRACT_SECONDS.observe(time.perf_counter() - started, result="empty")
+        return ""
 
     except Exception as e:
-        print(f"❌ Ошибка парсинга {url}: {e}")
+        log.warning("❌ Ошибка парсинга статьи: %s", e, extra=fields(url=url))
+        ARTICLE_EXTRACT_SECONDS.observe(time.perf_counter() - started, result="error")
         return ""
 
 
-# Очистка HTML и мусора
-def clean_text(text: str) -> str:
-    text = re.sub(r'<[^>]+>', '', text)  # удаляем все HTML-теги
-    text = html.unescape(text)  # заменяем HTML-сущности на символы
-    text = re.sub(r'\s+\n', '\n', text)  # убираем лишние пробелы перед переносами
-    text = re.sub(r'\n{3,}', '\n\n', text)  # максимум 2 переноса подряд
-    return text.strip()
-
-
 # Ограничение текста
 def limit_words(text: str, max_words: int = 180) -> str:
     words = text.split()
@@ -113,63 +66,43 @@ def limit_words(text: str, max_words: int = 180) -> str:
 
 async def process_with_deepseek(title: str, body: str) -> str:
     """Обработка текста через DeepSeek после одобрения сырой новости"""
-    return paraphrase_with_deepseek(title, body)
+    return await paraphrase_with_deepseek(title, body)
 
 # Функция для сравнения текстов до и после обработки
 def print_text_comparison(original_title: str, original_body: str, processed_text: str):
-    print("\n" + "=" * 80)
-    print("📋 СРАВНЕНИЕ ТЕКСТОВ:")
-    print("=" * 80)
-
-    print("\n🔹 ИСХОДНЫЙ ЗАГОЛОВОК:")
-    print("-" * 40)
-    print(original_title)
-
-    print("\n🔹 ИСХОДНЫЙ ТЕКСТ:")
-    print("-" * 40)
-    if original_body and len(original_body.strip()) > 0:
-        print(original_body[:500] + "..." if len(original_body) > 500 else original_body)
-        print(f"(Длина: {len(original_body)} символов, {len(original_body.split())} слов)")
-    else:
-        print("❌ Текст отсутствует")
-        print("(Длина: 0 символов, 0 слов)")
-
-    print("\n🔹 ОБРАБОТАННЫЙ ТЕКСТ (DeepSeek):")
-    print("-" * 40)
-    print(processed_text)
-    print(f"(Длина: {len(processed_text)} символов, {len(processed_text.split())} слов)")
-
-    print("\n🔹 СТАТИСТИКА:")
-    print("-" * 40)
-    original_words = len(original_body.split()) if original_body and len(original_body.strip()) > 0 else 0
+    """Сравнение исходного и обработанного текста: полный дамп только при LOG_VERBOSE_DUMPS"""
+    original_words = len(original_body.split()) if original_body else 0
     processed_words = len(processed_text.split())
-
-    print(f"Сокращение текста: {original_words} → {processed_words} слов")
-
-    if original_words > 0:
-        reduction_percent = ((original_words - processed_words) / original_words * 100)
-        print(f"Сокращение: {reduction_percent:.1f}%")
-    else:
-        print("Сокращение: невозможно вычислить (исходный текст пустой)")
-
-    print("=" * 80 + "\n")
+    reduction = f"{(1 - processed_words / original_words) * 100:.1f}%" if original_words else "n/a"
+    log.info("📋 Рерайт готов", extra=sampled(
+        "rewrite.comparison", words_before=original_words, words_after=processed_words, reduction=reduction
+    ))
+    if not dumps_enabled(log):
+        return
+
+    original = original_body[:500] + "..." if len(original_body or "") > 500 else (original_body or "❌ Текст отсутствует")
+    log.debug(
+        "\n".join([
+            "=" * 80,
+            "📋 СРАВНЕНИЕ ТЕКСТОВ:",
+            "🔹 ИСХОДНЫЙ ЗАГОЛОВОК:", original_title,
+            "🔹 ИСХОДНЫЙ ТЕКСТ:", original,
+            "🔹 ОБРАБОТАННЫЙ ТЕКСТ (DeepSeek):", processed_text,
+            "=" * 80,
+        ]),
+        extra=fields(chars_before=len(original_body or ""), chars_after=len(processed_text))
+    )
 
 
 
 # ДИПСИК
-def paraphrase_with_deepseek(title: str, body: str) -> str:
-    # Если текст слишком короткий, не используем DeepSeek
-    if not body or len(body.strip()) < 80:  # Увеличили порог с 50 до 80
-        print(f"⚠️ Текст слишком короткий ({len(body)} символов), используем заголовок")
-        result = title
-        print_text_comparison(title, body, result)
-        return result
+# Потоковый режим: админ видит текст по мере генерации, а не только после полного ответа
+DEEPSEEK_STREAMING = getattr(config, "DEEPSEEK_STREAMING", False)
+# Меняйте версию при любой правке промпта — старые ответы из кэша перестанут использоваться
+REWRITE_PROMPT_VERSION = "1"
 
-    try:
-        prompt = f"""
-        Ты — профессиональный редактор новостного портала. 
-        Перепиши заголовок и текст новости полностью, сохранив факты, но измени формулировки. 
 
+REWRITE_RULES = """
         ‼️ Важно:
         - Делай связанный, читаемый и завершённый текст, даже если в статье только часть. 
         - Объём от 30 до 100 слов.
@@ -183,42 +116,221 @@ def paraphrase_with_deepseek(title: str, body: str) -> str:
         - Не пиши "Заголовок: Бла бла, Текст: Бла Бла Бла" - Пиши сразу Заголовок И через пустую строку текст
         - Ни в коем случае не добовляй смайлики
         - Убирай все упоминания первоисточника, например убирай "подготовил, написанно для, и тд"
-        - Делай одну или несколько пустых строк в новости, что бы немного отделить инфоормацию и она читалась удобнее
+        - Делай одну или несколько пустых строк в новости, что бы немного отделить инфоормацию и она читалась удобнее"""
+
+
+def build_rewrite_prompt(title: str, body: str) -> str:
+    """Собирает промпт для рерайта новости"""
+    return f"""
+        Ты — профессиональный редактор новостного портала. 
+        Перепиши заголовок и текст новости полностью, сохранив факты, но измени формулировки. 
+{REWRITE_RULES}
 
         Заголовок: {title}
         Текст: {body}
         """
-        response = requests.post(
-            "https://api.deepseek.com/chat/completions",
-            headers={
-                "Authorization": f"Bearer {DEEPSEEK_KEY}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": "deepseek-chat",
-                "messages": [
-                    {"role": "system", "content": "Ты — редактор новостного портала."},
-                    {"role": "user", "content": prompt}
-                ]
-            },
-            timeout=30
-        )
-        data = response.json()
-        if "choices" in data and len(data["choices"]) > 0:
-            message = data["choices"][0].get("message", {})
-            text = message.get("content", "")
-            text = clean_text(text)
-            processed_text = limit_words(text, 180)
-
-            # Выводим сравнение текстов
-            print_text_comparison(title, body, processed_text)
-
-            return processed_text
+
+
+def is_rewrite_needed(body: str) -> bool:
+    """Слишком короткий текст не отправляем в DeepSeek"""
+    return bool(body) and len(body.strip()) >= 80
+
+
+# Провайдер, чья модель входит в ключ кэша LLM
+CACHED_PROVIDER = "deepseek"
+
+
+def prepare_rewrite_input(title: str, body: str, report: bool = True):
+    """
+    Сжимает текст под бюджет токенов (CONDENSE_TOKEN_BUDGET) и считает ключ кэша LLM.
+    Возвращает (текст_для_промпта, ключ_кэша)
+    """
+    condensed, saved = condense_body(title, body, CONDENSE_TOKEN_BUDGET)
+    if report and saved > 0:
+        record_condensation(saved)
+        print(f"✂️ Текст сжат перед DeepSeek: сэкономлено ~{saved} входных токенов")
+    return condensed, make_cache_key(title, condensed, REWRITE_PROMPT_VERSION, DEEPSEEK_MODEL)
+
+
+def _is_cacheable(provider_name: str) -> bool:
+    # Ключ кэша строится по модели DeepSeek: ответы запасных провайдеров (другая модель,
+    # офлайн-выжимка) под ним не сохраняем — в следующий раз лучше получить ответ DeepSeek
+    return provider_name == CACHED_PROVIDER
+
+
+async def _finish_rewrite(cache_key: str, text: str, provider_name: str) -> str:
+    processed_text = limit_words(clean_text(text), 180)
+    if _is_cacheable(provider_name):
+        # Кэш на синхронном sqlite3 (запись ещё и вытесняет старое) — в поток, не в event loop
+        await asyncio.to_thread(store_response, cache_key, processed_text)
+    return processed_text
+
+
+async def request_rewrite(title: str, body: str, allow_fallback: bool = True) -> str:
+    """
+    Рерайт через роутер провайдеров (DeepSeek → запасные → офлайн-суммаризатор).
+    Бросает исключение, если текст получить не удалось
+    """
+    body, cache_key = prepare_rewrite_input(title, body)
+    cached = await asyncio.to_thread(get_cached_response, cache_key)
+    if cached:
+        print("💾 Рерайт взят из кэша LLM")
+        return cached
+
+    text, provider_name = await llm_router.rewrite(
+        title, body, build_rewrite_prompt(title, body), allow_fallback=allow_fallback
+    )
+    print(f"🤖 Рерайт выполнен провайдером {provider_name}")
+    return await _finish_rewrite(cache_key, text, provider_name)
+
+
+# Пакетный рерайт: правила промпта отправляются один раз на несколько статей
+BATCH_REWRITE_MAX_ITEMS = 5
+
+
+def build_batch_rewrite_prompt(items: list) -> str:
+    """Промпт для нескольких статей сразу, ответ — JSON с текстом по номеру статьи"""
+    articles = "\n\n".join(
+        f"### СТАТЬЯ {number}\nЗаголовок: {title}\nТекст: {body}"
+        for number, (title, body) in enumerate(items, 1)
+    )
+    return f"""
+        Ты — профессиональный редактор новостного портала. 
+        Ниже {len(items)} независимых новостей. Перепиши заголовок и текст КАЖДОЙ полностью, сохранив факты, но измени формулировки. 
+        Правила ниже относятся к каждой новости отдельно.
+{REWRITE_RULES}
+
+        Ответь строго в формате json без пояснений:
+        {{"items": [{{"id": 1, "text": "Заголовок\\n\\nТекст"}}, ...]}}
+        где id — номер статьи, text — готовая новость.
+
+{articles}
+        """
+
+
+def parse_batch_rewrite_response(content: str, count: int) -> dict:
+    """Разбирает JSON-ответ пакетного рерайта: {номер статьи (с 0): текст}"""
+    data = json.loads(content)
+    results = {}
+    for item in data.get("items", []):
+        try:
+            index = int(item.get("id")) - 1
+        except (TypeError, ValueError):
+            continue
+        text = item.get("text")
+        if 0 <= index < count and isinstance(text, str) and text.strip():
+            results[index] = limit_words(clean_text(text), 180)
+    return results
+
+
+async def request_batch_rewrite(items: list) -> list:
+    """
+    Рерайт нескольких статей (список пар (title, body)) минимальным числом запросов.
+    Возвращает список текстов в том же порядке; None — если статью обработать не удалось.
+    Статьи, которых нет в ответе (или ответ не разобрался), обрабатываются поодиночке
+    """
+    results = [None] * len(items)
+    keys = []
+    condensed_items = []
+    for title, body in items:
+        condensed, key = prepare_rewrite_input(title, body)
+        condensed_items.append((title, condensed))
+        keys.append(key)
+    items = condensed_items
+
+    pending = []
+    # Все ключи пакета проверяются одним заходом в поток
+    cached_texts = await asyncio.to_thread(lambda: [get_cached_response(key) for key in keys])
+    for index, cached in enumerate(cached_texts):
+        if cached:
+            results[index] = cached
         else:
-            print("DeepSeek ERROR:", data)
-            fallback_text = limit_words(clean_text(f"{title}\n\n{body}"), 180)
-            print_text_comparison(title, body, fallback_text)
-            return fallback_text
+            pending.append(index)
+
+    for start in range(0, len(pending), BATCH_REWRITE_MAX_ITEMS):
+        chunk = pending[start:start + BATCH_REWRITE_MAX_ITEMS]
+        parsed = {}
+        provider_name = None
+        if len(chunk) > 1:
+            try:
+                content, provider_name = await llm_router.complete(
+                    build_batch_rewrite_prompt([items[i] for i in chunk]),
+                    deadline=LLM_DEADLINE + 15 * len(chunk),
+                    response_format={"type": "json_object"}
+                )
+                parsed = parse_batch_rewrite_response(content, len(chunk))
+                print(f"📦 Пакетный рерайт: разобрано {len(parsed)}/{len(chunk)} статей")
+            except Exception as e:
+                print(f"⚠️ Пакетный рерайт не удался, переходим к одиночным запросам: {e}")
+
+        for position, index in enumerate(chunk):
+            if position in parsed:
+                results[index] = parsed[position]
+                if _is_cacheable(provider_name):
+                    await asyncio.to_thread(store_response, keys[index], parsed[position])
+                continue
+            try:
+                # Без офлайн-запаса: выжимка не должна подменять будущий настоящий рерайт
+                results[index] = await request_rewrite(*items[index], allow_fallback=False)
+            except Exception as e:
+                print(f"❌ Ошибка DeepSeek: {e}")
+
+    return results
+
+
+async def stream_rewrite(title: str, body: str, on_text=None) -> str:
+    """
+    Рерайт через SSE-поток основного провайдера. on_text(накопленный_текст) вызывается
+    на каждый фрагмент ответа — частоту обновлений ограничивает сам получатель
+    """
+    body, cache_key = prepare_rewrite_input(title, body)
+    cached = await asyncio.to_thread(get_cached_response, cache_key)
+    if cached:
+        print("💾 Рерайт взят из кэша LLM")
+        return cached
+
+    provider = llm_router.primary
+    if provider is None:
+        raise LLMResponseError("Нет провайдера с потоковым режимом")
+
+    text = await provider.stream(build_rewrite_prompt(title, body), LLM_DEADLINE, on_text)
+    return await _finish_rewrite(cache_key, text, provider.name)
+
+
+async def process_with_deepseek_streaming(title: str, body: str, on_text=None) -> str:
+    """Потоковый аналог process_with_deepseek; при сбое потока — обычный рерайт через роутер"""
+    if not is_rewrite_needed(body):
+        return await process_with_deepseek(title, body)
+
+    try:
+        processed_text = await stream_rewrite(title, body, on_text)
+        print_text_comparison(title, body, processed_text)
+        return processed_text
+    except Exception as e:
+        print(f"❌ Ошибка потокового DeepSeek, переходим к обычному рерайту: {e}")
+        return await paraphrase_with_deepseek(title, body)
+
+
+async def paraphrase_with_deepseek(title: str, body: str) -> str:
+    # Если текст слишком короткий, не используем DeepSeek
+    if not is_rewrite_needed(body):  # Увеличили порог с 50 до 80
+        print(f"⚠️ Текст слишком короткий ({len(body)} символов), используем заголовок")
+        result = title
+        print_text_comparison(title, body, result)
+        return result
+
+    try:
+        processed_text = await request_rewrite(title, body)
+
+        # Выводим сравнение текстов
+        print_text_comparison(title, body, processed_text)
+
+        return processed_text
+    except LLMResponseError as e:
+        print(e)
+        fallback_text = limit_words(clean_text(f"{title}\n\n{body}"), 180)
+        print_text_comparison(title, body, fallback_text)
+        return fallback_text
     except Exception as e:
         print(f"❌ Ошибка DeepSeek: {e}")
         fallback_text = title  # Используем только заголовок при ошибке
@@ -253,48 +365,55 @@ async def process_entry(entry):
         # Вместо пустого текста используем заголовок
         body = title
 
-    return paraphrase_with_deepseek(title, body)
+    return await paraphrase_with_deepseek(title, body)
 
 
 # Парсинг фида и обработка новостей
 async def parse_feed_and_process(url: str, limit: int = 20) -> int:
     """Парсит RSS и добавляет новости в очередь с ОРИГИНАЛЬНЫМ текстом"""
-    feed = feedparser.parse(url)
+    with FEED_FETCH_SECONDS.time():
+        feed = feedparser.parse(url)
+    FEED_ENTRIES.inc(len(feed.entries))
     added_to_queue = 0
 
     for entry in feed.entries[:limit]:
         link = getattr(entry, 'link', '')
 
         # Проверяем, не была ли уже опубликована или отправлена на модерацию
-        if not await is_news_published(link) and not await is_news_sent(link):
-            print(f"📥 Добавляем новость в очередь: {getattr(entry, 'title', 'Без названия')}")
+        if await is_news_published(link) or await is_news_sent(link):
+            DEDUP_HITS.inc(stage="feed")
+        else:
+            log.info("📥 Добавляем новость в очередь",
+                     extra=sampled("feed.enqueue", title=getattr(entry, 'title', 'Без названия'), feed=url))
 
             # Получаем ОРИГИНАЛЬНЫЙ текст (без DeepSeek обработки)
             title = getattr(entry, 'title', 'Без названия')
+            mark_feed_published(link, entry)
+
+            with span(link, "feed.enqueue", feed=url) as attrs:
+                # Получаем оригинальный текст статьи
+                rss_description = getattr(entry, "summary", getattr(entry, "description", ""))
+                if rss_description:
+                    rss_description = clean_text(rss_description)
+
+                full_article = get_full_article(link)
+
+                # Выбираем лучший источник текста
+                if full_article and len(full_article) > 100:
+                    original_text = full_article
+                    attrs["source"] = "article"
+                elif rss_description and len(rss_description) > 50:
+                    original_text = rss_description
+                    attrs["source"] = "rss"
+                else:
+                    original_text = ""
+                    attrs["source"] = "none"
 
-            # Получаем оригинальный текст статьи
-            rss_description = getattr(entry, "summary", getattr(entry, "description", ""))
-            if rss_description:
-                rss_description = clean_text(rss_description)
-
-            full_article = get_full_article(link)
-
-            # Выбираем лучший источник текста
-            if full_article and len(full_article) > 100:
-                original_text = full_article
-            elif rss_description and len(rss_description) > 50:
-                original_text = rss_description
-            else:
-                original_text = ""
-
-            # Получаем путь к случайному изображению
-            import os
-            import random
-            image_files = os.listdir("images")
-            image_path = os.path.join("images", random.choice(image_files)) if image_files else None
+                # Случайное изображение из каталога (папка не сканируется заново на каждую новость)
+                image_path = pick_random_image()
 
-            # Добавляем в очередь ОРИГИНАЛЬНЫЙ текст
-            await add_to_queue(link, title, original_text, image_path)
+                # Добавляем в очередь ОРИГИНАЛЬНЫЙ текст
+                await add_to_queue(link, title, original_text, image_path)
             added_to_queue += 1
 
             await asyncio.sleep(0.5)
@@ -341,11 +460,13 @@ async def process_next_from_queue():
         # Проверяем, не была ли уже отправлена на модерацию
         if await is_news_sent(link):
             print(f"⚠️ Новость уже отправлена на модерацию, пропускаем: {link}")
+            DEDUP_HITS.inc(stage="queue")
             await mark_queue_processed(link)
             return False
 
         # Отправляем СЫРУЮ (оригинальную) новость на первичное одобрение БЕЗ ФОТО
-        await send_raw_news_to_admin(title, news_text, link)
+        with span(link, "moderation.raw_sent"):
+            await send_raw_news_to_admin(title, news_text, link)
 
         # Помечаем как отправленную на модерацию
         await mark_news_sent(link)
@@ -363,7 +484,7 @@ async def process_next_from_queue():
         return False
 async def process_with_deepseek(title: str, body: str) -> str:
     """Обработка текста через DeepSeek после одобрения сырой новости"""
-    return paraphrase_with_deepseek(title, body)
+    return await paraphrase_with_deepseek(title, body)
 # Фоновая проверка
 async def scheduler():
     """Улучшенный планировщик с блокировкой модерации"""
@@ -403,6 +524,10 @@ async def scheduler():
                     print(f"📥 Обрабатываем очередь: {queue_size} новостей")
                     processed = await process_multiple_from_queue()
                     print(f"✅ Обработано {processed} новостей из очереди")
+
+                    # Накопилась очередь — пакетно готовим рерайты следующих новостей
+                    if SPECULATIVE_REWRITE and queue_size > 1:
+                        await schedule_backlog_prefetch(await peek_queue(SPECULATIVE_BACKLOG_BATCH))
                 else:
                     print("📭 Очередь пуста")
             else:
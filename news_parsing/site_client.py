@@ -0,0 +1,256 @@
+import asyncio
+import base64
+import json
+import os
+import time
+
+import aiohttp
+
+import config
+from config import SITE_LOGIN, SITE_PASSWORD
+from site_poster import BASE_API_URL, extract_title_and_body, build_news_payload, normalize_uploaded_image_path
+from database import get_site_image_uri, store_site_image_uri, forget_site_image_uri
+from hashing import file_sha256
+from image_catalog import image_variant
+from translation import translate_news_content_async
+from metrics import SITE_API_SECONDS
+from logs import get_logger, fields, dumps_enabled
+
+# Асинхронный клиент API сайта: один пул соединений, токен живёт до истечения срока
+SITE_API_URL = getattr(config, "SITE_API_URL", BASE_API_URL)
+SITE_TIMEOUT = getattr(config, "SITE_TIMEOUT", 30)
+SITE_POOL_SIZE = getattr(config, "SITE_POOL_SIZE", 10)
+SITE_TOKEN_TTL = getattr(config, "SITE_TOKEN_TTL", 3600)  # если API не сообщает срок жизни токена
+SITE_IMAGE_CACHE_TTL = getattr(config, "SITE_IMAGE_CACHE_TTL", 30 * 86400)  # сколько доверяем image_uri
+TOKEN_REFRESH_MARGIN = 60  # обновляем токен заранее, чтобы не получить 401 посреди публикации
+
+log = get_logger("site")
+
+
+_image_stats = {"uploads": 0, "reused": 0, "invalidated": 0}
+
+
+def _token_expiry(token: str, expires_in) -> float:
+    """Срок жизни токена: из ответа логина, из поля exp JWT или SITE_TOKEN_TTL"""
+    now = time.time()
+    if expires_in:
+        return now + float(expires_in)
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        if claims.get("exp"):
+            return float(claims["exp"])
+    except Exception:
+        pass
+    return now + SITE_TOKEN_TTL
+
+
+class SiteAPIClient:
+    def __init__(self, base_url: str, login: str, password: str):
+        self.base_url = base_url.rstrip("/")
+        self.login = login
+        self.password = password
+        self._session = None
+        self._token = None
+        self._expires_at = 0.0
+        self._login_lock = asyncio.Lock()
+        self.stats = {"logins": 0, "token_reused": 0, "refreshed_on_401": 0}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # Одна сессия на клиента — соединения к API переиспользуются
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=SITE_TIMEOUT),
+                connector=aiohttp.TCPConnector(limit=SITE_POOL_SIZE)
+            )
+        return self._session
+
+    def _token_valid(self) -> bool:
+        return bool(self._token) and time.time() < self._expires_at - TOKEN_REFRESH_MARGIN
+
+    async def get_token(self, stale_token: str = None):
+        """Возвращает действующий токен; логинится, только если его нет, он истёк или отвергнут"""
+        async with self._login_lock:
+            # Пока ждали блокировку, токен мог обновить другой запрос
+            if self._token_valid() and self._token != stale_token:
+                self.stats["token_reused"] += 1
+                return self._token
+
+            print("🔑 Аутентифицируемся в API...")
+            started = time.monotonic()
+            async with self._get_session().post(
+                f"{self.base_url}/auth/login",
+                json={"email": self.login, "password": self.password},
+                headers={"Accept-Language": "ru"}
+            ) as response:
+                SITE_API_SECONDS.observe(time.monotonic() - started, endpoint="/auth/login", status=response.status)
+                if response.status != 200:
+                    log.info("❌ Ошибка аутентификации", extra=fields(status=response.status))
+                    if dumps_enabled(log):
+                        log.debug("📡 Ответ API на вход", extra=fields(body=(await response.text())[:2000]))
+                    return None
+                data = await response.json(content_type=None)
+
+            token = data.get("access_token")
+            if not token:
+                print("❌ Токен не получен в ответе")
+                return None
+
+            self._token = token
+            self._expires_at = _token_expiry(token, data.get("expires_in"))
+            self.stats["logins"] += 1
+            print("✅ Успешная аутентификация в API")
+            return token
+
+    async def _authorized_post(self, path: str, make_kwargs):
+        """POST с токеном; при 401 токен обновляется и запрос повторяется один раз"""
+        token = await self.get_token()
+        if not token:
+            return None, None
+
+        for attempt in range(2):
+            headers = {"Authorization": f"Bearer {token}", "Accept-Language": "ru"}
+            started = time.monotonic()
+            async with self._get_session().post(
+                f"{self.base_url}{path}", headers=headers, **make_kwargs()
+            ) as response:
+                status = response.status
+                text = await response.text()
+            SITE_API_SECONDS.observe(time.monotonic() - started, endpoint=path, status=status)
+
+            if status != 401 or attempt == 1:
+                return status, text
+
+            print("🔄 Токен устарел, пробуем переаутентифицироваться...")
+            self.stats["refreshed_on_401"] += 1
+            token = await self.get_token(stale_token=token)
+            if not token:
+                return status, text
+        return None, None
+
+    async def upload_image(self, image_path: str):
+        """Загружает изображение и возвращает путь для image_uri"""
+        if not os.path.exists(image_path):
+            print(f"❌ Файл изображения не найден: {image_path}")
+            return None
+
+        print(f"🖼️ Загружаем изображение: {image_path}")
+        content = await asyncio.to_thread(_read_file, image_path)
+
+        def make_kwargs():
+            form = aiohttp.FormData()
+            form.add_field("image", content, filename=os.path.basename(image_path), content_type="image/jpeg")
+            return {"data": form}
+
+        try:
+            status, text = await self._authorized_post("/upload/image", make_kwargs)
+        except Exception as e:
+            print(f"❌ Ошибка при загрузке изображения: {e}")
+            return None
+
+        if status != 200:
+            log.info("❌ Ошибка загрузки изображения", extra=fields(status=status))
+            if dumps_enabled(log):
+                log.debug("📡 Ответ API на загрузку изображения", extra=fields(body=(text or "")[:2000]))
+            return None
+
+        image_path_from_api = json.loads(text).get("data", {}).get("path", "")
+        log.info("✅ Изображение загружено", extra=fields(status=status, path=image_path_from_api))
+        return normalize_uploaded_image_path(image_path_from_api)
+
+    async def create_news(self, payload: dict):
+        """Возвращает (успех, HTTP-статус)"""
+        print("📤 Создаем новость через API...")
+        try:
+            status, text = await self._authorized_post("/content/news", lambda: {"json": payload})
+        except Exception as e:
+            print(f"❌ Ошибка при создании новости: {e}")
+            return False, None
+
+        if status == 201:
+            news_id = json.loads(text).get("data", {}).get("id", "N/A")
+            log.info("✅ Новость создана через API", extra=fields(status=status, news_id=news_id))
+            return True, status
+
+        log.info("❌ Ошибка создания новости", extra=fields(status=status))
+        if dumps_enabled(log):
+            log.debug("📡 Ответ API на создание новости", extra=fields(body=(text or "")[:2000]))
+        return False, status
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+
+async def upload_image_cached(image_path: str):
+    """
+    Возвращает (image_uri, взят_из_кэша). Картинка с тем же содержимым,
+    уже загруженная на сайт, повторно не отправляется
+    """
+    content_hash = await asyncio.to_thread(file_sha256, image_path)
+    image_uri = await get_site_image_uri(content_hash, SITE_IMAGE_CACHE_TTL)
+    if image_uri:
+        _image_stats["reused"] += 1
+        print(f"♻️ Изображение уже на сайте: {image_uri}")
+        return image_uri, True
+
+    # На сайт уходит уменьшенный вариант; ключ кэша — хэш оригинала
+    image_uri = await site_client.upload_image(image_variant(image_path, "site"))
+    if image_uri:
+        _image_stats["uploads"] += 1
+        await store_site_image_uri(content_hash, image_uri)
+    return image_uri, False
+
+
+async def forget_uploaded_image(image_path: str):
+    await forget_site_image_uri(await asyncio.to_thread(file_sha256, image_path))
+    _image_stats["invalidated"] += 1
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+site_client = SiteAPIClient(SITE_API_URL, SITE_LOGIN, SITE_PASSWORD)
+
+
+async def post_news_to_site_async(news_text: str, image_path: str = None) -> bool:
+    """Публикация новости через API сайта без блокировки event loop"""
+    title, body = extract_title_and_body(news_text)
+    if not body or len(body.strip()) == 0:
+        print("⚠️ Тело новости пустое, используем тестовый текст")
+        body = "Это тестовое описание новости. " + title
+
+    # Перевод и загрузка картинки не зависят друг от друга — выполняем одновременно
+    translation_task = asyncio.create_task(translate_news_content_async(title, body))
+    image_uri = None
+    from_cache = False
+    if image_path and os.path.exists(image_path):
+        image_uri, from_cache = await upload_image_cached(image_path)
+        if not image_uri:
+            print("⚠️ Продолжаем без изображения")
+    else:
+        print("⚠️ Путь к изображению не указан или файл не существует")
+
+    translations = await translation_task
+    if not translations['ru']['title'] or not translations['ru']['description']:
+        print("❌ Ошибка: заголовок или описание пустые")
+        return False
+
+    success, status = await site_client.create_news(build_news_payload(translations, image_uri))
+    if not success and from_cache and status in (400, 404, 422):
+        # Сайт мог удалить старый файл — загружаем картинку заново и повторяем
+        print("🔄 Сохранённый image_uri не принят, загружаем изображение заново")
+        await forget_uploaded_image(image_path)
+        image_uri, _ = await upload_image_cached(image_path)
+        success, _ = await site_client.create_news(build_news_payload(translations, image_uri))
+    if success:
+        print("🎉 Новость успешно опубликована на сайте!")
+    else:
+        print("❌ Не удалось опубликовать новость на сайте")
+    return success
+
+
+def get_site_client_stats() -> dict:
+    return {**site_client.stats, **{f"images_{k}": v for k, v in _image_stats.items()}}
@@ -2,11 +2,15 @@ import os
 import requests
 import json
 from datetime import datetime
+import config
 from config import SITE_URL, SITE_LOGIN, SITE_PASSWORD
+from logs import get_logger, fields, dumps_enabled
 
+log = get_logger("site")
 
-# Базовый URL API
-BASE_API_URL = "https://api.demo.agrosearch.kz/api"
+
+# Базовый URL API (SITE_API_URL в config.py — например, локальная заглушка fakes/site_api.py)
+BASE_API_URL = getattr(config, "SITE_API_URL", "https://api.demo.agrosearch.kz/api")
 # BASE_API_URL = "https://api.agrosearch.kz/api"  # для продакшена
 
 # Глобальная переменная для хранения токена
@@ -76,6 +80,25 @@ def login_to_api() -> bool:
         return False
 
 
+def normalize_uploaded_image_path(image_path_from_api: str) -> str:
+    """Приводит путь, который вернул API загрузки, к виду для image_uri"""
+    # Обрабатываем путь от API - добавляем префикс tmp/images/ если его нет
+    if image_path_from_api.startswith("/storage/"):
+        image_path_from_api = image_path_from_api[9:]  # удаляем "/storage/"
+    elif image_path_from_api.startswith("https://"):
+        # Если вернулся полный URL, извлекаем только имя файла
+        from urllib.parse import urlparse
+        parsed_url = urlparse(image_path_from_api)
+        filename = os.path.basename(parsed_url.path)
+        image_path_from_api = f"tmp/images/{filename}"
+    else:
+        # Если вернулось только имя файла, добавляем путь
+        image_path_from_api = f"tmp/images/{image_path_from_api}"
+
+    print(f"✅ Обработанный путь для image_uri: {image_path_from_api}")
+    return image_path_from_api
+
+
 def upload_image(image_path: str) -> str:
     """Загружает изображение и возвращает путь для использования в новости"""
     global access_token
@@ -103,22 +126,7 @@ def upload_image(image_path: str) -> str:
                 image_path_from_api = data.get("data", {}).get("path", "")
 
                 print(f"✅ Изображение загружено, путь от API: {image_path_from_api}")
-
-                # Обрабатываем путь от API - добавляем префикс tmp/images/ если его нет
-                if image_path_from_api.startswith("/storage/"):
-                    image_path_from_api = image_path_from_api[9:]  # удаляем "/storage/"
-                elif image_path_from_api.startswith("https://"):
-                    # Если вернулся полный URL, извлекаем только имя файла
-                    from urllib.parse import urlparse
-                    parsed_url = urlparse(image_path_from_api)
-                    filename = os.path.basename(parsed_url.path)
-                    image_path_from_api = f"tmp/images/{filename}"
-                else:
-                    # Если вернулось только имя файла, добавляем путь
-                    image_path_from_api = f"tmp/images/{image_path_from_api}"
-
-                print(f"✅ Обработанный путь для image_uri: {image_path_from_api}")
-                return image_path_from_api
+                return normalize_uploaded_image_path(image_path_from_api)
             else:
                 print(f"❌ Ошибка загрузки изображения: {response.status_code}")
                 print(f"Ответ: {response.text}")
@@ -203,6 +211,30 @@ def extract_title_and_body(text: str):
     return title, body
 
 
+def build_news_payload(translations: dict, image_uri: str) -> dict:
+    """Тело запроса создания новости; языки без перевода заполняются русским текстом"""
+    seo_keywords = truncate_text("агро, сельское хозяйство, АПК, новости сельского хозяйства", 255)
+
+    payload = {
+        "image_uri": image_uri,
+        "seo_image": image_uri,
+        "date_publication": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    for lang in ('ru', 'kk', 'en', 'zh'):
+        content = translations.get(lang) or translations['ru']
+        # Русские поля идут без суффикса: title, seo_title...
+        suffix = "" if lang == 'ru' else f"_{lang}"
+        payload.update({
+            f"title{suffix}": content['title'],
+            f"description{suffix}": content['description'],
+            f"subtitle{suffix}": content['subtitle'],
+            f"seo_title{suffix}": truncate_text(content['title'], 255),
+            f"seo_description{suffix}": truncate_text(content['subtitle'], 500),
+            f"seo_keywords{suffix}": seo_keywords,
+        })
+    return payload
+
+
 def create_news_api(title: str, description: str, subtitle: str, image_uri: str, translations: dict) -> bool:
     """Создает новость через API только на русском языке"""
     global access_token
@@ -221,51 +253,7 @@ def create_news_api(title: str, description: str, subtitle: str, image_uri: str,
             print("❌ Ошибка: заголовок или описание пустые")
             return False
 
-        # SEO настройки только на русском
-        seo_keywords = truncate_text("агро, сельское хозяйство, АПК, новости сельского хозяйства", 255)
-
-        # Упрощенный payload только с русскими полями
-        payload = {
-            # Основные поля на русском
-            "title": translations['ru']['title'],
-            "description": translations['ru']['description'],
-            "subtitle": translations['ru']['subtitle'],
-            "image_uri": image_uri,
-
-            # Остальные языки используем те же русские данные
-            "title_kk": translations['ru']['title'],
-            "description_kk": translations['ru']['description'],
-            "subtitle_kk": translations['ru']['subtitle'],
-
-            "title_en": translations['ru']['title'],
-            "description_en": translations['ru']['description'],
-            "subtitle_en": translations['ru']['subtitle'],
-
-            "title_zh": translations['ru']['title'],
-            "description_zh": translations['ru']['description'],
-            "subtitle_zh": translations['ru']['subtitle'],
-
-            # SEO поля (все на русском)
-            "seo_title": truncate_text(translations['ru']['title'], 255),
-            "seo_description": truncate_text(translations['ru']['subtitle'], 500),
-            "seo_keywords": seo_keywords,
-            "seo_image": image_uri,
-
-            "seo_title_kk": truncate_text(translations['ru']['title'], 255),
-            "seo_description_kk": truncate_text(translations['ru']['subtitle'], 500),
-            "seo_keywords_kk": seo_keywords,
-
-            "seo_title_en": truncate_text(translations['ru']['title'], 255),
-            "seo_description_en": truncate_text(translations['ru']['subtitle'], 500),
-            "seo_keywords_en": seo_keywords,
-
-            "seo_title_zh": truncate_text(translations['ru']['title'], 255),
-            "seo_description_zh": truncate_text(translations['ru']['subtitle'], 500),
-            "seo_keywords_zh": seo_keywords,
-
-            # Дополнительные поля
-            "date_publication": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        payload = build_news_payload(translations, image_uri)
 
         headers = {
             "Authorization": f"Bearer {access_token}",
@@ -273,26 +261,19 @@ def create_news_api(title: str, description: str, subtitle: str, image_uri: str,
             "Accept-Language": "ru"
         }
 
-        print(f"📊 Отправляем данные (только русский язык):")
-        print(f"   Заголовок: '{payload['title']}' ({len(payload['title'])} симв.)")
-        print(f"   Подзаголовок: '{payload['subtitle']}' ({len(payload['subtitle'])} симв.)")
-        print(f"   Описание: '{payload['description'][:100]}...' ({len(payload['description'])} симв.)")
-        print(f"   Image URI: '{payload['image_uri']}'")
-        print(f"   URL: {news_url}")
-        print(f"   Токен: {access_token[:20]}...")
+        if dumps_enabled(log):
+            log.debug("📊 Отправляем данные", extra=fields(
+                url=news_url, title=payload['title'], subtitle=payload['subtitle'],
+                description=payload['description'][:100], chars=len(payload['description']),
+                image_uri=payload['image_uri']
+            ))
 
         response = requests.post(news_url, json=payload, headers=headers, timeout=30)
 
-        print(f"📡 Ответ сервера: {response.status_code}")
-        print(f"📡 Заголовки ответа: {dict(response.headers)}")
-
-        # Проверяем тип ответа
-        content_type = response.headers.get('content-type', '')
-        if 'application/json' in content_type:
-            response_data = response.json()
-            print(f"📡 JSON ответ: {response_data}")
-        else:
-            print(f"📡 Не-JSON ответ (первые 200 символов): {response.text[:200]}")
+        log.info("📡 Ответ API на создание новости", extra=fields(status=response.status_code))
+        if dumps_enabled(log):
+            # Заголовки и тело ответа — только для отладки
+            log.debug("📡 Подробности ответа", extra=fields(headers=dict(response.headers), body=response.text[:2000]))
 
         if response.status_code == 201:
             result_data = response.json()
@@ -0,0 +1,167 @@
+import asyncio
+from collections import OrderedDict
+from datetime import date
+
+import config
+
+# Спекулятивная предгенерация: рерайт запускается сразу при отправке сырой
+# новости админам, чтобы после "Одобрить" обработанный текст был готов.
+# Все настройки можно переопределить в config.py
+SPECULATIVE_REWRITE = getattr(config, "SPECULATIVE_REWRITE", False)
+SPECULATIVE_MAX_CONCURRENT = getattr(config, "SPECULATIVE_MAX_CONCURRENT", 2)
+SPECULATIVE_DAILY_CAP = getattr(config, "SPECULATIVE_DAILY_CAP", 100)
+SPECULATIVE_CACHE_SIZE = getattr(config, "SPECULATIVE_CACHE_SIZE", 30)
+# Сколько новостей из очереди заранее переписывать одним пакетным запросом
+SPECULATIVE_BACKLOG_BATCH = getattr(config, "SPECULATIVE_BACKLOG_BATCH", 5)
+
+_semaphore = asyncio.Semaphore(SPECULATIVE_MAX_CONCURRENT)
+_tasks = OrderedDict()  # news_id -> asyncio.Task с готовым (или будущим) текстом
+_daily_usage = {"day": date.today(), "calls": 0}
+_stats = {"started": 0, "hits": 0, "misses": 0, "dropped": 0, "skipped_cap": 0, "prefetched": 0}
+_backlog_task = None
+
+
+def _reserve_daily_call() -> bool:
+    """Учитывает вызов в дневном лимите, False если лимит исчерпан"""
+    today = date.today()
+    if _daily_usage["day"] != today:
+        _daily_usage["day"] = today
+        _daily_usage["calls"] = 0
+
+    if _daily_usage["calls"] >= SPECULATIVE_DAILY_CAP:
+        return False
+
+    _daily_usage["calls"] += 1
+    return True
+
+
+async def _run_rewrite(title: str, body: str):
+    from parser import request_rewrite
+
+    async with _semaphore:
+        try:
+            # Без офлайн-выжимки: при неудаче админ получит настоящий рерайт после одобрения
+            return await request_rewrite(title, body, allow_fallback=False)
+        except Exception as e:
+            print(f"⚠️ Спекулятивный рерайт не удался: {e}")
+            return None
+
+
+def _drop(news_id: str):
+    task = _tasks.pop(news_id, None)
+    if task and not task.done():
+        task.cancel()
+    if task:
+        _stats["dropped"] += 1
+
+
+def start_speculative_rewrite(news_id: str, title: str, body: str) -> bool:
+    """Запускает рерайт в фоне, пока новость ждёт первичной модерации"""
+    from parser import is_rewrite_needed
+
+    if not SPECULATIVE_REWRITE or news_id in _tasks:
+        return False
+
+    # Короткие тексты DeepSeek не обрабатывает — спекулировать нечего
+    if not is_rewrite_needed(body):
+        return False
+
+    if not _reserve_daily_call():
+        _stats["skipped_cap"] += 1
+        print("⚠️ Дневной лимит спекулятивных рерайтов исчерпан")
+        return False
+
+    _tasks[news_id] = asyncio.create_task(_run_rewrite(title, body))
+    _stats["started"] += 1
+
+    # Ограничиваем размер кэша: выбрасываем самые старые результаты
+    while len(_tasks) > SPECULATIVE_CACHE_SIZE:
+        oldest_id = next(iter(_tasks))
+        _drop(oldest_id)
+
+    print(f"🔮 Запущен спекулятивный рерайт для {news_id}")
+    return True
+
+
+async def take_speculative_rewrite(news_id: str):
+    """Забирает предгенерированный текст (дожидается, если запрос ещё идёт)"""
+    task = _tasks.pop(news_id, None)
+    if task is None:
+        _stats["misses"] += 1
+        return None
+
+    try:
+        result = await task
+    except asyncio.CancelledError:
+        result = None
+
+    if result:
+        _stats["hits"] += 1
+    else:
+        _stats["misses"] += 1
+    return result
+
+
+def discard_speculative_rewrite(news_id: str):
+    """Сбрасывает предгенерацию при отклонении новости"""
+    _drop(news_id)
+
+
+async def _prefetch_backlog(items: list):
+    from parser import request_batch_rewrite
+
+    async with _semaphore:
+        try:
+            results = await request_batch_rewrite(items)
+        except Exception as e:
+            print(f"⚠️ Пакетная предгенерация не удалась: {e}")
+            return
+
+    ready = sum(1 for text in results if text)
+    _stats["prefetched"] += ready
+    print(f"🔮 Заранее подготовлено {ready}/{len(items)} рерайтов из очереди")
+
+
+async def schedule_backlog_prefetch(queue_items: list) -> bool:
+    """
+    Во время разбора очереди пакетно переписывает ждущие новости.
+    Результаты попадают в кэш LLM, поэтому при одобрении берутся оттуда мгновенно
+    """
+    global _backlog_task
+    from parser import is_rewrite_needed, prepare_rewrite_input
+    from llm_cache import has_cached_response
+
+    if not SPECULATIVE_REWRITE or (_backlog_task and not _backlog_task.done()):
+        return False
+
+    candidates = [(title, body) for _link, title, body in queue_items[:SPECULATIVE_BACKLOG_BATCH]
+                  if is_rewrite_needed(body)]
+    keys = [prepare_rewrite_input(title, body, report=False)[1] for title, body in candidates]
+    # Проверка кэша LLM (синхронный sqlite3) — в потоке, чтобы не задерживать event loop
+    cached = await asyncio.to_thread(lambda: [has_cached_response(key) for key in keys])
+    if _backlog_task and not _backlog_task.done():
+        return False
+
+    items = []
+    for (title, body), is_cached in zip(candidates, cached):
+        if is_cached:
+            continue
+        if not _reserve_daily_call():
+            _stats["skipped_cap"] += 1
+            break
+        items.append((title, body))
+
+    if not items:
+        return False
+
+    _backlog_task = asyncio.create_task(_prefetch_backlog(items))
+    return True
+
+
+def get_speculative_stats() -> dict:
+    return {
+        **_stats,
+        "cached": len(_tasks),
+        "daily_calls": _daily_usage["calls"],
+        "daily_cap": SPECULATIVE_DAILY_CAP,
+    }
@@ -0,0 +1,191 @@
+import asyncio
+import itertools
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+
+import config
+from telegram_rate import chat_delay, block_chat, acquire_global, TELEGRAM_MAX_FLOOD_RETRIES
+from metrics import TELEGRAM_SEND_SECONDS
+
+# Единая очередь исходящих запросов к Bot API: под нагрузкой первыми уходят важные сообщения
+PRIORITY_CHANNEL = 0  # публикация в канал
+PRIORITY_MODERATION = 1  # карточки модерации админам
+PRIORITY_NOTIFY = 2  # статусные уведомления
+PRIORITY_DELETE = 3  # удаление старых сообщений
+
+_PRIORITY_NAMES = {
+    PRIORITY_CHANNEL: "channel",
+    PRIORITY_MODERATION: "moderation",
+    PRIORITY_NOTIFY: "notify",
+    PRIORITY_DELETE: "delete",
+}
+
+TELEGRAM_SEND_WORKERS = getattr(config, "TELEGRAM_SEND_WORKERS", 4)
+
+_queue = None
+_workers = []
+_seq = itertools.count()
+_pending = {}  # (chat_id, coalesce_key) -> задача, ещё не взятая в работу
+_notice_texts = {}  # chat_id -> накопившиеся тексты уведомлений
+_deferred = 0  # задач, отложенных до готовности своего чата
+_stats = {"sent": {name: 0 for name in _PRIORITY_NAMES.values()}, "failed": 0, "coalesced": 0, "deferred": 0}
+
+
+def _ensure_workers():
+    global _queue
+    if _queue is None:
+        _queue = asyncio.PriorityQueue()
+    if not _workers:
+        for _ in range(TELEGRAM_SEND_WORKERS):
+            _workers.append(asyncio.create_task(_worker()))
+
+
+def _requeue_later(item: tuple, delay: float):
+    """Возвращает задачу в очередь, когда её чат освободится; порядок (приоритет, seq) сохраняется"""
+    global _deferred
+
+    def put_back():
+        global _deferred
+        _deferred -= 1
+        _queue.put_nowait(item)
+
+    _deferred += 1
+    _stats["deferred"] += 1
+    asyncio.get_running_loop().call_later(delay, put_back)
+
+
+async def _worker():
+    # Лимит чата проверяется до отправки: задача для занятого чата откладывается,
+    # а воркер берёт следующую — ожидание одного чата не задерживает остальные и канал
+    while True:
+        item = await _queue.get()
+        priority, _, job = item
+        try:
+            delay = chat_delay(job["chat_id"])
+            if delay:
+                _requeue_later(item, delay)
+                continue
+
+            pending_key = (job["chat_id"], job["key"])
+            if job["key"] is not None and _pending.get(pending_key) is job:
+                del _pending[pending_key]
+
+            priority_name = _PRIORITY_NAMES.get(priority, "other")
+            await acquire_global()
+            try:
+                result = await job["make_call"]()
+            except TelegramRetryAfter as e:
+                if job["flood_retries"] < TELEGRAM_MAX_FLOOD_RETRIES:
+                    job["flood_retries"] += 1
+                    block_chat(job["chat_id"], e.retry_after)
+                    _requeue_later(item, e.retry_after)
+                    continue
+                _fail(job, priority_name, e)
+            except Exception as e:
+                _fail(job, priority_name, e)
+            else:
+                TELEGRAM_SEND_SECONDS.observe(time.monotonic() - job["submitted"], priority=priority_name, outcome="ok")
+                _stats["sent"][priority_name] += 1
+                if not job["future"].done():
+                    job["future"].set_result(result)
+        finally:
+            _queue.task_done()
+
+
+def _fail(job: dict, priority_name: str, error: Exception):
+    TELEGRAM_SEND_SECONDS.observe(time.monotonic() - job["submitted"], priority=priority_name, outcome="error")
+    _stats["failed"] += 1
+    if not job["future"].done():
+        job["future"].set_exception(error)
+
+
+def submit(chat_id, make_call, priority: int = PRIORITY_MODERATION, coalesce_key=None) -> asyncio.Future:
+    """
+    Ставит make_call() в очередь и возвращает future с результатом.
+    Задача с тем же coalesce_key для чата, ещё не ушедшая в Telegram, заменяется новой
+    """
+    _ensure_workers()
+
+    if coalesce_key is not None:
+        job = _pending.get((chat_id, coalesce_key))
+        if job:
+            job["make_call"] = make_call
+            _stats["coalesced"] += 1
+            return job["future"]
+
+    job = {
+        "chat_id": chat_id,
+        "make_call": make_call,
+        "key": coalesce_key,
+        "future": asyncio.get_running_loop().create_future(),
+        "submitted": time.monotonic(),
+        "flood_retries": 0,
+    }
+    if coalesce_key is not None:
+        _pending[(chat_id, coalesce_key)] = job
+    _queue.put_nowait((priority, next(_seq), job))
+    return job["future"]
+
+
+async def fan_out(chat_ids, make_call, priority: int = PRIORITY_MODERATION) -> dict:
+    """
+    Параллельно выполняет make_call(chat_id) для всех чатов через общую очередь.
+    Возвращает {chat_id: результат или исключение} — доставка каждому чату отдельно
+    """
+    chat_ids = list(chat_ids)
+    results = await asyncio.gather(
+        *(submit(chat_id, lambda chat_id=chat_id: make_call(chat_id), priority) for chat_id in chat_ids),
+        return_exceptions=True
+    )
+    return dict(zip(chat_ids, results))
+
+
+def _log_notice_failure(chat_id):
+    def callback(future: asyncio.Future):
+        if not future.cancelled() and future.exception():
+            print(f"⚠️ Не удалось отправить уведомление в чат {chat_id}: {future.exception()}")
+    return callback
+
+
+def _forget_notices(chat_id, batch: list):
+    # Новые уведомления дописываются в конец — отправленная пачка всегда в начале списка
+    _notice_texts[chat_id] = _notice_texts.get(chat_id, [])[len(batch):]
+
+
+def notify(chat_id, text: str, send_text) -> asyncio.Future:
+    """
+    Уведомление без ожидания отправки. Пока предыдущее уведомление чату не ушло,
+    новые тексты дописываются к нему (одинаковые тексты — разные события, сохраняются все)
+    """
+    _notice_texts.setdefault(chat_id, []).append(text)
+
+    async def send():
+        batch = list(_notice_texts.get(chat_id, []))
+        if not batch:
+            return None
+        try:
+            result = await send_text(chat_id, "\n".join(batch))
+        except TelegramRetryAfter:
+            raise  # воркер повторит отправку того же текста после паузы
+        except Exception:
+            _forget_notices(chat_id, batch)
+            raise
+        _forget_notices(chat_id, batch)
+        return result
+
+    already_pending = (chat_id, "notice") in _pending
+    future = submit(chat_id, send, PRIORITY_NOTIFY, coalesce_key="notice")
+    if not already_pending:
+        future.add_done_callback(_log_notice_failure(chat_id))
+    return future
+
+
+def get_telegram_queue_stats() -> dict:
+    return {
+        "queued": (_queue.qsize() if _queue else 0) + _deferred,
+        "sent": dict(_stats["sent"]),
+        "failed": _stats["failed"],
+        "coalesced": _stats["coalesced"],
+        "deferred": _stats["deferred"],
+    }
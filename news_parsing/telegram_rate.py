@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import config
+
+# Ограничения Bot API: ~30 сообщений в секунду на бота и ~1 в секунду в один чат.
+# Все массовые рассылки админам идут через общий лимитер; RetryAfter обрабатывает telegram_queue
+TELEGRAM_GLOBAL_RATE = getattr(config, "TELEGRAM_GLOBAL_RATE", 30)  # сообщений/сек на бота
+TELEGRAM_CHAT_RATE = getattr(config, "TELEGRAM_CHAT_RATE", 1)  # сообщений/сек в один чат
+TELEGRAM_CHAT_BURST = getattr(config, "TELEGRAM_CHAT_BURST", 3)  # короткий всплеск в один чат
+TELEGRAM_MAX_FLOOD_RETRIES = getattr(config, "TELEGRAM_MAX_FLOOD_RETRIES", 3)
+
+
+class TokenBucket:
+    """Классический token bucket: rate токенов в секунду, не больше capacity в запасе"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def block(self, seconds: float):
+        """Telegram попросил подождать (flood wait) — не выдаём токены до истечения паузы"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    def reserve(self) -> float:
+        """Без ожидания: берёт токен и возвращает 0, иначе — через сколько секунд токен появится"""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        while True:
+            wait = self.reserve()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+_global_bucket = TokenBucket(TELEGRAM_GLOBAL_RATE, TELEGRAM_GLOBAL_RATE)
+_chat_buckets = {}
+
+
+def _chat_bucket(chat_id) -> TokenBucket:
+    if chat_id not in _chat_buckets:
+        _chat_buckets[chat_id] = TokenBucket(TELEGRAM_CHAT_RATE, TELEGRAM_CHAT_BURST)
+    return _chat_buckets[chat_id]
+
+
+def chat_delay(chat_id) -> float:
+    """0 — запрос в чат можно отправлять сейчас (токен уже взят), иначе — сколько секунд подождать"""
+    return _chat_bucket(chat_id).reserve()
+
+
+def block_chat(chat_id, seconds: float):
+    """Flood wait от Telegram: чат не получает запросов до истечения паузы"""
+    print(f"🚦 Flood wait для чата {chat_id}: ждём {seconds} сек")
+    _chat_bucket(chat_id).block(seconds)
+
+
+async def acquire_global():
+    """Общий лимит бота: ожидание короткое и одинаковое для всех чатов"""
+    await _global_bucket.acquire()
@@ -0,0 +1,250 @@
+import asyncio
+import calendar
+import contextlib
+import hashlib
+import json
+import os
+import secrets
+import time
+from collections import OrderedDict
+
+import aiohttp
+
+import config
+
+# Трассировка новости через весь конвейер: лента → очередь → модерация → DeepSeek → публикация.
+# trace_id выводится из ссылки, поэтому этапы в разных модулях (и после перезапуска)
+# попадают в одну трассу без передачи контекста. Спаны пишутся в JSONL и, по желанию,
+# отправляются в OTLP-коллектор (OTLP/HTTP JSON)
+TRACE_ENABLED = getattr(config, "TRACE_ENABLED", True)
+TRACE_FILE = getattr(config, "TRACE_FILE", "traces.jsonl")
+TRACE_FILE_MAX_BYTES = getattr(config, "TRACE_FILE_MAX_BYTES", 50 * 1024 * 1024)  # дальше — ротация в .1
+TRACE_OTLP_URL = getattr(config, "TRACE_OTLP_URL", "")  # например http://127.0.0.1:4318/v1/traces
+TRACE_FLUSH_INTERVAL = getattr(config, "TRACE_FLUSH_INTERVAL", 2)  # сек
+TRACE_MEMORY_ITEMS = 500  # столько последних трасс держим в памяти для /trace
+
+STAGE_LABELS = {
+    "feed.published": "📰 Опубликовано в ленте",
+    "feed.enqueue": "📥 Загрузка статьи и постановка в очередь",
+    "moderation.raw_sent": "📨 Отправлено админам (сырая)",
+    "moderation.approved": "✅ Одобрено для рерайта",
+    "moderation.rejected": "❌ Отклонено",
+    "rewrite": "🤖 Рерайт",
+    "moderation.processed_sent": "✍️ Отправлено админам (обработанная)",
+    "publish.requested": "🚀 Публикация запрошена",
+    "publish.telegram": "📢 Публикация в канал",
+    "publish.site": "🌐 Публикация на сайт",
+}
+
+_traces = OrderedDict()  # trace_id -> список спанов
+_buffer = []  # спаны, ещё не выгруженные в файл/коллектор
+_flush_task = None
+_session = None
+
+
+def trace_id_for(link: str) -> str:
+    return hashlib.sha256(link.strip().encode("utf-8")).hexdigest()[:32]
+
+
+def record_span(link: str, name: str, start: float, end: float = None, status: str = "ok", **attrs):
+    """Сохраняет спан этапа (время — unix-секунды); end=None — мгновенное событие"""
+    if not TRACE_ENABLED or not link:
+        return
+    trace_id = trace_id_for(link)
+    span = {
+        "trace_id": trace_id,
+        "span_id": secrets.token_hex(8),
+        "link": link,
+        "name": name,
+        "start": start,
+        "end": start if end is None else end,
+        "status": status,
+        "attrs": attrs,
+    }
+    spans = _traces.setdefault(trace_id, [])
+    spans.append(span)
+    _traces.move_to_end(trace_id)
+    while len(_traces) > TRACE_MEMORY_ITEMS:
+        _traces.popitem(last=False)
+    _buffer.append(span)
+
+
+def mark(link: str, name: str, at: float = None, **attrs):
+    """Мгновенное событие (клик админа, время публикации в ленте)"""
+    record_span(link, name, time.time() if at is None else at, **attrs)
+
+
+def mark_feed_published(link: str, entry):
+    """Время публикации записи по данным ленты — от него считается свежесть"""
+    published = getattr(entry, "published_parsed", None) or getattr(entry, "updated_parsed", None)
+    if published:
+        mark(link, "feed.published", calendar.timegm(published))
+
+
+@contextlib.contextmanager
+def span(link: str, name: str, **attrs):
+    """with span(link, "rewrite"): ... — длительность блока; исключение помечает спан ошибкой"""
+    started = time.time()
+    try:
+        yield attrs
+    except BaseException as e:
+        record_span(link, name, started, time.time(), status="error", error=f"{type(e).__name__}: {e}", **attrs)
+        raise
+    record_span(link, name, started, time.time(), **attrs)
+
+
+def _write_lines(lines: list):
+    if os.path.exists(TRACE_FILE) and os.path.getsize(TRACE_FILE) > TRACE_FILE_MAX_BYTES:
+        os.replace(TRACE_FILE, f"{TRACE_FILE}.1")
+    with open(TRACE_FILE, "a", encoding="utf-8") as f:
+        f.writelines(lines)
+
+
+def _otlp_payload(spans: list) -> dict:
+    def attributes(values: dict) -> list:
+        return [{"key": key, "value": {"stringValue": str(value)}} for key, value in values.items()]
+
+    return {"resourceSpans": [{
+        "resource": {"attributes": attributes({"service.name": "news_parsing"})},
+        "scopeSpans": [{
+            "scope": {"name": "news_parsing.tracing"},
+            "spans": [{
+                "traceId": item["trace_id"],
+                "spanId": item["span_id"],
+                "name": item["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(int(item["start"] * 1e9)),
+                "endTimeUnixNano": str(int(item["end"] * 1e9)),
+                "attributes": attributes({"link": item["link"], **item["attrs"]}),
+                "status": {"code": 2 if item["status"] == "error" else 1},
+            } for item in spans],
+        }],
+    }]}
+
+
+async def flush_spans():
+    """Выгружает накопленные спаны в JSONL и коллектор"""
+    global _session
+    if not _buffer:
+        return
+    batch = _buffer[:]
+    del _buffer[:len(batch)]
+
+    if TRACE_FILE:
+        lines = [json.dumps(item, ensure_ascii=False) + "\n" for item in batch]
+        try:
+            await asyncio.to_thread(_write_lines, lines)
+        except OSError as e:
+            print(f"⚠️ Не удалось записать трассы: {e}")
+
+    if TRACE_OTLP_URL:
+        if _session is None or _session.closed:
+            _session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+        try:
+            async with _session.post(TRACE_OTLP_URL, json=_otlp_payload(batch)) as response:
+                if response.status >= 300:
+                    print(f"⚠️ Коллектор трасс ответил {response.status}")
+        except Exception as e:
+            print(f"⚠️ Коллектор трасс недоступен: {e}")
+
+
+async def _flush_loop():
+    while True:
+        await asyncio.sleep(TRACE_FLUSH_INTERVAL)
+        await flush_spans()
+
+
+def start_tracing():
+    global _flush_task
+    if TRACE_ENABLED and _flush_task is None:
+        _flush_task = asyncio.create_task(_flush_loop())
+
+
+async def stop_tracing():
+    global _flush_task
+    if _flush_task:
+        _flush_task.cancel()
+        await asyncio.gather(_flush_task, return_exceptions=True)
+        _flush_task = None
+    await flush_spans()
+    if _session and not _session.closed:
+        await _session.close()
+
+
+def _read_trace_file(trace_id: str) -> list:
+    spans = []
+    for path in (f"{TRACE_FILE}.1", TRACE_FILE):
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if trace_id in line:
+                    item = json.loads(line)
+                    if item.get("trace_id") == trace_id:
+                        spans.append(item)
+    return spans
+
+
+async def get_trace(link: str) -> list:
+    """Спаны новости по времени начала: из памяти, а после перезапуска — из файла"""
+    trace_id = trace_id_for(link)
+    spans = {item["span_id"]: item for item in _traces.get(trace_id, [])}
+    if TRACE_FILE:
+        for item in await asyncio.to_thread(_read_trace_file, trace_id):
+            spans.setdefault(item["span_id"], item)
+    return sorted(spans.values(), key=lambda item: (item["start"], item["end"]))
+
+
+def _duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds} сек"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes} мин {seconds} сек"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} ч {minutes} мин"
+
+
+def freshness(spans: list):
+    """Секунды от публикации в ленте до первой успешной публикации (канал, иначе сайт)"""
+    published = next((item["start"] for item in spans if item["name"] == "feed.published"), None)
+    if published is None:
+        return None
+    for target in ("publish.telegram", "publish.site"):
+        posted = [item["end"] for item in spans if item["name"] == target and item["status"] == "ok"]
+        if posted:
+            return min(posted) - published
+    return None
+
+
+def format_timeline(link: str, spans: list) -> str:
+    if not spans:
+        return f"🔍 Трасса не найдена: {link}"
+
+    origin = spans[0]["start"]
+    lines = [f"🧭 Трасса новости\n{link}\n"]
+    previous_end = origin
+    for item in spans:
+        gap = item["start"] - previous_end
+        if gap >= 1:
+            lines.append(f"   ⏳ ожидание {_duration(gap)}")
+        label = STAGE_LABELS.get(item["name"], item["name"])
+        offset = time.strftime("%d.%m %H:%M:%S", time.localtime(item["start"]))
+        duration = item["end"] - item["start"]
+        line = f"{offset}  {label}"
+        if duration > 0:
+            line += f" — {duration:.1f} сек"
+        if item["status"] == "error":
+            line += f" ⚠️ {item['attrs'].get('error', '')}"
+        details = ", ".join(f"{key}={value}" for key, value in item["attrs"].items() if key != "error")
+        if details:
+            line += f" ({details})"
+        lines.append(line)
+        previous_end = max(previous_end, item["end"])
+
+    lines.append(f"\n⏱️ Всего в трассе: {_duration(previous_end - origin)}")
+    fresh = freshness(spans)
+    if fresh is not None:
+        lines.append(f"🕒 Свежесть (лента → публикация): {_duration(fresh)}")
+    return "\n".join(lines)
@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import time
+from abc import ABC, abstractmethod
+
+import config
+from database import get_cached_translations, store_translations
+from site_poster import truncate_text
+
+try:
+    from googletrans import Translator
+except ImportError:  # перевод через Google необязателен
+    Translator = None
+
+# Перевод новости для сайта: заголовок и текст переводятся на все языки одновременно,
+# поэтому публикация на четырёх языках занимает столько же, сколько самый медленный язык.
+# Готовые переводы хранятся в news.db по хэшу текста и повторно не запрашиваются
+TRANSLATION_PROVIDER = getattr(config, "TRANSLATION_PROVIDER", "google")  # google | stub | none
+TRANSLATION_LANGUAGES = getattr(config, "TRANSLATION_LANGUAGES", ["kk", "en", "zh"])
+TRANSLATION_TIMEOUT = getattr(config, "TRANSLATION_TIMEOUT", 20)  # сек на один язык
+TRANSLATION_CONCURRENCY = getattr(config, "TRANSLATION_CONCURRENCY", 8)
+TRANSLATION_CACHE_TTL = getattr(config, "TRANSLATION_CACHE_TTL", 30 * 86400)
+TRANSLATION_STUB_DELAY = getattr(config, "TRANSLATION_STUB_DELAY", 0.0)
+SOURCE_LANGUAGE = "ru"
+GOOGLE_CHUNK_SIZE = 4500  # googletrans не принимает тексты длиннее ~5000 символов
+GOOGLE_LANGUAGE_CODES = {"zh": "zh-cn"}
+
+_semaphore = None
+_stats = {"translated": 0, "cache_hits": 0, "failed": 0}
+
+
+class TranslationProvider(ABC):
+    """Базовый интерфейс провайдера перевода"""
+    name = "base"
+
+    @abstractmethod
+    async def translate(self, text: str, src: str, dest: str) -> str:
+        """Возвращает текст на языке dest"""
+
+
+class GoogleTranslateProvider(TranslationProvider):
+    """Google Translate через googletrans (синхронная библиотека — вызовы идут в потоках)"""
+    name = "google"
+
+    async def translate(self, text: str, src: str, dest: str) -> str:
+        dest = GOOGLE_LANGUAGE_CODES.get(dest, dest)
+        chunks = _split_chunks(text, GOOGLE_CHUNK_SIZE)
+        parts = await asyncio.gather(*(asyncio.to_thread(self._translate_sync, chunk, src, dest) for chunk in chunks))
+        return "\n\n".join(parts)
+
+    @staticmethod
+    def _translate_sync(text: str, src: str, dest: str) -> str:
+        # Отдельный Translator на вызов: его HTTP-клиент не рассчитан на работу из нескольких потоков
+        return Translator().translate(text, src=src, dest=dest).text
+
+
+class StubTranslationProvider(TranslationProvider):
+    """Локальная заглушка для проверок без сети: помечает текст кодом языка"""
+    name = "stub"
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+
+    async def translate(self, text: str, src: str, dest: str) -> str:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return f"[{dest}] {text}"
+
+
+def _split_chunks(text: str, limit: int) -> list:
+    """Делит текст по абзацам на куски не длиннее limit"""
+    chunks, current = [], ""
+    for paragraph in text.split("\n\n"):
+        if len(paragraph) > limit and current:
+            chunks.append(current)
+            current = ""
+        while len(paragraph) > limit:
+            chunks.append(paragraph[:limit])
+            paragraph = paragraph[limit:]
+        if current and len(current) + len(paragraph) + 2 > limit:
+            chunks.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks or [text]
+
+
+def build_provider(name: str = TRANSLATION_PROVIDER):
+    """Провайдер по имени из настроек; None — публикуем русский текст во всех языках"""
+    if name == "google":
+        if Translator is None:
+            print("⚠️ googletrans не установлен — сайт получит русский текст во всех языках")
+            return None
+        return GoogleTranslateProvider()
+    if name == "stub":
+        return StubTranslationProvider(TRANSLATION_STUB_DELAY)
+    return None
+
+
+provider = build_provider()
+
+
+def _cache_key(provider_name: str, dest: str, text: str) -> str:
+    return hashlib.sha256(f"{provider_name}|{SOURCE_LANGUAGE}|{dest}|{text}".encode("utf-8")).hexdigest()
+
+
+async def _translate_one(text: str, dest: str):
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(TRANSLATION_CONCURRENCY)
+    async with _semaphore:
+        try:
+            return await asyncio.wait_for(provider.translate(text, SOURCE_LANGUAGE, dest), TRANSLATION_TIMEOUT)
+        except Exception as e:
+            _stats["failed"] += 1
+            print(f"⚠️ Перевод на {dest} не удался ({type(e).__name__}: {e}), оставляем русский текст")
+            return None
+
+
+async def translate_texts(texts: list, languages: list) -> dict:
+    """
+    Переводит тексты на все языки параллельно.
+    Возвращает {язык: [переводы в порядке texts]}; при ошибке на месте перевода остаётся оригинал
+    """
+    result = {lang: list(texts) for lang in languages}
+    if provider is None:
+        return result
+
+    jobs = {}  # ключ кэша -> (язык, индекс текста)
+    for lang in languages:
+        for index, text in enumerate(texts):
+            if text:
+                jobs[_cache_key(provider.name, lang, text)] = (lang, index)
+
+    cached = await get_cached_translations(list(jobs), TRANSLATION_CACHE_TTL)
+    _stats["cache_hits"] += len(cached)
+    missing = [key for key in jobs if key not in cached]
+
+    started = time.perf_counter()
+    translated = await asyncio.gather(*(_translate_one(texts[jobs[key][1]], jobs[key][0]) for key in missing))
+    fresh = {key: text for key, text in zip(missing, translated) if text}
+    if fresh:
+        await store_translations(fresh)
+        _stats["translated"] += len(fresh)
+        print(f"🌍 Переведено {len(fresh)} текстов за {time.perf_counter() - started:.1f} сек")
+
+    for key, (lang, index) in jobs.items():
+        text = cached.get(key) or fresh.get(key)
+        if text:
+            result[lang][index] = text
+    return result
+
+
+async def translate_news_content_async(title: str, body: str) -> dict:
+    """
+    То же, что site_poster.translate_news_content, но с реальным переводом на TRANSLATION_LANGUAGES.
+    Подзаголовок берётся из начала переведённого текста, а не переводится отдельным обрывком
+    """
+    if not body or len(body.strip()) == 0:
+        body = title
+    title = truncate_text(title, 255)
+
+    translated = await translate_texts([title, body], TRANSLATION_LANGUAGES)
+    translations = {SOURCE_LANGUAGE: (title, body)}
+    translations.update({lang: tuple(texts) for lang, texts in translated.items()})
+
+    return {
+        lang: {
+            'title': truncate_text(lang_title, 255),
+            'description': lang_body,
+            'subtitle': truncate_text(lang_body, 200)
+        }
+        for lang, (lang_title, lang_body) in translations.items()
+    }
+
+
+def get_translation_stats() -> dict:
+    return {"provider": provider.name if provider else "none", **_stats}
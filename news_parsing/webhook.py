@@ -0,0 +1,84 @@
+import asyncio
+import os
+import secrets
+
+from aiohttp import web
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+import config
+
+# Режим получения обновлений: "polling" (по умолчанию) или "webhook"
+BOT_MODE = getattr(config, "BOT_MODE", "polling")
+WEBHOOK_URL = getattr(config, "WEBHOOK_URL", "")  # публичный https-адрес без пути, например https://bot.example.com
+WEBHOOK_PATH = getattr(config, "WEBHOOK_PATH", "/telegram/webhook")
+WEBHOOK_HOST = getattr(config, "WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = getattr(config, "WEBHOOK_PORT", 8080)
+# Telegram присылает его в заголовке X-Telegram-Bot-Api-Secret-Token; запросы без него отклоняются.
+# Если в config.py секрета нет — он создаётся один раз и хранится в файле, доступном только владельцу
+WEBHOOK_SECRET_FILE = getattr(config, "WEBHOOK_SECRET_FILE", "webhook_secret.txt")
+
+
+def _load_or_create_secret(path: str) -> str:
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            secret = f.read().strip()
+        if secret:
+            return secret
+    secret = secrets.token_urlsafe(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(secret)
+    return secret
+
+
+WEBHOOK_SECRET = getattr(config, "WEBHOOK_SECRET", "")
+
+
+def webhook_secret() -> str:
+    return WEBHOOK_SECRET or _load_or_create_secret(WEBHOOK_SECRET_FILE)
+
+
+def make_webhook_app(dp, bot, secret_token: str = None, path: str = WEBHOOK_PATH) -> web.Application:
+    """aiohttp-приложение, принимающее обновления Telegram по POST на path"""
+    secret_token = secret_token or webhook_secret()
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=secret_token).register(app, path=path)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook(dp, bot, register: bool = True):
+    """Поднимает веб-сервер, регистрирует вебхук в Telegram и снимает его при остановке"""
+    app = make_webhook_app(dp, bot)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_HOST, WEBHOOK_PORT)
+    await site.start()
+    print(f"🌐 Вебхук слушает {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+
+    registered = False
+    try:
+        if register:
+            if not WEBHOOK_URL:
+                print("⚠️ WEBHOOK_URL не задан — вебхук в Telegram не зарегистрирован (локальный режим)")
+                if not WEBHOOK_SECRET:
+                    print(f"🔑 Секрет для локальных запросов — в файле {WEBHOOK_SECRET_FILE}")
+            else:
+                await bot.set_webhook(
+                    f"{WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}",
+                    secret_token=webhook_secret(),
+                    allowed_updates=dp.resolve_used_update_types()
+                )
+                registered = True
+                print("✅ Вебхук зарегистрирован в Telegram")
+
+        # Работаем, пока задачу не отменят
+        await asyncio.Event().wait()
+    finally:
+        if registered:
+            try:
+                await bot.delete_webhook()
+                print("✅ Вебхук удалён из Telegram")
+            except Exception as e:
+                print(f"⚠️ Не удалось удалить вебхук: {e}")
+        await runner.cleanup()